@@ -0,0 +1,86 @@
+"""
+Résolution de N références : boucle sur main.run_query (main.py query : une
+connexion et iter_range par référence, sortie écrite dans os.devnull) contre
+le mode batch de main.py (table temporaire + jointures ensemblistes, sortie
+JSON lines).
+La base de test est construite à partir d'une Bible (LSG par défaut).
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_batch_resolve [--refs N] [epub]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import warnings
+
+from benchmarks.fixtures import ingest_bibles, open_bench_database
+from main import run_batch, run_query
+
+warnings.filterwarnings("ignore", category=UserWarning, module="ebooklib.epub")
+warnings.filterwarnings("ignore", category=FutureWarning, module="ebooklib.epub")
+
+
+def build_database(db_path, epub_path):
+    conn = open_bench_database(db_path, fulltext=False)
+    ingest_bibles(conn, [("bench", epub_path)])
+    return conn
+
+
+def sample_references(conn, count, seed):
+    """Références "Abrév C.V" tirées au hasard parmi les versets de la base."""
+    rows = conn.execute("""
+        SELECT bb.abbreviation, c.number, v.number
+        FROM verses v
+        JOIN chapters c ON c.id = v.chapter_id
+        JOIN bible_books bb ON bb.id = c.bible_book_id
+    """).fetchall()
+    rng = random.Random(seed)
+    return [f"{abbreviation} {chapter}.{verse}" for abbreviation, chapter, verse in
+            (rng.choice(rows) for _ in range(count))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("epub", nargs="?", default=os.path.join("resources", "LSG.epub"))
+    parser.add_argument("--refs", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "batch.db")
+        conn = build_database(db_path, args.epub)
+        references = sample_references(conn, args.refs, args.seed)
+        conn.close()
+
+        refs_path = os.path.join(directory, "refs.txt")
+        with open(refs_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(references))
+
+        start = time.perf_counter()
+        loop_found = 0
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for ref_str in references:
+                loop_found += len(run_query(db_path, ref_str))
+        loop_time = time.perf_counter() - start
+
+        output = io.StringIO()
+        start = time.perf_counter()
+        run_batch(db_path, refs_path, output)
+        batch_time = time.perf_counter() - start
+        batch_found = sum(len(json.loads(line)["results"])
+                          for line in output.getvalue().splitlines())
+
+        print(f"{'méthode':<28} {'durée (s)':>10} {'réf/s':>10} {'résultats':>10}")
+        print(f"{'boucle run_query':<28} {loop_time:>10.2f} "
+              f"{len(references) / loop_time:>10,.0f} {loop_found:>10}")
+        print(f"{'batch (JSON lines)':<28} {batch_time:>10.2f} "
+              f"{len(references) / batch_time:>10,.0f} {batch_found:>10}")
+
+
+if __name__ == "__main__":
+    main()
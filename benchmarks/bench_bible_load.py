@@ -0,0 +1,114 @@
+"""
+Débit de chargement d'une Bible dans SQLite : insertion ligne à ligne
+(SELECT/INSERT par verset, comme les autres parseurs) contre le chargement
+en masse de bible_parser.write_bible_rows (executemany, PRAGMA, index après).
+L'extraction de l'EPUB est faite une seule fois et mesurée à part.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_bible_load [epub]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import warnings
+
+from db.init_db import init_db
+from utils.bible_parser import extract_bible_rows, write_bible_rows
+from utils.canon import book_position, ensure_bible_books
+from utils.db_bulk import (
+    SECONDARY_INDEXES,
+    apply_ingest_pragmas,
+    create_secondary_indexes,
+    drop_secondary_indexes,
+)
+from utils.verse_keys import ensure_ordinal_schema, verse_ordinal
+
+warnings.filterwarnings("ignore", category=UserWarning, module="ebooklib.epub")
+warnings.filterwarnings("ignore", category=FutureWarning, module="ebooklib.epub")
+
+
+def fresh_database(directory, name):
+    """Base vierge (schéma de db/init_db.py) + une ligne books pour la traduction."""
+    db_path = os.path.join(directory, name)
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    ensure_ordinal_schema(cursor)
+    cursor.execute("INSERT INTO books (title, category_id) VALUES ('bench', 1)")
+    conn.commit()
+    return conn, cursor.lastrowid
+
+
+def row_by_row_load(conn, book_id, rows):
+    """Référence : un aller-retour SQLite par chapitre/verset, index déjà présents."""
+    cursor = conn.cursor()
+    for statement in SECONDARY_INDEXES.values():
+        cursor.execute(statement)
+    bible_book_ids = ensure_bible_books(cursor)
+    for book_name, chapter, verse, text_content in rows:
+        position = book_position(book_name)
+        if position is None:
+            continue
+        bible_book_id = bible_book_ids[position]
+        cursor.execute("SELECT id FROM chapters WHERE bible_book_id = ? AND number = ?",
+                       (bible_book_id, chapter))
+        row = cursor.fetchone()
+        if row:
+            chapter_id = row[0]
+        else:
+            cursor.execute("INSERT INTO chapters (bible_book_id, number) VALUES (?, ?)",
+                           (bible_book_id, chapter))
+            chapter_id = cursor.lastrowid
+        cursor.execute("SELECT id FROM verses WHERE chapter_id = ? AND number = ?",
+                       (chapter_id, verse))
+        row = cursor.fetchone()
+        if row:
+            verse_id = row[0]
+        else:
+            cursor.execute("INSERT INTO verses (chapter_id, number, ordinal) VALUES (?, ?, ?)",
+                           (chapter_id, verse, verse_ordinal(position, chapter, verse)))
+            verse_id = cursor.lastrowid
+        cursor.execute(
+            "INSERT INTO contents (book_id, start_verse_id, end_verse_id, text) VALUES (?, ?, ?, ?)",
+            (book_id, verse_id, verse_id, text_content),
+        )
+    conn.commit()
+
+
+def bulk_load(conn, book_id, rows):
+    """Chemin d'ingestion : PRAGMA, index supprimés, executemany, une transaction."""
+    apply_ingest_pragmas(conn)
+    cursor = conn.cursor()
+    drop_secondary_indexes(cursor)
+    write_bible_rows(cursor, book_id, rows)
+    conn.commit()
+    create_secondary_indexes(cursor)
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("epub", nargs="?", default=os.path.join("resources", "LSG.epub"))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = extract_bible_rows(args.epub)
+    extract_time = time.perf_counter() - start
+    print(f"[INFO] Extraction : {len(rows)} versets en {extract_time:.2f} s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'chargement':<14} {'durée (s)':>10} {'versets/s':>12}")
+        for label, loader, name in (("ligne à ligne", row_by_row_load, "rows.db"),
+                                    ("en masse", bulk_load, "bulk.db")):
+            conn, book_id = fresh_database(directory, name)
+            start = time.perf_counter()
+            loader(conn, book_id, rows)
+            elapsed = time.perf_counter() - start
+            conn.close()
+            print(f"{label:<14} {elapsed:>10.2f} {len(rows) / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Temps de démarrage à froid d'une recherche : chaque mesure lance un nouveau
+processus Python (imports compris), comme un appel en ligne de commande.
+  python -c pass                  plancher de l'interpréteur
+  main.py query "Col 3:16"        chemin rapide (sqlite3 + résolveur, aucune mise à jour)
+  main.py batch - (1 référence)   mode batch sur stdin
+  ingest + query                  ancien comportement : imports de l'ingestion et
+                                  re-scan des ressources (rien à ingérer) avant la recherche
+La base de test est construite par "main.py ingest" à partir de LSG.epub.
+Objectif : médiane de "query" nettement sous 100 ms.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_cold_start [--runs N] [--reference "Col 3:16"]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from db.init_db import init_db
+
+MAIN = os.path.abspath("main.py")
+EPUB_PATH = os.path.join("resources", "LSG.epub")
+TARGET_MS = 100
+
+
+def wall_times(command, runs, env, stdin_text=None):
+    """Durées (ms) de 'runs' exécutions de 'command' dans un processus neuf."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, input=stdin_text, text=True, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--reference", default="Col 3:16")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        resources = os.path.join(directory, "resources")
+        os.makedirs(resources)
+        shutil.copy(EPUB_PATH, resources)
+        db_path = os.path.join(directory, "database.db")
+        init_db(db_path)
+        env = dict(os.environ, DATABASE_FILE=db_path, RESOURCES_PATH=resources,
+                   CATEGORY_MODE="auto")
+        env.pop("INGEST_EVENTS", None)
+        subprocess.run([sys.executable, MAIN, "ingest"], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+
+        legacy = (f"import main; main.run_ingest(); "
+                  f"main.run_query(main.database_path(), {args.reference!r})")
+        scenarios = [
+            ("python -c pass", [sys.executable, "-c", "pass"], None),
+            ("main.py query", [sys.executable, MAIN, "query", args.reference], None),
+            ("main.py batch - (1 réf.)", [sys.executable, MAIN, "batch", "-"], args.reference + "\n"),
+            ("ingest + query (ancien)", [sys.executable, "-c", legacy], None),
+        ]
+
+        print(f"{'scénario':<26} {'min (ms)':>9} {'médiane':>9} {'p90':>9}")
+        medians = {}
+        for label, command, stdin_text in scenarios:
+            # Un premier lancement non compté remplit le cache disque (.pyc, fichiers)
+            wall_times(command, 1, env, stdin_text)
+            timings = wall_times(command, args.runs, env, stdin_text)
+            medians[label] = statistics.median(timings)
+            p90 = statistics.quantiles(timings, n=10)[-1]
+            print(f"{label:<26} {min(timings):>9.1f} {medians[label]:>9.1f} {p90:>9.1f}")
+
+        status = "OK" if medians["main.py query"] < TARGET_MS else "au-dessus de l'objectif"
+        print(f"\nquery : médiane {medians['main.py query']:.1f} ms "
+              f"(objectif < {TARGET_MS} ms : {status}), "
+              f"dont {medians['python -c pass']:.1f} ms d'interpréteur")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Débit de la segmentation d'un commentaire (utils/commentary_parser) sur un
+gros EPUB synthétique : un document par livre biblique, des en-têtes
+"Colossiens 3.16-17" ou "3:18" suivis de paragraphes (texte LSG, avec des
+renvois en ligne). Mesure l'extraction + segmentation, puis l'écriture en base
+(cache des verse_id + executemany) contre une résolution par SELECT par bloc.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_commentary [--blocks N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import warnings
+from html import escape
+
+from ebooklib import epub
+
+from benchmarks.fixtures import add_book, ingest_bibles, open_bench_database
+from utils.bible_parser import extract_bible_rows
+from utils.canon import CANON_BOOKS, book_position
+from utils.commentary_parser import extract_commentary_rows, write_commentary_rows
+
+warnings.filterwarnings("ignore", category=UserWarning, module="ebooklib.epub")
+warnings.filterwarnings("ignore", category=FutureWarning, module="ebooklib.epub")
+
+BIBLE_PATH = os.path.join("resources", "LSG.epub")
+
+
+def build_commentary_epub(epub_path, bible_rows, block_count, seed):
+    """Écrit un commentaire synthétique de 'block_count' blocs ; retourne le nombre de blocs."""
+    rng = random.Random(seed)
+    by_book = {}
+    for book_name, chapter, verse, text_content in bible_rows:
+        by_book.setdefault(book_position(book_name), []).append((chapter, verse, text_content))
+    positions = sorted(by_book)
+    per_book = max(1, block_count // len(positions))
+
+    book = epub.EpubBook()
+    book.set_identifier("bench-commentary")
+    book.set_title("Commentaire synthétique")
+    book.set_language("fr")
+    book.add_author("Benchmark")
+    chapters = []
+    written = 0
+    for position in positions:
+        verses = by_book[position]
+        french_title = CANON_BOOKS[position][1]
+        html = [f"<h1>{escape(french_title)}</h1>", "<p>Introduction au livre.</p>"]
+        step = max(1, len(verses) // per_book)
+        for index in range(0, len(verses), step):
+            chapter, verse, _ = verses[index]
+            end_verse = verse + rng.randint(0, 3)
+            header = (f"{french_title} {chapter}.{verse}-{end_verse}" if rng.random() < 0.5
+                      else f"{chapter}:{verse}-{end_verse}")
+            html.append(f"<h3>{escape(header)}</h3>")
+            for _ in range(rng.randint(1, 3)):
+                sample = " ".join(v[2] for v in rng.sample(verses, min(3, len(verses))))
+                other = rng.choice(CANON_BOOKS)[0]
+                html.append(f"<p>{escape(sample)} Voir aussi <i>{other} {rng.randint(1, 5)}:"
+                            f"{rng.randint(1, 20)}</i>.</p>")
+            written += 1
+        item = epub.EpubHtml(title=french_title, file_name=f"book_{position:02d}.xhtml", lang="fr")
+        item.content = "<html><body>" + "\n".join(html) + "</body></html>"
+        book.add_item(item)
+        chapters.append(item)
+
+    book.toc = chapters
+    book.spine = chapters
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    epub.write_epub(epub_path, book)
+    return written
+
+
+def write_with_selects(cursor, book_id, rows):
+    """Référence : deux SELECT par bloc pour retrouver les verse_id, puis un INSERT."""
+    for start_ordinal, end_ordinal, text_content in rows:
+        cursor.execute("SELECT id FROM verses WHERE ordinal >= ? ORDER BY ordinal LIMIT 1",
+                       (start_ordinal,))
+        start_row = cursor.fetchone()
+        cursor.execute("SELECT id FROM verses WHERE ordinal <= ? ORDER BY ordinal DESC LIMIT 1",
+                       (end_ordinal,))
+        end_row = cursor.fetchone()
+        cursor.execute("""
+            INSERT INTO contents (book_id, start_verse_id, end_verse_id, start_ordinal, end_ordinal, text)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (book_id, start_row and start_row[0], end_row and end_row[0],
+              start_ordinal, end_ordinal, text_content))
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    bible_rows = extract_bible_rows(BIBLE_PATH)
+    with tempfile.TemporaryDirectory() as directory:
+        epub_path = os.path.join(directory, "commentary.epub")
+        expected = build_commentary_epub(epub_path, bible_rows, args.blocks, args.seed)
+        size = os.path.getsize(epub_path) / 1e6
+        print(f"[INFO] EPUB synthétique : {expected:,} blocs, {size:.1f} Mo compressé")
+
+        start = time.perf_counter()
+        rows = extract_commentary_rows(epub_path)
+        extract_time = time.perf_counter() - start
+        text_size = sum(len(row[2].encode("utf-8")) for row in rows) / 1e6
+        print(f"Extraction + segmentation : {len(rows):,} blocs ({text_size:.1f} Mo de texte) "
+              f"en {extract_time:.2f} s -> {len(rows) / extract_time:,.0f} blocs/s")
+
+        print(f"{'écriture':<26} {'durée (s)':>10} {'blocs/s':>10}")
+        for label, writer in (("SELECT par bloc", write_with_selects),
+                              ("cache + executemany", write_commentary_rows)):
+            db_path = os.path.join(directory, f"{writer.__name__}.db")
+            conn = open_bench_database(db_path, fulltext=False)
+            ingest_bibles(conn, [("LSG", BIBLE_PATH)])
+            cursor = conn.cursor()
+            book_id = add_book(cursor, "Commentaire", 2)
+
+            start = time.perf_counter()
+            writer(cursor, book_id, rows)
+            conn.commit()
+            elapsed = time.perf_counter() - start
+            conn.close()
+            print(f"{label:<26} {elapsed:>10.2f} {len(rows) / elapsed:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Graphe des co-citations (utils/cross_references.py) sur --commentaries commentaires
+synthétiques : chaque bloc commente un passage et renvoie à des passages d'un
+même "thème" (groupes de passages tirés au hasard), plus un renvoi isolé.
+
+Mesures :
+  ingestion    écriture des blocs, dont l'indexation des citations (étape
+               "citations"), arêtes et taille des tables du graphe
+  requêtes     passages cités avec un verset : related_passages (index du
+               graphe) contre une relecture de tous les blocs des commentaires,
+               références réanalysées à chaque requête (sans graphe)
+  réingestion  un commentaire modifié réingéré en place (job "replace") contre
+               une reconstruction complète du graphe ; le graphe incrémental
+               doit être identique à la reconstruction
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_cross_references [--commentaries 4] [--blocks 4000] [--probes 500]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import warnings
+from collections import Counter
+from html import escape
+
+from ebooklib import epub
+
+from benchmarks.fixtures import add_book, open_bench_database
+from utils.canon import CANON_BOOKS
+from utils.cross_references import cited_verses, ensure_citation_schema, related_passages
+from utils.instrumentation import counters
+from utils.parallel_ingest import run_ingestion_jobs
+from utils.verse_keys import split_ordinal, verse_ordinal
+
+warnings.filterwarnings("ignore", category=UserWarning, module="ebooklib.epub")
+warnings.filterwarnings("ignore", category=FutureWarning, module="ebooklib.epub")
+
+TOPICS = 400
+TOPIC_PASSAGES = 8
+NAIVE_PROBES = 5
+
+
+def random_passage(rng):
+    position = rng.randrange(len(CANON_BOOKS))
+    chapter, verse = rng.randint(1, 20), rng.randint(1, 25)
+    return position, chapter, verse, verse + rng.choice((0, 0, 0, 1, 2))
+
+
+def passage_text(passage):
+    position, chapter, verse, end_verse = passage
+    suffix = f"-{end_verse}" if end_verse != verse else ""
+    return f"{CANON_BOOKS[position][0]} {chapter}:{verse}{suffix}"
+
+
+def build_commentary_epub(epub_path, title, block_count, seed):
+    """Commentaire synthétique de 'block_count' blocs, un document par livre biblique."""
+    topics_rng = random.Random(0)
+    topics = [[random_passage(topics_rng) for _ in range(TOPIC_PASSAGES)] for _ in range(TOPICS)]
+    rng = random.Random(seed)
+    by_position = {}
+    for _ in range(block_count):
+        topic = rng.choice(topics)
+        header = rng.choice(topic)
+        cited = rng.sample(topic, rng.randint(2, 5)) + [random_passage(rng)]
+        by_position.setdefault(header[0], []).append((header, cited))
+
+    book = epub.EpubBook()
+    book.set_identifier(f"bench-{title}")
+    book.set_title(title)
+    book.set_language("fr")
+    book.add_author("Benchmark")
+    documents = []
+    for position in sorted(by_position):
+        french_title = CANON_BOOKS[position][1]
+        html = [f"<h1>{escape(french_title)}</h1>"]
+        for header, cited in sorted(by_position[position]):
+            html.append(f"<h3>{escape(passage_text(header))}</h3>")
+            html.append(f"<p>Le passage se comprend à la lumière de {escape(' ; '.join(map(passage_text, cited)))}, "
+                        f"que l'auteur commente longuement.</p>")
+        item = epub.EpubHtml(title=french_title, file_name=f"book_{position:02d}.xhtml", lang="fr")
+        item.content = "<html><body>" + "\n".join(html) + "</body></html>"
+        book.add_item(item)
+        documents.append(item)
+    book.toc = documents
+    book.spine = documents
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    epub.write_epub(epub_path, book)
+
+
+def ingest(conn, jobs):
+    """run_ingestion_jobs ; retourne (durée totale ms, durée de l'étape "citations" ms)."""
+    before = counters().get("citations_ms", 0)
+    start = time.perf_counter()
+    run_ingestion_jobs(conn, jobs)
+    return (time.perf_counter() - start) * 1000, counters().get("citations_ms", 0) - before
+
+
+def graph_rows(cursor):
+    return cursor.execute("SELECT ordinal, neighbor, weight FROM cocitations ORDER BY ordinal, neighbor").fetchall()
+
+
+def table_size(cursor, name):
+    try:
+        return cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (name,)).fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        return 0  # SQLite compilé sans dbstat
+
+
+def naive_related(cursor, book_ids, ordinal):
+    """Sans graphe : tous les blocs des commentaires relus, références réanalysées."""
+    neighbors = Counter()
+    cursor.execute(f"SELECT start_ordinal, end_ordinal, text FROM contents "
+                   f"WHERE book_id IN ({', '.join('?' * len(book_ids))})", book_ids)
+    for start_ordinal, end_ordinal, text_content in cursor.fetchall():
+        verses = cited_verses(text_content, start_ordinal, end_ordinal)
+        if ordinal in verses:
+            neighbors.update(verse for verse in verses if verse != ordinal)
+    return neighbors.most_common(20)
+
+
+def median_p99(timings):
+    return statistics.median(timings), statistics.quantiles(timings, n=100, method="inclusive")[98]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--commentaries", type=int, default=4)
+    parser.add_argument("--blocks", type=int, default=4000, help="blocs par commentaire")
+    parser.add_argument("--probes", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "graph.db")
+        conn = open_bench_database(db_path, fulltext=False)
+        cursor = conn.cursor()
+        ensure_citation_schema(cursor)
+        jobs = []
+        for index in range(args.commentaries):
+            title = f"Commentaire {chr(ord('A') + index)}"
+            path = os.path.join(directory, f"commentary-{index}.epub")
+            build_commentary_epub(path, title, args.blocks, args.seed + index)
+            jobs.append({"book_id": add_book(cursor, title, 2), "category": "commentary", "epub_path": path})
+        conn.commit()
+        book_ids = [job["book_id"] for job in jobs]
+
+        elapsed, citations_ms = ingest(conn, jobs)
+        edges = cursor.execute("SELECT COUNT(*) FROM cocitations").fetchone()[0]
+        citations = cursor.execute("SELECT COUNT(*) FROM content_citations").fetchone()[0]
+        size = table_size(cursor, "cocitations") + table_size(cursor, "content_citations")
+        print(f"ingestion : {args.commentaries * args.blocks} blocs en {elapsed:.0f} ms, "
+              f"dont citations {citations_ms:.0f} ms ; "
+              f"{citations} citations, {edges} arêtes, {size / 1024:.0f} Kio")
+
+        rng = random.Random(args.seed)
+        cited = [row[0] for row in cursor.execute("SELECT DISTINCT ordinal FROM content_citations").fetchall()]
+        probes = [rng.choice(cited) for _ in range(args.probes)]
+        chapters = [verse_ordinal(*split_ordinal(ordinal)[:2], 0) for ordinal in probes]
+        graph_verse = []
+        for ordinal in probes:
+            start = time.perf_counter()
+            related_passages(cursor, ordinal, ordinal)
+            graph_verse.append((time.perf_counter() - start) * 1000)
+        graph_chapter = []
+        for ordinal in chapters:
+            start = time.perf_counter()
+            related_passages(cursor, ordinal, ordinal + 999)
+            graph_chapter.append((time.perf_counter() - start) * 1000)
+        naive = []
+        for ordinal in probes[:NAIVE_PROBES]:
+            start = time.perf_counter()
+            naive_related(cursor, book_ids, ordinal)
+            naive.append((time.perf_counter() - start) * 1000)
+        print(f"\n{'requête':<40} {'médiane (ms)':>12} {'p99 (ms)':>10}")
+        print(f"{'verset : related_passages':<40} {median_p99(graph_verse)[0]:>12.3f} {median_p99(graph_verse)[1]:>10.3f}")
+        print(f"{'chapitre : related_passages':<40} {median_p99(graph_chapter)[0]:>12.3f} "
+              f"{median_p99(graph_chapter)[1]:>10.3f}")
+        print(f"{'verset : relecture des blocs':<40} {statistics.median(naive):>12.1f} {max(naive):>10.1f}")
+
+        # Commentaire A modifié, réingéré en place
+        path = os.path.join(directory, "commentary-0-v2.epub")
+        build_commentary_epub(path, "Commentaire A", args.blocks, args.seed + 100)
+        elapsed, citations_ms = ingest(conn, [{"book_id": book_ids[0], "category": "commentary",
+                                              "epub_path": path, "replace": True}])
+        incremental = graph_rows(cursor)
+
+        start = time.perf_counter()
+        cursor.execute("DROP TABLE cocitations")
+        cursor.execute("DROP TABLE content_citations")
+        ensure_citation_schema(cursor)
+        conn.commit()
+        rebuild = (time.perf_counter() - start) * 1000
+        print(f"\nréingestion de A : {elapsed:.0f} ms (dont citations {citations_ms:.0f} ms) ; "
+              f"reconstruction complète du graphe : {rebuild:.0f} ms ; "
+              f"graphe identique : {'oui' if graph_rows(cursor) == incremental else 'NON'}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Réingestion avec le cache d'extraction (utils/extraction_cache) : extraction
+des versets de LSG.epub et niv.epub sans cache, cache vide (tous les documents
+parsés puis stockés), cache chaud (aucun HTML reparsé), puis avec un cache trop
+petit pour tout garder (éviction LRU).
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_extraction_cache [--small-mb N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from utils import extraction_cache
+from utils.bible_parser import extract_bible_rows
+
+EPUBS = [os.path.join("resources", "LSG.epub"), os.path.join("resources", "niv.epub")]
+
+
+def run(label, expected=None):
+    """Extrait toutes les Bibles ; affiche durée et compteurs du cache."""
+    extraction_cache.reset_cache_stats()
+    start = time.perf_counter()
+    rows = [extract_bible_rows(epub_path) for epub_path in EPUBS]
+    elapsed = time.perf_counter() - start
+    stats = extraction_cache.cache_stats()
+    if expected is not None and rows != expected:
+        raise AssertionError(f"{label} : versets différents de l'extraction sans cache")
+    print(f"{label:<24} {elapsed:>10.2f} {stats['hits']:>7} {stats['misses']:>7} {stats['evictions']:>7}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--small-mb", type=float, default=1.0,
+                        help="taille maximale du cache pour le scénario d'éviction")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.pop("EXTRACTION_CACHE", None)
+        print(f"{'scénario':<24} {'durée (s)':>10} {'hits':>7} {'misses':>7} {'évict.':>7}")
+        expected = run("sans cache")
+
+        os.environ["EXTRACTION_CACHE"] = os.path.join(directory, "extraction.db")
+        run("cache vide", expected)
+        run("cache chaud", expected)
+        entries, size = extraction_cache.cache_usage()
+        text_size = sum(len(text.encode("utf-8")) for rows in expected for *_, text in rows)
+
+        os.environ["EXTRACTION_CACHE"] = os.path.join(directory, "small.db")
+        os.environ["EXTRACTION_CACHE_MAX_MB"] = str(args.small_mb)
+        run(f"cache de {args.small_mb:g} Mo (vide)", expected)
+        run(f"cache de {args.small_mb:g} Mo (2e passe)", expected)
+        extraction_cache.close_caches()
+
+        print(f"\nCache complet : {entries} documents, {size / 1e6:.1f} Mo compressés "
+              f"(texte des versets : {text_size / 1e6:.1f} Mo)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Latence de la recherche plein texte (utils/fulltext, FTS5 + BM25 + extraits)
+sur une base contenant plusieurs Bibles complètes et un commentaire synthétique,
+comparée à un parcours LIKE '%mot%' de contents.text.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_fulltext [--paragraphs N] [--repeat N]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+import warnings
+
+from benchmarks.fixtures import add_book, ingest_bibles, open_bench_database
+from utils.fulltext import search_contents
+
+warnings.filterwarnings("ignore", category=UserWarning, module="ebooklib.epub")
+warnings.filterwarnings("ignore", category=FutureWarning, module="ebooklib.epub")
+
+BIBLES = [
+    ("Louis Segond 1910", os.path.join("resources", "LSG.epub")),
+    ("New International Version", os.path.join("resources", "niv.epub")),
+    ("Louis Segond 1910 (copie)", os.path.join("resources", "LSG.epub")),
+]
+
+QUERIES = ["grâce", "grace", "amour", "love", "lumière", "esprit saint", "Christ",
+           "foi*", "Moïse", "covenant", "alliance éternelle", "shepherd"]
+
+
+def build_database(db_path, paragraph_count, seed):
+    """Bibles ingérées par le chemin normal + paragraphes de commentaire synthétiques."""
+    conn = open_bench_database(db_path)
+    book_ids = ingest_bibles(conn, BIBLES)
+
+    # Commentaire : chaque paragraphe recolle quelques versets tirés au hasard
+    cursor = conn.cursor()
+    commentary_id = add_book(cursor, "Commentaire synthétique", 2)
+    verses = cursor.execute("SELECT text, start_verse_id, start_ordinal FROM contents "
+                            "WHERE book_id = ?", (book_ids[0],)).fetchall()
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(paragraph_count):
+        sample = rng.sample(verses, 4)
+        rows.append((commentary_id, sample[0][1], sample[0][1], sample[0][2], sample[0][2],
+                     "Ce passage rappelle que " + " ".join(v[0] for v in sample)))
+    cursor.executemany(
+        """INSERT INTO contents (book_id, start_verse_id, end_verse_id, start_ordinal, end_ordinal, text)
+           VALUES (?, ?, ?, ?, ?, ?)""", rows)
+    conn.commit()
+    return conn
+
+
+def measure(func, repeat):
+    """Latences (ms) de func() sur 'repeat' appels."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        conn = build_database(os.path.join(directory, "fts.db"), args.paragraphs, args.seed)
+        cursor = conn.cursor()
+        row_count = cursor.execute("SELECT COUNT(*) FROM contents").fetchone()[0]
+        print(f"[INFO] Base construite : {row_count:,} contenus en {time.perf_counter() - start:.1f} s")
+
+        scenarios = [
+            ("sans filtre", {}),
+            ("category=commentary", {"category": "commentary"}),
+            ("book=NIV", {"book": "New International Version"}),
+        ]
+        print(f"{'requête':<20} {'filtre':<22} {'résultats':>9} {'médiane (ms)':>13} {'max (ms)':>9}")
+        all_timings = []
+        for query in QUERIES:
+            for label, filters in scenarios:
+                hits = search_contents(cursor, query, limit=20, **filters)
+                timings = measure(lambda: search_contents(cursor, query, limit=20, **filters),
+                                  args.repeat)
+                all_timings.extend(timings)
+                print(f"{query:<20} {label:<22} {len(hits):>9} {statistics.median(timings):>13.2f} "
+                      f"{max(timings):>9.2f}")
+
+        like_timings = measure(lambda: cursor.execute(
+            "SELECT id FROM contents WHERE text LIKE '%grâce%' LIMIT 20 OFFSET 1000000").fetchall(),
+            args.repeat)
+        print(f"\nFTS5, toutes requêtes : médiane {statistics.median(all_timings):.2f} ms, "
+              f"p95 {statistics.quantiles(all_timings, n=20)[-1]:.2f} ms")
+        print(f"LIKE '%grâce%' (parcours complet) : médiane {statistics.median(like_timings):.2f} ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Compare l'identification d'un EPUB via ebooklib (epub.read_epub + DC:title/creator)
+et via la lecture OPF seule (read_epub_metadata).
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_metadata [--repeat N] [epub ...]
+"""
+import argparse
+import glob
+import os
+import time
+import warnings
+
+from utils.epub_parser import open_epub
+from utils.opf_reader import read_epub_metadata
+
+warnings.filterwarnings("ignore", category=UserWarning, module="ebooklib.epub")
+warnings.filterwarnings("ignore", category=FutureWarning, module="ebooklib.epub")
+
+
+def ebooklib_metadata(epub_path):
+    """Ancien chemin d'identification : charge tout l'EPUB pour lire le titre."""
+    book = open_epub(epub_path)
+    return book.get_metadata("DC", "title"), book.get_metadata("DC", "creator")
+
+
+def best_of(func, epub_path, repeat):
+    """Meilleur temps (en secondes) sur 'repeat' appels de func(epub_path)."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(epub_path)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("epubs", nargs="*", help="EPUB à mesurer (défaut: resources/*.epub)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    epubs = args.epubs or sorted(glob.glob(os.path.join("resources", "*.epub")))
+    print(f"{'EPUB':<20} {'ebooklib (ms)':>14} {'OPF seul (ms)':>14} {'speedup':>9}")
+    for epub_path in epubs:
+        slow = best_of(ebooklib_metadata, epub_path, args.repeat)
+        fast = best_of(read_epub_metadata, epub_path, args.repeat)
+        print(f"{os.path.basename(epub_path):<20} {slow * 1000:>14.1f} {fast * 1000:>14.2f} {slow / fast:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Vue parallèle des traductions (utils/versification.py) sur LSG, NIV et une
+troisième traduction synthétique : le texte de LSG renuméroté à l'hébraïque
+(suscriptions des Psaumes numérotées, Ml 3:19-24, Jl 3-4...), comme une TOB.
+
+Mesures :
+  alignement   versets canoniques où la traduction synthétique ne donne pas le
+               texte de LSG : par clé propre (ancien comportement, sans table
+               d'alignement) et par verse_alignment
+  ingestion    coût de align_translation pour une Bible entière
+  requêtes     un verset et un chapitre entier : un resolve_verse par verset
+               puis regroupement (ancien), contre une requête parallel_verses
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_parallel_view [--probes N]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from benchmarks.fixtures import EPUBS, build_bible_database
+from utils.bible_parser import extract_bible_rows
+from utils.canon import CANON_BOOKS, book_position
+from utils.reference_resolver import get_book_aliases, resolve_verse
+from utils.verse_keys import split_ordinal, verse_ordinal
+from utils.versification import (_RULES, align_translation, canonical_ordinals,
+                                 parallel_verses)
+
+HEBREW_TITLE = "LSG (versification hébraïque)"
+
+
+def hebrew_renumbering():
+    """(position, chapitre, verset) anglais -> numérotation hébraïque, d'après les règles."""
+    inverse = {}
+    for position, (_, rules_by_chapter) in _RULES.items():
+        for chapter in rules_by_chapter:
+            for verse in range(1, 200):
+                source = verse_ordinal(position, chapter, verse)
+                for canonical in canonical_ordinals(source, {position}):
+                    if canonical != source:
+                        inverse.setdefault(canonical, source)
+    return inverse
+
+
+def renumber(rows, inverse):
+    """Versets LSG (livre, chapitre, verset, texte) renumérotés à l'hébraïque."""
+    renumbered = []
+    seen = set()
+    for book_name, chapter, verse, text_content in rows:
+        ordinal = verse_ordinal(book_position(book_name), chapter, verse)
+        source = inverse.get(ordinal, ordinal)
+        if source in seen:
+            continue  # deux versets anglais pour un verset hébreu (Ps 13:5-6) : le premier suffit
+        seen.add(source)
+        _, new_chapter, new_verse = split_ordinal(source)
+        renumbered.append((book_name, new_chapter, new_verse, text_content))
+    return renumbered
+
+
+def build_database(db_path):
+    """Base des trois traductions ; retourne {titre: book_id}."""
+    bibles = [(title, extract_bible_rows(path)) for title, path in EPUBS]
+    bibles.append((HEBREW_TITLE, renumber(bibles[0][1], hebrew_renumbering())))
+    return build_bible_database(db_path, bibles)
+
+
+def alignment_mismatches(cursor, book_ids):
+    """(par clé propre, par alignement) : versets LSG dont le texte diffère dans la traduction synthétique."""
+    lsg, hebrew = book_ids["LSG"], book_ids[HEBREW_TITLE]
+    cursor.execute("SELECT start_ordinal, text FROM contents WHERE book_id = ?", (lsg,))
+    reference = dict(cursor.fetchall())
+    cursor.execute("SELECT start_ordinal, text FROM contents WHERE book_id = ?", (hebrew,))
+    by_own_key = dict(cursor.fetchall())
+    aligned = {}
+    for verse in parallel_verses(cursor, 0, 10 ** 9, [hebrew]):
+        aligned[verse["ordinal"]] = verse["translations"][0]["text"]
+    naive = sum(1 for ordinal, text_content in reference.items() if by_own_key.get(ordinal) != text_content)
+    fixed = sum(1 for ordinal, text_content in reference.items() if aligned.get(ordinal) != text_content)
+    return len(reference), naive, fixed
+
+
+def old_parallel(cursor, aliases, position, chapter, verses):
+    """Ancienne approche : un resolve_verse par verset, regroupement par traduction."""
+    view = {}
+    for verse in verses:
+        results, _ = resolve_verse(cursor, aliases, CANON_BOOKS[position][0], chapter, verse)
+        view[verse] = {book_title: text_content for _, _, _, _, text_content, book_title in results}
+    return view
+
+
+def latencies(calls):
+    timings = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), statistics.quantiles(timings, n=100, method="inclusive")[98]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--probes", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "parallel.db")
+        book_ids = build_database(db_path)
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        total, naive, fixed = alignment_mismatches(cursor, book_ids)
+        print(f"alignement : {total} versets LSG ; texte différent dans la traduction synthétique : "
+              f"{naive} par clé propre, {fixed} via verse_alignment")
+
+        cursor.execute("DELETE FROM verse_alignment WHERE book_id = ?", (book_ids["NIV"],))
+        start = time.perf_counter()
+        align_translation(cursor, book_ids["NIV"])
+        print(f"ingestion : align_translation (NIV) {(time.perf_counter() - start) * 1000:.1f} ms")
+        conn.commit()
+
+        cursor.execute("""SELECT DISTINCT c.start_ordinal FROM contents c
+                          WHERE c.book_id = ?""", (book_ids["LSG"],))
+        ordinals = [row[0] for row in cursor.fetchall()]
+        rng = random.Random(args.seed)
+        probes = [split_ordinal(rng.choice(ordinals)) for _ in range(args.probes)]
+        chapters = {}
+        for ordinal in ordinals:
+            position, chapter, verse = split_ordinal(ordinal)
+            chapters.setdefault((position, chapter), []).append(verse)
+        aliases = get_book_aliases(db_path, cursor)
+
+        print(f"\n{'requête':<34} {'médiane (ms)':>12} {'p99 (ms)':>10}")
+        rows = [
+            ("verset : resolve_verse", [
+                (lambda p=p: old_parallel(cursor, aliases, p[0], p[1], [p[2]])) for p in probes]),
+            ("verset : parallel_verses", [
+                (lambda p=p: parallel_verses(cursor, verse_ordinal(*p), verse_ordinal(*p))) for p in probes]),
+            ("chapitre : resolve_verse x N", [
+                (lambda p=p: old_parallel(cursor, aliases, p[0], p[1], chapters[(p[0], p[1])]))
+                for p in probes[:100]]),
+            ("chapitre : parallel_verses", [
+                (lambda p=p: parallel_verses(cursor, verse_ordinal(p[0], p[1], 0),
+                                             verse_ordinal(p[0], p[1], 999)))
+                for p in probes[:100]]),
+        ]
+        for label, calls in rows:
+            median, p99 = latencies(calls)
+            print(f"{label:<34} {median:>12.3f} {p99:>10.3f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Test de charge du service de requêtes (main.py serve, utils/query_service.py) :
+des clients HTTP keep-alive envoient en parallèle des GET /verse sur des
+versets tirés au hasard, à plusieurs niveaux de concurrence, avec et sans
+cache de réponses. Latences p50 / p99 (ms) et débit (requêtes/s).
+
+La base est construite par "main.py ingest" à partir de LSG.epub ; le service
+tourne dans un processus séparé (le client ne lui dispute pas le GIL).
+Les versets sont tirés parmi --distinct références : avec cache, les premières
+requêtes de chaque verset sont des échecs de cache, les suivantes des succès.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_query_service [--requests N] [--concurrency 1,8,32,64]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+from db.init_db import init_db
+
+MAIN = os.path.abspath("main.py")
+EPUB_PATH = os.path.join("resources", "LSG.epub")
+
+
+def sample_references(db_path, count, seed):
+    """'count' références "Abr C:V" distinctes, tirées parmi les versets de la base."""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("""
+        SELECT bb.abbreviation, c.number, v.number
+        FROM verses v
+        JOIN chapters c ON c.id = v.chapter_id
+        JOIN bible_books bb ON bb.id = c.bible_book_id
+    """).fetchall()
+    conn.close()
+    rng = random.Random(seed)
+    return [f"{book} {chapter}:{verse}" for book, chapter, verse in rng.sample(rows, min(count, len(rows)))]
+
+
+def start_service(env, pool_size, cache_size):
+    """Lance main.py serve sur un port libre ; retourne (processus, hôte, port)."""
+    process = subprocess.Popen(
+        [sys.executable, MAIN, "serve", "--port", "0", "--pool", str(pool_size), "--cache", str(cache_size)],
+        env=env, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if "http://" not in line:
+        process.kill()
+        raise SystemExit(f"[ERROR] Le service n'a pas démarré : {line!r}")
+    host, port = line.split("http://", 1)[1].split()[0].rsplit(":", 1)
+    return process, host, int(port)
+
+
+async def get(reader, writer, host, path):
+    """GET keep-alive ; retourne le statut HTTP (le corps est lu puis ignoré)."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def load(host, port, paths, concurrency):
+    """Répartit 'paths' entre 'concurrency' clients ; retourne (latences ms, durée s, erreurs)."""
+    timings = []
+    errors = 0
+
+    async def client(client_paths):
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        for path in client_paths:
+            start = time.perf_counter()
+            if await get(reader, writer, host, path) != 200:
+                errors += 1
+            timings.append((time.perf_counter() - start) * 1000)
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(paths[i::concurrency]) for i in range(concurrency)))
+    return timings, time.perf_counter() - start, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=4000, help="requêtes par niveau de concurrence")
+    parser.add_argument("--concurrency", default="1,8,32,64")
+    parser.add_argument("--distinct", type=int, default=1000, help="versets distincts interrogés")
+    parser.add_argument("--pool", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    with tempfile.TemporaryDirectory() as directory:
+        resources = os.path.join(directory, "resources")
+        os.makedirs(resources)
+        shutil.copy(EPUB_PATH, resources)
+        db_path = os.path.join(directory, "database.db")
+        init_db(db_path)
+        env = dict(os.environ, DATABASE_FILE=db_path, RESOURCES_PATH=resources, CATEGORY_MODE="auto")
+        env.pop("INGEST_EVENTS", None)
+        print("[INFO] Construction de la base (LSG.epub)", file=sys.stderr)
+        subprocess.run([sys.executable, MAIN, "ingest"], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+
+        refs = sample_references(db_path, args.distinct, args.seed)
+        rng = random.Random(args.seed)
+        print(f"{'cache':<8} {'clients':>7} {'p50 (ms)':>9} {'p99 (ms)':>9} {'req/s':>9} {'erreurs':>8}")
+        for label, cache_size in (("sans", 0), ("avec", 4096)):
+            for concurrency in levels:
+                # Un service neuf par mesure : le cache part vide à chaque fois
+                process, host, port = start_service(env, args.pool, cache_size)
+                try:
+                    paths = [f"/verse?ref={quote(rng.choice(refs))}" for _ in range(args.requests)]
+                    timings, elapsed, errors = asyncio.run(load(host, port, paths, concurrency))
+                finally:
+                    process.terminate()
+                    process.wait()
+                cuts = statistics.quantiles(timings, n=100, method="inclusive")
+                print(f"{label:<8} {concurrency:>7} {cuts[49]:>9.2f} {cuts[98]:>9.2f} "
+                      f"{len(timings) / elapsed:>9.0f} {errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
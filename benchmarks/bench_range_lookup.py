@@ -0,0 +1,103 @@
+"""
+Recherche "tous les contenus couvrant un verset" sur une table contents
+remplie de plages synthétiques : parcours complet (ancienne requête sans index),
+index B-tree sur (start, end) et R*Tree contents_span (verse_keys).
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_range_lookup [--ranges N] [--probes N]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.fixtures import open_bench_database
+from utils.db_bulk import apply_ingest_pragmas
+from utils.verse_keys import verse_ordinal
+
+COL_3_16 = verse_ordinal(50, 3, 16)
+
+QUERIES = {
+    "parcours complet": """
+        SELECT id FROM contents NOT INDEXED
+        WHERE start_ordinal <= ? AND end_ordinal >= ?""",
+    "B-tree (start, end)": """
+        SELECT id FROM contents INDEXED BY idx_bench_start_end
+        WHERE start_ordinal <= ? AND end_ordinal >= ?""",
+    "R*Tree": """
+        SELECT id FROM contents_span
+        WHERE start_ordinal <= ? AND end_ordinal >= ?""",
+}
+
+
+def random_range(rng):
+    """Plage de commentaire plausible : quelques versets, parfois plusieurs chapitres."""
+    position = rng.randrange(66)
+    chapter = rng.randint(1, 50)
+    verse = rng.randint(1, 40)
+    start = verse_ordinal(position, chapter, verse)
+    if rng.random() < 0.1:
+        end = verse_ordinal(position, chapter + rng.randint(1, 3), rng.randint(1, 40))
+    else:
+        end = start + rng.randint(0, 30)
+    return start, end
+
+
+def build_database(db_path, range_count, seed):
+    conn = open_bench_database(db_path, fulltext=False)
+    apply_ingest_pragmas(conn)
+    cursor = conn.cursor()
+    rng = random.Random(seed)
+    rows = ((2, start, end, "commentaire") for start, end in
+            (random_range(rng) for _ in range(range_count)))
+    cursor.executemany(
+        "INSERT INTO contents (book_id, start_ordinal, end_ordinal, text) VALUES (?, ?, ?, ?)",
+        rows,
+    )
+    cursor.execute("CREATE INDEX idx_bench_start_end ON contents (start_ordinal, end_ordinal)")
+    conn.commit()
+    return conn
+
+
+def time_query(cursor, sql, probes):
+    """Latences (ms) de la requête pour chaque verset sondé, et nombre total de résultats."""
+    timings = []
+    found = 0
+    for ordinal in probes:
+        start = time.perf_counter()
+        found += len(cursor.execute(sql, (ordinal, ordinal)).fetchall())
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ranges", type=int, default=1_000_000)
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        conn = build_database(os.path.join(directory, "ranges.db"), args.ranges, args.seed)
+        print(f"[INFO] {args.ranges:,} plages insérées en {time.perf_counter() - start:.1f} s")
+        cursor = conn.cursor()
+
+        rng = random.Random(args.seed + 1)
+        probes = [COL_3_16] + [random_range(rng)[0] for _ in range(args.probes - 1)]
+
+        print(f"{'méthode':<22} {'sondes':>7} {'médiane (ms)':>13} {'p95 (ms)':>10} {'résultats':>10}")
+        for label, sql in QUERIES.items():
+            # Le parcours complet est lent : on se contente de quelques sondes
+            sample = probes[:20] if label == "parcours complet" else probes
+            timings, found = time_query(cursor, sql, sample)
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            print(f"{label:<22} {len(sample):>7} {statistics.median(timings):>13.3f} "
+                  f"{p95:>10.3f} {found:>10}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Requêtes de plage et de chapitre (main.py query "Gen 1.1-3.5") : une
+connexion et une requête resolve_verse par verset, textes complets puis aperçu
+tronqué en Python (ancienne approche de main.py), contre iter_range (reference_resolver.py) : pages
+par clé, curseur lu au fil de l'eau, aperçu tronqué par SQL (substr).
+
+La base contient LSG et un commentaire synthétique : un bloc de --block-chars
+caractères tous les --block-verses versets.
+
+Mesures, pour un chapitre et pour une plage de plusieurs chapitres :
+  durée        (ms)
+  texte reçu   caractères sortis de SQLite vers Python
+  pic mémoire  tracemalloc (Kio), en consommant les contenus un à un
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_range_query [--block-chars 4000] [--block-verses 5]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fixtures import add_bible, add_book, open_bench_database
+from utils.canon import CANON_BOOKS
+from utils.commentary_parser import write_commentary_rows
+from utils.db_bulk import create_secondary_indexes
+from utils.reference_parser import parse_reference, reference_ordinals
+from utils.reference_resolver import get_book_aliases, iter_range, resolve_verse
+from utils.verse_keys import split_ordinal
+
+EPUB_PATH = os.path.join("resources", "LSG.epub")
+PREVIEW = 300
+REFERENCES = ["Ps 119", "Gen 1.1-3.5", "Mt 5-7"]
+
+
+def build_database(db_path, block_chars, block_verses):
+    conn = open_bench_database(db_path, fulltext=False)
+    add_bible(conn, "LSG", EPUB_PATH)
+    cursor = conn.cursor()
+    commentary_id = add_book(cursor, "Commentaire synthétique", 2)
+    cursor.execute("SELECT ordinal FROM verses ORDER BY ordinal")
+    ordinals = [row[0] for row in cursor.fetchall()]
+    filler = ("Commentaire du passage, paragraphe après paragraphe. " * (block_chars // 50 + 1))[:block_chars]
+    write_commentary_rows(cursor, commentary_id, (
+        (ordinals[index], ordinals[min(index + block_verses, len(ordinals)) - 1], filler)
+        for index in range(0, len(ordinals), block_verses)
+    ))
+    create_secondary_indexes(cursor)
+    conn.commit()
+    conn.close()
+
+
+def per_verse(db_path, cursor, start_ordinal, end_ordinal):
+    """Ancienne approche : un appel par verset de la plage, aperçu tronqué en Python."""
+    cursor.execute("SELECT ordinal FROM verses WHERE ordinal BETWEEN ? AND ? ORDER BY ordinal",
+                   (start_ordinal, end_ordinal))
+    received = 0
+    for ordinal in [row[0] for row in cursor.fetchall()]:
+        position, chapter, verse = split_ordinal(ordinal)
+        conn = sqlite3.connect(db_path)
+        results, _ = resolve_verse(conn.cursor(), get_book_aliases(db_path, conn.cursor()),
+                                   CANON_BOOKS[position][0], chapter, verse)
+        conn.close()
+        for row in results:
+            received += len(row[4])
+            row[4][:PREVIEW]
+    return received
+
+
+def streamed(db_path, cursor, start_ordinal, end_ordinal, preview=PREVIEW):
+    received = 0
+    for record in iter_range(cursor, start_ordinal, end_ordinal, preview):
+        received += len(record["text"])
+    return received
+
+
+def measure(func, *args):
+    """(durée ms, caractères reçus, pic mémoire Kio)."""
+    start = time.perf_counter()
+    received = func(*args)
+    elapsed = (time.perf_counter() - start) * 1000
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, received, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--block-chars", type=int, default=4000)
+    parser.add_argument("--block-verses", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "range.db")
+        build_database(db_path, args.block_chars, args.block_verses)
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        print(f"{'référence':<14} {'méthode':<28} {'durée (ms)':>10} {'texte reçu':>12} {'pic (Kio)':>10}")
+        for ref_str in REFERENCES:
+            start_ordinal, end_ordinal = reference_ordinals(parse_reference(ref_str))
+            for label, func, extra in (
+                ("par verset (ancien)", per_verse, ()),
+                ("iter_range, texte complet", streamed, (None,)),
+                (f"iter_range, substr {PREVIEW}", streamed, ()),
+            ):
+                elapsed, received, peak = measure(func, db_path, cursor, start_ordinal, end_ordinal, *extra)
+                print(f"{ref_str:<14} {label:<28} {elapsed:>10.1f} {received:>12} {peak:>10.0f}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
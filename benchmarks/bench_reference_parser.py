@@ -0,0 +1,144 @@
+"""
+Débit du parseur de références (utils/reference_parser) sur du texte réel :
+le texte complet d'un EPUB (par défaut niv.epub, dont les notes citent des
+centaines de références "Deut. 5:16–20", "Isaiah 13:10; 34:4"...), puis sur un
+texte synthétique dense. Comparaison avec l'ancienne regex de commentary_parser.
+
+Avant les mesures, les formes de REGRESSION_CASES (analyse de texte,
+parse_references) et de QUERY_CASES (requête explicite, parse_query) sont
+vérifiées ; en cas d'écart, [ERROR] et code de sortie 1.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_reference_parser [--repeat N] [epub]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import zipfile
+
+from utils.canon import CANON_BOOKS
+from utils.opf_reader import read_opf
+from utils.reference_parser import default_matcher, format_reference, parse_query, parse_references, scan_texts
+from utils.text_extractor import extract_text
+
+# Ancienne regex de commentary_parser (plages "Col 3:16-20" uniquement)
+LEGACY_PATTERN = re.compile(r"([1-3]?\s?[A-Z][a-z]+)\s+(\d+):(\d+)(?:–|-)(\d+)")
+
+# (texte, références attendues au format court de format_reference)
+REGRESSION_CASES = [
+    ("1 Jn 3.16", ["1Jn 3:16"]),
+    ("1 Co 13.4", ["1Co 13:4"]),
+    ("1Co 13.4", ["1Co 13:4"]),
+    ("2 Tm 3.16", ["2Tm 3:16"]),
+    ("1 R 19.12", ["1R 19:12"]),
+    ("1 Jean 3.16-18", ["1Jn 3:16-18"]),
+    ("JEAN 3.16", ["Jn 3:16"]),
+    ("colossiens 3.16", ["Col 3:16"]),
+    ("Comparer avec 1 Jn 3.16 et 1 Co 13.4-5", ["1Jn 3:16", "1Co 13:4-5"]),
+    ("Ex 3:5, 7, 2 Co 1", ["Ex 3:5", "Ex 3:7", "2Co 1"]),
+    ("(also 1 Esdras 9:34)", []),
+    ("His division numbers 74,600.", []),
+    ("Of Asaph. A psalm.\n\n1\nHear us", []),
+    ("So 3 men went; Is 53 and is 53:4", ["Es 53:4"]),
+    ("Col 0:0, Ps 0", []),
+]
+
+# Requêtes explicites (main.py query, batch) : ni filtre des noms ambigus ni chapitre 0
+QUERY_CASES = [
+    ("Is 53", ["Es 53"]),
+    ("is 53:4", ["Es 53:4"]),
+    ("Col 3.16", ["Col 3:16"]),
+    ("Gen 1.1; 2.3-5", ["Gen 1:1", "Gen 2:3-5"]),
+    ("Col 0:0", []),
+    ("Ps 0", []),
+]
+
+
+def check_regressions():
+    """Vérifie REGRESSION_CASES et QUERY_CASES ; retourne le nombre d'écarts."""
+    failures = 0
+    for parse, cases in ((parse_references, REGRESSION_CASES), (parse_query, QUERY_CASES)):
+        for text_content, expected in cases:
+            found = [format_reference(reference) for reference in parse(text_content)]
+            if found != expected:
+                print(f"[ERROR] {text_content!r} : attendu {expected}, {parse.__name__} {found}")
+                failures += 1
+    return failures
+
+
+def epub_texts(epub_path):
+    """Texte de chaque document du spine."""
+    with zipfile.ZipFile(epub_path) as archive:
+        return [extract_text(archive.read(zip_path))
+                for zip_path, media_type in read_opf(archive)["spine"]
+                if media_type in ("application/xhtml+xml", "text/html")]
+
+
+def synthetic_texts(count, seed):
+    """Paragraphes de commentaire factices, une référence toutes les ~80 lettres."""
+    rng = random.Random(seed)
+    forms = ["{b} {c}:{v}", "{b} {c}.{v}-{w}", "{b} {c}:{v}–{d}:{w}", "{b} {c}", "{b} {c}:{v}, {w}; {d}:{v}"]
+    texts = []
+    for _ in range(count // 10):
+        parts = []
+        for _ in range(10):
+            names = rng.choice(CANON_BOOKS)
+            book_name = rng.choice((names[0], names[1], names[2]))
+            chapter = rng.randint(1, 40)
+            verse = rng.randint(1, 30)
+            parts.append("Voir aussi le commentaire déjà cité sur le passage, "
+                         + rng.choice(forms).format(b=book_name, c=chapter, v=verse,
+                                                    w=verse + rng.randint(1, 9), d=chapter + 1)
+                         + ".")
+        texts.append(" ".join(parts))
+    return texts
+
+
+def best_of(func, repeat):
+    """(meilleur temps, résultat) sur 'repeat' appels."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def report(label, texts, repeat):
+    size = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+    legacy_time, legacy_found = best_of(
+        lambda: sum(1 for t in texts for _ in LEGACY_PATTERN.finditer(t)), repeat)
+    parser_time, parser_found = best_of(lambda: sum(1 for _ in scan_texts(texts)), repeat)
+    print(f"{label} ({size:.1f} Mo)")
+    print(f"  {'regex commentary_parser':<26} {legacy_found:>8} réf. {legacy_time * 1000:>8.0f} ms "
+          f"{legacy_found / legacy_time:>10,.0f} réf/s {size / legacy_time:>6.1f} Mo/s")
+    print(f"  {'reference_parser':<26} {parser_found:>8} réf. {parser_time * 1000:>8.0f} ms "
+          f"{parser_found / parser_time:>10,.0f} réf/s {size / parser_time:>6.1f} Mo/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("epub", nargs="?", default=os.path.join("resources", "niv.epub"))
+    parser.add_argument("--refs", type=int, default=100_000, help="taille du texte synthétique")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    default_matcher()
+    print(f"[INFO] Compilation du motif : {(time.perf_counter() - start) * 1000:.1f} ms")
+    failures = check_regressions()
+    if failures:
+        sys.exit(1)
+    print(f"[INFO] {len(REGRESSION_CASES)} formes de référence vérifiées.")
+
+    report(os.path.basename(args.epub), epub_texts(args.epub), args.repeat)
+    report(f"synthétique ({args.refs:,} références)", synthetic_texts(args.refs, 42), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Mémoire de pointe de l'ingestion d'un gros EPUB illustré : chargement complet
+par ebooklib (epub.read_epub + listes de sections) contre la lecture paresseuse
+du spine (opf_reader.iter_spine_documents, un document à la fois, médias ignorés).
+Chaque mesure tourne dans un processus neuf : pic RSS (VmHWM, Linux) au-delà du
+niveau atteint après les imports, et pic des allocations Python (tracemalloc).
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_spine_memory [--images-mb N] [--blocks N]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+import warnings
+from html import escape
+
+from ebooklib import epub
+
+from db.init_db import init_db
+from utils.bible_parser import extract_bible_rows
+from utils.canon import CANON_BOOKS, book_position
+from utils.commentary_parser import iter_commentary_rows, segment_commentary, write_commentary_rows
+from utils.epub_parser import parse_epub_generic
+from utils.introduction_parser import iter_introduction_rows, write_introduction_rows
+from utils.verse_keys import ensure_ordinal_schema
+
+warnings.filterwarnings("ignore", category=UserWarning, module="ebooklib.epub")
+warnings.filterwarnings("ignore", category=FutureWarning, module="ebooklib.epub")
+
+BIBLE_PATH = os.path.join("resources", "LSG.epub")
+
+
+def build_illustrated_epub(epub_path, bible_rows, block_count, images_mb, seed):
+    """
+    Commentaire synthétique : un document par livre biblique (en-têtes
+    "Colossiens 3.16-17" + paragraphes), chacun illustré d'images
+    incompressibles totalisant 'images_mb' Mo.
+    """
+    rng = random.Random(seed)
+    by_book = {}
+    for book_name, chapter, verse, text_content in bible_rows:
+        by_book.setdefault(book_position(book_name), []).append((chapter, verse, text_content))
+    positions = sorted(by_book)
+    per_book = max(1, block_count // len(positions))
+    image_size = images_mb * 1_000_000 // len(positions)
+
+    book = epub.EpubBook()
+    book.set_identifier("bench-spine-memory")
+    book.set_title("Commentaire illustré")
+    book.set_language("fr")
+    chapters = []
+    for position in positions:
+        verses = by_book[position]
+        french_title = CANON_BOOKS[position][1]
+        image_name = f"images/plate_{position:02d}.jpg"
+        book.add_item(epub.EpubImage(uid=f"img{position}", file_name=image_name,
+                                     media_type="image/jpeg", content=os.urandom(image_size)))
+        html = [f"<h1>{escape(french_title)}</h1>", f'<p><img src="{image_name}"/></p>']
+        step = max(1, len(verses) // per_book)
+        for index in range(0, len(verses), step):
+            chapter, verse, _ = verses[index]
+            html.append(f"<h3>{escape(french_title)} {chapter}.{verse}-{verse + rng.randint(0, 3)}</h3>")
+            sample = " ".join(v[2] for v in rng.sample(verses, min(3, len(verses))))
+            html.append(f"<p>{escape(sample)}</p>")
+        item = epub.EpubHtml(title=french_title, file_name=f"book_{position:02d}.xhtml", lang="fr")
+        item.content = "<html><body>" + "\n".join(html) + "</body></html>"
+        book.add_item(item)
+        chapters.append(item)
+
+    book.toc = chapters
+    book.spine = chapters
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    epub.write_epub(epub_path, book)
+
+
+def ebooklib_commentary(cursor, epub_path):
+    """Ancien chemin : EPUB entier chargé, liste des sections, liste des blocs."""
+    sections = parse_epub_generic(epub_path)["sections"]
+    rows = list(segment_commentary(text_content for _, text_content in sections))
+    return write_commentary_rows(cursor, 99, rows)
+
+
+def lazy_commentary(cursor, epub_path):
+    return write_commentary_rows(cursor, 99, iter_commentary_rows(epub_path))
+
+
+def ebooklib_introduction(cursor, epub_path):
+    sections = parse_epub_generic(epub_path)["sections"]
+    rows = [(text_content,) for _, text_content in sections]
+    return write_introduction_rows(cursor, 99, rows)
+
+
+def lazy_introduction(cursor, epub_path):
+    return write_introduction_rows(cursor, 99, iter_introduction_rows(epub_path))
+
+
+VARIANTS = {
+    "commentary ebooklib": ebooklib_commentary,
+    "commentary paresseux": lazy_commentary,
+    "intro ebooklib": ebooklib_introduction,
+    "intro paresseux": lazy_introduction,
+}
+
+
+def peak_rss_kb():
+    """
+    Pic de mémoire résidente du processus (Ko). VmHWM plutôt que ru_maxrss :
+    ce dernier hérite du pic du processus parent à travers fork/exec.
+    """
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return 0
+
+
+def measure_variant(label, epub_path, db_path):
+    """Exécuté dans un processus neuf : (lignes, durée, pic RSS Mo, pic tracemalloc Mo)."""
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    ensure_ordinal_schema(cursor)
+    baseline = peak_rss_kb()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    row_count = VARIANTS[label](cursor, epub_path)
+    conn.commit()
+    elapsed = time.perf_counter() - start
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    conn.close()
+
+    peak = peak_rss_kb()
+    return row_count, elapsed, (peak - baseline) / 1024, traced_peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images-mb", type=int, default=80)
+    parser.add_argument("--blocks", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    bible_rows = extract_bible_rows(BIBLE_PATH)
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        epub_path = os.path.join(directory, "illustrated.epub")
+        build_illustrated_epub(epub_path, bible_rows, args.blocks, args.images_mb, args.seed)
+        print(f"[INFO] EPUB synthétique : {os.path.getsize(epub_path) / 1e6:.1f} Mo")
+
+        print(f"{'chemin':<22} {'lignes':>8} {'durée (s)':>10} {'pic RSS (Mo)':>13} {'pic Python (Mo)':>16}")
+        for label in VARIANTS:
+            db_path = os.path.join(directory, f"{label.replace(' ', '_')}.db")
+            with context.Pool(1) as pool:
+                row_count, elapsed, rss, traced = pool.apply(measure_variant, (label, epub_path, db_path))
+            print(f"{label:<22} {row_count:>8,} {elapsed:>10.2f} {rss:>13.1f} {traced:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
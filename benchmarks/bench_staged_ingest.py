@@ -0,0 +1,157 @@
+"""
+Lectures pendant une ingestion (main.py ingest) : ingestion directe dans la
+base en service, contre ingestion par copie de travail publiée à la fin
+(--staged, utils/staging.py).
+
+La base en service contient LSG ; l'ingestion importe NIV (toute une Bible :
+réglages de chargement en masse, index secondaires supprimés puis recréés).
+Des lecteurs (processus séparés, connexions en lecture seule comme le service
+de requêtes) résolvent des versets de LSG tirés au hasard, d'abord base au
+repos, puis pendant l'ingestion.
+
+Modes :
+  direct (DELETE)   base en service en journal de rollback (base d'origine)
+  direct (WAL)      base en service déjà en WAL
+  staged            ingest --staged
+
+Par mode : durée de l'ingestion, lectures, latence p50 / p99 / max (ms),
+erreurs (database is locked...) et lectures qui ont vu un livre sans contenu
+(livre à moitié ingéré).
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_staged_ingest [--readers 2]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from db.init_db import init_db
+from utils.canon import CANON_BOOKS
+from utils.query_service import connect_read_only
+from utils.reference_resolver import get_book_aliases, resolve_verse
+from utils.verse_keys import split_ordinal
+
+MAIN = os.path.abspath("main.py")
+BASE_EPUB = os.path.join("resources", "LSG.epub")
+IMPORT_EPUB = os.path.join("resources", "niv.epub")
+IDLE_SECONDS = 2.0
+
+EMPTY_BOOKS_SQL = """
+SELECT COUNT(*) FROM books b
+WHERE NOT EXISTS (SELECT 1 FROM contents c WHERE c.book_id = b.id)
+"""
+
+
+def ingest(env, db_path, staged=False):
+    """main.py ingest dans un sous-processus ; retourne la durée (s)."""
+    command = [sys.executable, MAIN, "--db", db_path, "ingest"] + (["--staged"] if staged else [])
+    start = time.perf_counter()
+    subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def build_base(directory, env):
+    """Base en service avec LSG seule ; retourne son chemin."""
+    resources = os.path.join(directory, "resources")
+    os.makedirs(resources)
+    shutil.copy(BASE_EPUB, resources)
+    db_path = os.path.join(directory, "base.db")
+    init_db(db_path)
+    ingest(dict(env, RESOURCES_PATH=resources), db_path)
+    shutil.copy(IMPORT_EPUB, resources)
+    return db_path, resources
+
+
+def reader(db_path, seed, phase, stop, results):
+    """Résout des versets tant que 'stop' n'est pas levé ; lectures étiquetées par 'phase'."""
+    conn = connect_read_only(db_path)
+    cursor = conn.cursor()
+    aliases = get_book_aliases(db_path, cursor)
+    ordinals = [row[0] for row in cursor.execute("SELECT ordinal FROM verses").fetchall()]
+    rng = random.Random(seed)
+    timings = {"idle": [], "ingest": []}
+    errors = half_ingested = 0
+    while not stop.is_set():
+        position, chapter, verse = split_ordinal(rng.choice(ordinals))
+        start = time.perf_counter()
+        try:
+            resolve_verse(cursor, aliases, CANON_BOOKS[position][0], chapter, verse)
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        timings[phase.value.decode()].append((time.perf_counter() - start) * 1000)
+        if len(timings["ingest"]) % 100 == 1 and phase.value == b"ingest":
+            try:
+                half_ingested += cursor.execute(EMPTY_BOOKS_SQL).fetchone()[0] > 0
+            except sqlite3.OperationalError:
+                errors += 1
+    conn.close()
+    results.put((timings, errors, half_ingested))
+
+
+def run_mode(base_path, resources, env, directory, label, journal_mode, staged, readers):
+    db_path = os.path.join(directory, f"{label.split()[0]}-{journal_mode}.db")
+    shutil.copy(base_path, db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.close()
+
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    phase = context.Array("c", b"ingest")
+    phase.value = b"idle"
+    results = context.Queue()
+    processes = [context.Process(target=reader, args=(db_path, seed, phase, stop, results))
+                 for seed in range(readers)]
+    for process in processes:
+        process.start()
+    time.sleep(IDLE_SECONDS)
+    phase.value = b"ingest"
+    elapsed = ingest(dict(env, RESOURCES_PATH=resources), db_path, staged)
+    stop.set()
+    measures = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    idle = [value for timings, _, _ in measures for value in timings["idle"]]
+    during = [value for timings, _, _ in measures for value in timings["ingest"]]
+    errors = sum(measure[1] for measure in measures)
+    half_ingested = sum(measure[2] for measure in measures)
+    for phase_label, values, duration, phase_errors, phase_half in (("repos", idle, "-", "-", "-"),
+                                                                    ("ingestion", during, f"{elapsed:.1f}",
+                                                                     errors, half_ingested)):
+        if not values:
+            print(f"{label:<16} {phase_label:<10} {duration:>9} {0:>8}")
+            continue
+        p99 = statistics.quantiles(values, n=100, method="inclusive")[98] if len(values) > 1 else values[0]
+        print(f"{label:<16} {phase_label:<10} {duration:>9} {len(values):>8} {statistics.median(values):>8.3f} "
+              f"{p99:>8.3f} {max(values):>8.1f} {phase_errors:>8} {phase_half:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=2)
+    args = parser.parse_args()
+
+    env = dict(os.environ, CATEGORY_MODE="auto")
+    env.pop("INGEST_STAGED", None)
+    with tempfile.TemporaryDirectory() as directory:
+        base_path, resources = build_base(directory, env)
+        print(f"{'mode':<16} {'phase':<10} {'durée (s)':>9} {'lectures':>8} {'p50 (ms)':>8} {'p99 (ms)':>8} "
+              f"{'max (ms)':>8} {'erreurs':>8} {'livre vide':>10}")
+        for label, journal_mode, staged in (("direct (DELETE)", "delete", False),
+                                            ("direct (WAL)", "wal", False),
+                                            ("staged", "wal", True)):
+            run_mode(base_path, resources, env, directory, label, journal_mode, staged, args.readers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Suite de benchmarks d'ingestion et de requêtes sur les deux EPUB fournis
+(resources/LSG.epub, resources/niv.epub), résultats en JSON.
+
+Étapes mesurées pour chaque EPUB (meilleur temps sur --repeat passes) :
+  open          zipfile + container.xml + OPF (spine)
+  metadata      read_epub_metadata
+  extraction    HTML -> texte de tous les documents du spine (sans cache)
+  segmentation  notes retirées + découpage en versets (texte déjà extrait)
+  db_load       écriture des versets dans une base neuve + reconstruction des index
+Requêtes, sur la base contenant les deux Bibles (percentiles de latence) :
+  query         main.run_query (une connexion par référence et iter_range,
+                comme main.py query ; sortie écrite dans os.devnull)
+  single_warm   iter_range sur une connexion ouverte (aperçu PREVIEW_CHARS)
+  batch         resolve_batch par lots de --batch-size références
+
+Toutes les mesures sont en millisecondes (plus petit = meilleur).
+Avec --baseline, chaque mesure (sauf p99 et max) est comparée à un fichier de
+résultats précédent : une hausse de plus de --threshold (et de plus de
+--min-delta ms) est une régression, et le script se termine avec le code 1.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_suite [--output resultats.json] [--baseline reference.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+
+from db.init_db import init_db
+from main import PREVIEW_CHARS, run_query
+from utils.bible_parser import (iter_document_lines, iter_spine_texts, iter_verses,
+                                strip_footnotes, write_bible_rows)
+from utils.db_bulk import apply_ingest_pragmas, create_secondary_indexes, drop_secondary_indexes
+from utils.fulltext import ensure_fulltext_schema
+from utils.opf_reader import read_epub_metadata, read_opf
+from utils.reference_parser import parse_query, parse_reference, reference_ordinals
+from utils.reference_resolver import iter_range, resolve_batch
+from utils.verse_keys import ensure_ordinal_schema
+
+EPUBS = [os.path.join("resources", "LSG.epub"), os.path.join("resources", "niv.epub")]
+PERCENTILES = (50, 90, 99)
+# Étapes de quelques ms : davantage de passes pour un minimum stable
+CHEAP_REPEAT = 20
+# Mesures affichées mais jamais signalées comme régressions : quelques
+# échantillons isolés suffisent à les faire varier d'un facteur 2
+UNGATED_SUFFIXES = ("_p99", "_max")
+
+
+def best_ms(func, repeat):
+    """(meilleur temps en ms, résultat du dernier appel) sur 'repeat' appels."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def percentiles(samples):
+    """p50 / p90 / p99 / max (ms) d'une liste de latences."""
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    summary = {f"p{p}": cuts[p - 1] for p in PERCENTILES}
+    summary["max"] = max(samples)
+    return summary
+
+
+def new_database(db_path):
+    """Base neuve, migrée comme par parse_directory (clés canoniques + FTS)."""
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    ensure_ordinal_schema(cursor)
+    ensure_fulltext_schema(cursor)
+    conn.commit()
+    return conn
+
+
+def load_bibles(conn, bibles):
+    """Écrit les versets de chaque Bible (chemin de parse_bible) ; retourne le nombre de lignes."""
+    apply_ingest_pragmas(conn)
+    cursor = conn.cursor()
+    drop_secondary_indexes(cursor)
+    row_count = 0
+    for title, rows in bibles:
+        cursor.execute("INSERT INTO books (title, category_id) VALUES (?, 1)", (title,))
+        row_count += write_bible_rows(cursor, cursor.lastrowid, rows)
+        conn.commit()
+    create_secondary_indexes(cursor)
+    conn.commit()
+    return row_count
+
+
+def bench_stages(epub_path, directory, repeat):
+    """Mesures des étapes d'ingestion d'un EPUB ; retourne (mesures, versets)."""
+    def open_epub():
+        with zipfile.ZipFile(epub_path) as archive:
+            return read_opf(archive)["spine"]
+
+    metrics = {}
+    metrics["open"], _ = best_ms(open_epub, max(repeat, CHEAP_REPEAT))
+    metrics["metadata"], _ = best_ms(lambda: read_epub_metadata(epub_path), max(repeat, CHEAP_REPEAT))
+    metrics["extraction"], texts = best_ms(lambda: list(iter_spine_texts(epub_path)), repeat)
+    metrics["segmentation"], rows = best_ms(
+        lambda: list(iter_verses(strip_footnotes(iter_document_lines(texts)))), repeat)
+
+    # La création de la base vide n'est pas comptée : seule l'écriture l'est
+    db_path = os.path.join(directory, "stage.db")
+    timings = []
+    for _ in range(repeat):
+        conn = new_database(db_path)
+        start = time.perf_counter()
+        load_bibles(conn, [(os.path.basename(epub_path), rows)])
+        timings.append((time.perf_counter() - start) * 1000)
+        conn.close()
+    metrics["db_load"] = min(timings)
+    return metrics, rows
+
+
+def sample_references(cursor, count, seed):
+    """(référence, abréviation, chapitre, verset) tirés parmi les versets de la base."""
+    cursor.execute("""
+        SELECT bb.abbreviation, c.number, v.number
+        FROM verses v
+        JOIN chapters c ON c.id = v.chapter_id
+        JOIN bible_books bb ON bb.id = c.bible_book_id
+    """)
+    rows = cursor.fetchall()
+    rng = random.Random(seed)
+    picked = [rng.choice(rows) for _ in range(count)]
+    return [(f"{book} {chapter}:{verse}", book, chapter, verse) for book, chapter, verse in picked]
+
+
+def timed_calls(calls):
+    """Latences (ms) de chaque appel de la liste."""
+    timings = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def bench_queries(db_path, query_count, batch_size, seed):
+    """Percentiles de latence des recherches par référence (unitaire et par lot)."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    refs = sample_references(cursor, query_count, seed)
+
+    metrics = {}
+    # Unitaires, comme main.py query : une connexion par référence
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        timings = timed_calls([(lambda ref=ref: run_query(db_path, ref[0])) for ref in refs])
+    metrics.update({f"query_{name}": value for name, value in percentiles(timings).items()})
+
+    bounds = [reference_ordinals(parse_reference(ref[0])) for ref in refs]
+    timings = timed_calls([
+        (lambda bound=bound: list(iter_range(cursor, *bound, PREVIEW_CHARS))) for bound in bounds
+    ])
+    metrics.update({f"single_warm_{name}": value for name, value in percentiles(timings).items()})
+
+    parsed_refs = [(ref[0], parse_query(ref[0])) for ref in refs]
+    batches = [parsed_refs[i:i + batch_size] for i in range(0, len(parsed_refs), batch_size)]
+    timings = timed_calls([
+        (lambda batch=batch: list(resolve_batch(cursor, batch))) for batch in batches
+    ])
+    metrics.update({f"batch_{name}": value for name, value in percentiles(timings).items()})
+    metrics["batch_per_ref_mean"] = sum(timings) / len(refs)
+    conn.close()
+    return metrics
+
+
+def compare(current, baseline, threshold, min_delta):
+    """
+    Liste des régressions (nom, référence, actuel, ratio) : mesures plus lentes
+    de plus de 'threshold' (fraction) et de plus de 'min_delta' ms.
+    Les mesures p99 et max (UNGATED_SUFFIXES) ne sont pas comparées.
+    """
+    regressions = []
+    for name, value in current.items():
+        reference = baseline.get(name)
+        if not reference or name.endswith(UNGATED_SUFFIXES):
+            continue
+        if value > reference * (1 + threshold) and value - reference > min_delta:
+            regressions.append((name, reference, value, value / reference))
+    return regressions
+
+
+def print_table(metrics, baseline=None):
+    header = f"{'mesure':<40} {'ms':>10}"
+    if baseline is not None:
+        header += f" {'référence':>10} {'ratio':>7}"
+    print(header)
+    for name, value in metrics.items():
+        line = f"{name:<40} {value:>10.3f}"
+        if baseline is not None and baseline.get(name):
+            line += f" {baseline[name]:>10.3f} {value / baseline[name]:>7.2f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="fichier JSON où écrire les résultats")
+    parser.add_argument("--baseline", help="fichier JSON de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="hausse tolérée avant de signaler une régression (0.25 = +25 %%)")
+    parser.add_argument("--min-delta", type=float, default=0.1,
+                        help="écart minimal (ms) pour signaler une régression")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # Le cache d'extraction fausserait la mesure de l'étape "extraction"
+    os.environ.pop("EXTRACTION_CACHE", None)
+
+    metrics = {}
+    with tempfile.TemporaryDirectory() as directory:
+        bibles = []
+        for epub_path in EPUBS:
+            name = os.path.basename(epub_path)
+            print(f"[INFO] Étapes d'ingestion : {name}", file=sys.stderr)
+            stage_metrics, rows = bench_stages(epub_path, directory, args.repeat)
+            metrics.update({f"{name}/{stage}": value for stage, value in stage_metrics.items()})
+            bibles.append((name, rows))
+
+        print("[INFO] Base des deux Bibles et requêtes", file=sys.stderr)
+        db_path = os.path.join(directory, "queries.db")
+        conn = new_database(db_path)
+        load_bibles(conn, bibles)
+        conn.close()
+        query_metrics = bench_queries(db_path, args.queries, args.batch_size, args.seed)
+        metrics.update({f"queries/{name}": value for name, value in query_metrics.items()})
+
+    results = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "queries": args.queries,
+            "batch_size": args.batch_size,
+        },
+        "metrics": metrics,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"[INFO] Résultats écrits dans {args.output}", file=sys.stderr)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+    print_table(metrics, baseline)
+
+    if baseline is not None:
+        regressions = compare(metrics, baseline, args.threshold, args.min_delta)
+        for name, reference, value, ratio in regressions:
+            print(f"[WARN] Régression : {name} {reference:.3f} -> {value:.3f} ms (x{ratio:.2f})")
+        if regressions:
+            sys.exit(1)
+        print(f"[INFO] Aucune régression au-delà de +{args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Compression des textes de contents (utils/text_compression.py) sur les EPUB
+fournis : LSG et NIV ingérés comme Bibles (un verset par ligne) et comme
+introductions (une section entière par ligne, comme write_introduction_rows).
+
+Pour chaque seuil (--thresholds, caractères ; "-" : sans compression) :
+  taille       fichier après VACUUM, table contents (dbstat), durée de compression
+               (compress_book + fusion de l'index plein texte)
+  requêtes     médiane (ms) d'un verset (resolve_verse), d'un chapitre avec
+               aperçu (iter_range, 300 caractères), d'une section entière
+               (inflate_text) et d'une recherche plein texte (search_contents)
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_text_compression [--thresholds=-,1024,256,64] [--probes N]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from benchmarks.fixtures import EPUBS, add_bible, add_book, open_bench_database
+from utils.canon import CANON_BOOKS
+from utils.db_bulk import create_secondary_indexes
+from utils.fulltext import optimize_fulltext, search_contents
+from utils.introduction_parser import extract_introduction_rows, write_introduction_rows
+from utils.reference_resolver import get_book_aliases, iter_range, resolve_verse
+from utils.text_compression import compress_book, inflate_text
+from utils.verse_keys import split_ordinal, verse_ordinal
+
+SEARCHES = ["commencement", "Eternel berger", "grace*", "LORD shepherd", "lumière", "covenant"]
+
+
+def build_database(db_path):
+    conn = open_bench_database(db_path)
+    cursor = conn.cursor()
+    for title, path in EPUBS:
+        add_bible(conn, title, path)
+        write_introduction_rows(cursor, add_book(cursor, f"{title} (sections)", 3),
+                                extract_introduction_rows(path))
+        conn.commit()
+    create_secondary_indexes(cursor)
+    conn.commit()
+    conn.close()
+
+
+def compress_database(db_path, threshold):
+    """
+    Compresse tous les livres (threshold=None : aucun), fusionne l'index plein
+    texte, VACUUM ; retourne la durée (ms) hors VACUUM.
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    start = time.perf_counter()
+    cursor.execute("SELECT id FROM books")
+    for (book_id,) in cursor.fetchall():
+        if threshold is not None:
+            compress_book(cursor, book_id, threshold)
+    optimize_fulltext(cursor)
+    conn.commit()
+    elapsed = (time.perf_counter() - start) * 1000
+    cursor.execute("VACUUM")
+    conn.close()
+    return elapsed
+
+
+def table_size(cursor, name):
+    try:
+        return cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (name,)).fetchone()[0]
+    except sqlite3.OperationalError:
+        return None  # SQLite compilé sans dbstat
+
+
+def median_ms(calls):
+    timings = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--thresholds", default="-,1024,256,64")
+    parser.add_argument("--probes", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        base_path = os.path.join(directory, "base.db")
+        build_database(base_path)
+
+        print(f"{'seuil':>6} {'fichier (Mio)':>14} {'contents (Mio)':>15} {'compression (ms)':>17} "
+              f"{'verset':>8} {'chapitre':>9} {'section':>8} {'recherche':>10}")
+        for label in args.thresholds.split(","):
+            db_path = os.path.join(directory, f"threshold-{label}.db")
+            shutil.copy(base_path, db_path)
+            elapsed = compress_database(db_path, int(label) if label != "-" else None)
+
+            conn = sqlite3.connect(db_path)
+            cursor = conn.cursor()
+            aliases = get_book_aliases(db_path, cursor)
+            rng = random.Random(args.seed)
+            cursor.execute("SELECT ordinal FROM verses")
+            ordinals = [row[0] for row in cursor.fetchall()]
+            probes = [split_ordinal(rng.choice(ordinals)) for _ in range(args.probes)]
+            cursor.execute("SELECT id, book_id FROM contents WHERE start_ordinal IS NULL")
+            sections = cursor.fetchall()
+            section_probes = [rng.choice(sections) for _ in range(args.probes // 4)]
+
+            def read_section(content_id, book_id):
+                value = cursor.execute("SELECT text FROM contents WHERE id = ?", (content_id,)).fetchone()[0]
+                return inflate_text(cursor, book_id, value)
+
+            verse = median_ms([
+                (lambda p=p: resolve_verse(cursor, aliases, CANON_BOOKS[p[0]][0], p[1], p[2])) for p in probes])
+            chapter = median_ms([
+                (lambda p=p: list(iter_range(cursor, verse_ordinal(p[0], p[1], 0),
+                                             verse_ordinal(p[0], p[1], 999), 300)))
+                for p in probes[:200]])
+            section = median_ms([(lambda s=s: read_section(*s)) for s in section_probes])
+            search = median_ms([(lambda q=q: search_contents(cursor, q)) for q in SEARCHES * 5])
+            contents_size = table_size(cursor, "contents")
+            conn.close()
+
+            contents_label = f"{contents_size / 1048576:.1f}" if contents_size is not None else "?"
+            print(f"{label:>6} {os.path.getsize(db_path) / 1048576:>14.1f} {contents_label:>15} {elapsed:>17.0f} "
+                  f"{verse:>8.3f} {chapter:>9.3f} {section:>8.3f} {search:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare l'extraction du texte des documents d'un EPUB via BeautifulSoup
+(html.parser + get_text) et via utils.text_extractor (lxml), livre par livre.
+Vérifie aussi que les deux chemins produisent exactement le même texte.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_text_extraction [--repeat N] [epub ...]
+"""
+import argparse
+import glob
+import os
+import time
+import zipfile
+
+from bs4 import BeautifulSoup
+
+from utils.opf_reader import read_opf
+from utils.text_extractor import extract_text
+
+
+def load_documents(epub_path):
+    """Contenu brut (bytes) des documents XHTML du spine, hors mesure."""
+    with zipfile.ZipFile(epub_path) as archive:
+        spine = read_opf(archive)["spine"]
+        return [
+            archive.read(zip_path)
+            for zip_path, media_type in spine
+            if media_type in ("application/xhtml+xml", "text/html")
+        ]
+
+
+def bs4_text(html):
+    """Ancien chemin : arbre BeautifulSoup complet puis get_text."""
+    html_content = html.decode("utf-8", errors="ignore")
+    return BeautifulSoup(html_content, "html.parser").get_text(separator="\n")
+
+
+def best_of(func, documents, repeat):
+    """Meilleur temps (en secondes) sur 'repeat' passes de func sur tous les documents."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in documents:
+            func(html)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("epubs", nargs="*", help="EPUB à mesurer (défaut: resources/*.epub)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    epubs = args.epubs or sorted(glob.glob(os.path.join("resources", "*.epub")))
+    print(f"{'EPUB':<20} {'docs':>5} {'bs4 (ms)':>10} {'lxml (ms)':>10} {'speedup':>8} {'identique':>10}")
+    for epub_path in epubs:
+        documents = load_documents(epub_path)
+        mismatches = sum(1 for html in documents if bs4_text(html) != extract_text(html))
+        slow = best_of(bs4_text, documents, args.repeat)
+        fast = best_of(extract_text, documents, args.repeat)
+        status = "oui" if not mismatches else f"non ({mismatches})"
+        print(f"{os.path.basename(epub_path):<20} {len(documents):>5} {slow * 1000:>10.0f} "
+              f"{fast * 1000:>10.0f} {slow / fast:>7.1f}x {status:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Magasin de versets mmap (utils/verse_store.py) contre SQLite, sur LSG et NIV.
+
+Mesures :
+  export       durée de main.py export par traduction, taille du fichier
+               (contre la part de contents dans la base)
+  ouverture    open_verse_store + vérification du tampon (store_is_current)
+  requêtes     un verset (texte entier, puis 300 premiers caractères) et un
+               chapitre entier : resolve_verse, requête SQL directe par
+               verse_alignment, parallel_verses, contre le magasin
+  partage      --processes lecteurs qui parcourent tout le magasin : pages
+               du fichier partagées (Shared_*) contre privées, d'après
+               /proc/self/smaps (Linux)
+  cohérence    un UPDATE sur contents rend le magasin périmé
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.bench_verse_store [--probes N] [--processes 4]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from benchmarks.fixtures import build_bible_database
+from utils.canon import CANON_BOOKS
+from utils.reference_resolver import get_book_aliases, resolve_verse
+from utils.verse_keys import split_ordinal, verse_ordinal
+from utils.verse_store import (close_verse_store, export_verse_store, iter_range_bytes,
+                               open_verse_store, store_is_current, store_path, verse_text)
+from utils.versification import parallel_verses
+
+PREFIX = 300
+
+VERSE_SQL = """
+SELECT c.text FROM verse_alignment a JOIN contents c ON c.id = a.content_id
+WHERE a.canonical_ordinal = ? AND a.book_id = ?
+"""
+PREFIX_SQL = """
+SELECT substr(c.text, 1, ?) FROM verse_alignment a JOIN contents c ON c.id = a.content_id
+WHERE a.canonical_ordinal = ? AND a.book_id = ?
+"""
+
+
+def latencies(calls):
+    timings = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), statistics.quantiles(timings, n=100, method="inclusive")[98]
+
+
+def mapping_memory(path):
+    """(Rss, partagé, privé) en Kio de la projection de 'path' dans ce processus."""
+    values = {}
+    inside = False
+    with open("/proc/self/smaps") as f:
+        for line in f:
+            if line[0] in "0123456789abcdef" and "-" in line.split()[0]:
+                inside = line.rstrip().endswith(path)
+            elif inside:
+                name, _, rest = line.partition(":")
+                if name in ("Rss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    values[name] = values.get(name, 0) + int(rest.split()[0])
+    # Pages d'un fichier tout juste écrit : encore "Dirty" dans le cache, mais partagées
+    return (values.get("Rss", 0), values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0),
+            values.get("Private_Clean", 0) + values.get("Private_Dirty", 0))
+
+
+def reader(path, barrier, results):
+    """Lecteur : parcourt tout le magasin, attend les autres, relève sa mémoire."""
+    store = open_verse_store(path)
+    total = sum(len(str(data, "utf-8")) for _, data in iter_range_bytes(store, 0, verse_ordinal(65, 150, 999)))
+    barrier.wait()
+    results.put((total,) + mapping_memory(os.path.realpath(path)))
+    barrier.wait()
+    close_verse_store(store)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--probes", type=int, default=2000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "store.db")
+        book_ids = build_bible_database(db_path)
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+
+        print(f"{'export':<10} {'durée (ms)':>10} {'fichier (Kio)':>14} {'texte SQL (Kio)':>16}")
+        for title, book_id in book_ids.items():
+            start = time.perf_counter()
+            export_verse_store(cursor, book_id, store_path(directory, book_id))
+            elapsed = (time.perf_counter() - start) * 1000
+            conn.commit()
+            cursor.execute("SELECT SUM(length(CAST(text AS BLOB))) FROM contents WHERE book_id = ?", (book_id,))
+            print(f"{title:<10} {elapsed:>10.1f} {os.path.getsize(store_path(directory, book_id)) / 1024:>14.0f} "
+                  f"{cursor.fetchone()[0] / 1024:>16.0f}")
+
+        lsg = book_ids["LSG"]
+        path = store_path(directory, lsg)
+        opening = []
+        for _ in range(50):
+            start = time.perf_counter()
+            store = open_verse_store(path)
+            store_is_current(store, cursor)
+            opening.append((time.perf_counter() - start) * 1000)
+            close_verse_store(store)
+        print(f"\nouverture + tampon : {statistics.median(opening):.3f} ms (médiane)")
+
+        store = open_verse_store(path)
+        cursor.execute("SELECT canonical_ordinal FROM verse_alignment WHERE book_id = ?", (lsg,))
+        ordinals = [row[0] for row in cursor.fetchall()]
+        rng = random.Random(args.seed)
+        probes = [rng.choice(ordinals) for _ in range(args.probes)]
+        chapters = [split_ordinal(ordinal)[:2] for ordinal in probes[:200]]
+        aliases = get_book_aliases(db_path, cursor)
+
+        def by_resolver(ordinal):
+            position, chapter, verse = split_ordinal(ordinal)
+            return resolve_verse(cursor, aliases, CANON_BOOKS[position][0], chapter, verse)
+
+        print(f"\n{'requête':<36} {'médiane (ms)':>12} {'p99 (ms)':>10}")
+        rows = [
+            ("verset : resolve_verse", [(lambda o=o: by_resolver(o)) for o in probes]),
+            ("verset : SQL verse_alignment", [
+                (lambda o=o: cursor.execute(VERSE_SQL, (o, lsg)).fetchone()) for o in probes]),
+            ("verset : magasin", [(lambda o=o: verse_text(store, o)) for o in probes]),
+            (f"verset, {PREFIX} car. : SQL substr", [
+                (lambda o=o: cursor.execute(PREFIX_SQL, (PREFIX, o, lsg)).fetchone()) for o in probes]),
+            (f"verset, {PREFIX} car. : magasin", [(lambda o=o: verse_text(store, o, PREFIX)) for o in probes]),
+            ("chapitre : parallel_verses", [
+                (lambda c=c: parallel_verses(cursor, verse_ordinal(*c, 0), verse_ordinal(*c, 999), [lsg]))
+                for c in chapters]),
+            ("chapitre : magasin (str)", [
+                (lambda c=c: [str(data, "utf-8") for _, data in
+                              iter_range_bytes(store, verse_ordinal(*c, 0), verse_ordinal(*c, 999))])
+                for c in chapters]),
+            ("chapitre : magasin (memoryview)", [
+                (lambda c=c: list(iter_range_bytes(store, verse_ordinal(*c, 0), verse_ordinal(*c, 999))))
+                for c in chapters]),
+        ]
+        for label, calls in rows:
+            median, p99 = latencies(calls)
+            print(f"{label:<36} {median:>12.4f} {p99:>10.4f}")
+        close_verse_store(store)
+
+        if os.path.exists("/proc/self/smaps"):
+            context = multiprocessing.get_context("spawn")
+            barrier = context.Barrier(args.processes)
+            results = context.Queue()
+            processes = [context.Process(target=reader, args=(path, barrier, results))
+                         for _ in range(args.processes)]
+            for process in processes:
+                process.start()
+            measures = [results.get() for _ in processes]
+            for process in processes:
+                process.join()
+            print(f"\npartage : {args.processes} lecteurs, {measures[0][0]} caractères décodés chacun")
+            print(f"{'lecteur':<8} {'Rss (Kio)':>10} {'partagé (Kio)':>14} {'privé (Kio)':>12}")
+            for index, (_, rss, shared, private) in enumerate(measures):
+                print(f"{index:<8} {rss:>10} {shared:>14} {private:>12}")
+
+        store = open_verse_store(path)
+        cursor.execute("UPDATE contents SET text = text || '' WHERE id = (SELECT MIN(id) FROM contents WHERE book_id = ?)",
+                       (lsg,))
+        conn.commit()
+        print(f"\ncohérence : magasin à jour après un UPDATE de contents ? {store_is_current(store, cursor)}")
+        close_verse_store(store)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
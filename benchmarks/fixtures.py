@@ -0,0 +1,93 @@
+"""
+Bases de test communes aux benchmarks : schéma complet (init_db, clés
+canoniques, index plein texte) puis Bibles des EPUB fournis ; run_tests
+exécute les fonctions test_* des scripts de vérification (test_*.py).
+
+Module importé par les scripts de benchmarks/ (python -m benchmarks.<nom>
+depuis la racine du dépôt), pas un benchmark lui-même.
+"""
+import os
+import sqlite3
+import sys
+import traceback
+
+from db.init_db import init_db
+from utils.bible_parser import extract_bible_rows, write_bible_rows
+from utils.db_bulk import create_secondary_indexes
+from utils.fulltext import ensure_fulltext_schema
+from utils.parallel_ingest import run_ingestion_jobs
+from utils.verse_keys import ensure_ordinal_schema
+
+EPUBS = [("LSG", os.path.join("resources", "LSG.epub")), ("NIV", os.path.join("resources", "niv.epub"))]
+
+
+def open_bench_database(db_path, fulltext=True):
+    """Base neuve 'db_path' au schéma courant ; retourne une connexion ouverte."""
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    ensure_ordinal_schema(cursor)
+    if fulltext:
+        ensure_fulltext_schema(cursor)
+    conn.commit()
+    return conn
+
+
+def add_book(cursor, title, category_id):
+    """Ligne books ; retourne son id (pas de commit)."""
+    cursor.execute("INSERT INTO books (title, category_id) VALUES (?, ?)", (title, category_id))
+    return cursor.lastrowid
+
+
+def add_bible(conn, title, rows):
+    """
+    Écrit une Bible ('rows' : lignes d'extract_bible_rows, ou chemin de l'EPUB)
+    et valide ; retourne son book_id.
+    """
+    if isinstance(rows, str):
+        rows = extract_bible_rows(rows)
+    cursor = conn.cursor()
+    book_id = add_book(cursor, title, 1)
+    write_bible_rows(cursor, book_id, rows)
+    conn.commit()
+    return book_id
+
+
+def ingest_bibles(conn, bibles):
+    """Bibles [(titre, chemin EPUB)] ingérées par run_ingestion_jobs ; retourne leurs book_id."""
+    cursor = conn.cursor()
+    jobs = []
+    for title, epub_path in bibles:
+        jobs.append({"book_id": add_book(cursor, title, 1), "category": "bible", "epub_path": epub_path})
+        conn.commit()
+    run_ingestion_jobs(conn, jobs)
+    return [job["book_id"] for job in jobs]
+
+
+def build_bible_database(db_path, bibles=EPUBS):
+    """Base des Bibles [(titre, lignes ou chemin EPUB)], index secondaires compris ; retourne {titre: book_id}."""
+    conn = open_bench_database(db_path)
+    book_ids = {title: add_bible(conn, title, rows) for title, rows in bibles}
+    create_secondary_indexes(conn.cursor())
+    conn.commit()
+    conn.close()
+    return book_ids
+
+
+def run_tests(namespace):
+    """
+    Exécute les fonctions test_* de 'namespace' (globals() d'un script) dans
+    l'ordre du fichier ; [ERROR] par échec, puis code de sortie 1 s'il y en a.
+    """
+    tests = [func for name, func in namespace.items() if name.startswith("test_") and callable(func)]
+    failures = 0
+    for func in tests:
+        try:
+            func()
+        except Exception:
+            failures += 1
+            print(f"[ERROR] {func.__name__} :\n{traceback.format_exc().rstrip()}")
+    if failures:
+        print(f"[ERROR] {failures}/{len(tests)} vérifications en échec.")
+        sys.exit(1)
+    print(f"[INFO] {len(tests)} vérifications réussies.")
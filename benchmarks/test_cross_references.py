@@ -0,0 +1,144 @@
+"""
+Vérifications du graphe des co-citations (utils/cross_references) : poids
+décrémentés par le trigger quand un bloc est supprimé, et commentaire modifié
+réingéré en place (job "replace") : seules ses arêtes changent, le graphe est
+identique à une reconstruction complète.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.test_cross_references
+"""
+import os
+import tempfile
+import warnings
+from html import escape
+
+from ebooklib import epub
+
+from benchmarks.fixtures import add_book, open_bench_database, run_tests
+from utils.canon import book_position
+from utils.cross_references import ensure_citation_schema, index_citations, related_passages
+from utils.parallel_ingest import run_ingestion_jobs
+from utils.verse_keys import verse_ordinal
+
+warnings.filterwarnings("ignore", category=UserWarning, module="ebooklib.epub")
+warnings.filterwarnings("ignore", category=FutureWarning, module="ebooklib.epub")
+
+COL_3_16 = verse_ordinal(book_position("Col"), 3, 16)
+COL_3_17 = verse_ordinal(book_position("Col"), 3, 17)
+EP_5_19 = verse_ordinal(book_position("Ep"), 5, 19)
+EP_5_20 = verse_ordinal(book_position("Ep"), 5, 20)
+PS_23_1 = verse_ordinal(book_position("Ps"), 23, 1)
+
+
+def open_graph_database(directory):
+    conn = open_bench_database(os.path.join(directory, "graph.db"), fulltext=False)
+    ensure_citation_schema(conn.cursor())
+    conn.commit()
+    return conn
+
+
+def weight(cursor, ordinal, neighbor):
+    """Poids de l'arête dans les deux sens (None si absente) ; les deux doivent être égaux."""
+    weights = set()
+    for a, b in ((ordinal, neighbor), (neighbor, ordinal)):
+        row = cursor.execute("SELECT weight FROM cocitations WHERE ordinal = ? AND neighbor = ?", (a, b)).fetchone()
+        weights.add(row[0] if row else None)
+    assert len(weights) == 1, (ordinal, neighbor, weights)
+    return weights.pop()
+
+
+def graph_rows(cursor):
+    return cursor.execute("SELECT ordinal, neighbor, weight FROM cocitations ORDER BY ordinal, neighbor").fetchall()
+
+
+def build_commentary_epub(epub_path, title, blocks):
+    """Commentaire de Colossiens : un bloc (<h3> en-tête, <p> texte) par élément de 'blocks'."""
+    book = epub.EpubBook()
+    book.set_identifier(f"test-{title}-{len(blocks)}")
+    book.set_title(title)
+    book.set_language("fr")
+    book.add_author("Test")
+    html = ["<h1>Colossiens</h1>"]
+    for header, text_content in blocks:
+        html.append(f"<h3>{escape(header)}</h3>")
+        html.append(f"<p>{escape(text_content)}</p>")
+    item = epub.EpubHtml(title="Colossiens", file_name="col.xhtml", lang="fr")
+    item.content = "<html><body>" + "\n".join(html) + "</body></html>"
+    book.add_item(item)
+    book.toc = [item]
+    book.spine = [item]
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    epub.write_epub(epub_path, book)
+
+
+def test_deleted_block_decrements_its_edges():
+    with tempfile.TemporaryDirectory() as directory:
+        conn = open_graph_database(directory)
+        cursor = conn.cursor()
+        book_id = add_book(cursor, "Commentaire T", 2)
+        content_ids = []
+        for text_content in ("Voir Ep 5:19.", "Voir Ep 5:19 et Ps 23:1."):
+            cursor.execute("INSERT INTO contents (book_id, text, start_ordinal, end_ordinal) VALUES (?, ?, ?, ?)",
+                           (book_id, text_content, COL_3_16, COL_3_16))
+            content_ids.append(cursor.lastrowid)
+        assert index_citations(cursor, book_id) == 2
+        conn.commit()
+        assert weight(cursor, COL_3_16, EP_5_19) == 2
+        assert weight(cursor, COL_3_16, PS_23_1) == 1
+        assert weight(cursor, EP_5_19, PS_23_1) == 1
+
+        cursor.execute("DELETE FROM contents WHERE id = ?", (content_ids[1],))
+        assert weight(cursor, COL_3_16, EP_5_19) == 1
+        assert weight(cursor, COL_3_16, PS_23_1) is None
+        assert weight(cursor, EP_5_19, PS_23_1) is None
+        cursor.execute("SELECT COUNT(*) FROM content_citations WHERE content_id = ?", (content_ids[1],))
+        assert cursor.fetchone()[0] == 0
+
+        cursor.execute("DELETE FROM contents WHERE id = ?", (content_ids[0],))
+        assert weight(cursor, COL_3_16, EP_5_19) is None
+        assert related_passages(cursor, COL_3_16, COL_3_16) == []
+        conn.close()
+
+
+def test_changed_commentary_is_reindexed_in_place():
+    with tempfile.TemporaryDirectory() as directory:
+        conn = open_graph_database(directory)
+        cursor = conn.cursor()
+        first = os.path.join(directory, "a-1.epub")
+        other = os.path.join(directory, "b.epub")
+        build_commentary_epub(first, "Commentaire A", [("Col 3:16", "Voir Ep 5:19."),
+                                                       ("Col 3:17", "Voir Ep 5:20 et Ps 23:1.")])
+        build_commentary_epub(other, "Commentaire B", [("Col 3:16", "Voir Ep 5:19.")])
+        jobs = [{"book_id": add_book(cursor, "Commentaire A", 2), "category": "commentary", "epub_path": first},
+                {"book_id": add_book(cursor, "Commentaire B", 2), "category": "commentary", "epub_path": other}]
+        conn.commit()
+        run_ingestion_jobs(conn, jobs)
+        assert weight(cursor, COL_3_16, EP_5_19) == 2
+        assert weight(cursor, COL_3_17, EP_5_20) == 1
+        assert weight(cursor, EP_5_20, PS_23_1) == 1
+        assert related_passages(cursor, COL_3_16, COL_3_16)[0]["reference"] == "Ep 5:19"
+
+        # Commentaire A modifié : Col 3:16 renvoie désormais au Ps 23, le bloc Col 3:17 disparaît
+        second = os.path.join(directory, "a-2.epub")
+        build_commentary_epub(second, "Commentaire A", [("Col 3:16", "Voir Ps 23:1.")])
+        run_ingestion_jobs(conn, [{"book_id": jobs[0]["book_id"], "category": "commentary",
+                                   "epub_path": second, "replace": True}])
+        assert weight(cursor, COL_3_16, EP_5_19) == 1
+        assert weight(cursor, COL_3_16, PS_23_1) == 1
+        assert weight(cursor, COL_3_17, EP_5_20) is None
+        assert weight(cursor, EP_5_20, PS_23_1) is None
+        assert [passage["reference"] for passage in related_passages(cursor, COL_3_16, COL_3_16)] == ["Ps 23:1",
+                                                                                                    "Ep 5:19"]
+
+        incremental = graph_rows(cursor)
+        cursor.execute("DROP TABLE cocitations")
+        cursor.execute("DROP TABLE content_citations")
+        ensure_citation_schema(cursor)
+        conn.commit()
+        assert graph_rows(cursor) == incremental
+        conn.close()
+
+
+if __name__ == "__main__":
+    run_tests(globals())
@@ -0,0 +1,66 @@
+"""
+Vérifications du parseur de références (utils/reference_parser) : noms
+ambigus dans un texte suivi et dans une requête, chapitre et verset 0,
+listes de références.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.test_reference_parser
+"""
+from benchmarks.fixtures import run_tests
+from utils.reference_parser import format_reference, parse_query, parse_reference, parse_references, reference_ordinals
+from utils.verse_keys import verse_ordinal
+
+
+def found(parse, text_content):
+    return [format_reference(reference) for reference in parse(text_content)]
+
+
+def test_ambiguous_names_need_a_verse_in_free_text():
+    assert found(parse_references, "So 3 men went") == []
+    assert found(parse_references, "he 1 Samuel 6") == ["1S 6"]
+    assert found(parse_references, "Is 53 and is 53:4") == ["Es 53:4"]
+    assert found(parse_references, "So 3:4") == ["So 3:4"]
+
+
+def test_lowercase_name_with_chapter_is_a_word_in_free_text():
+    assert found(parse_references, "His division numbers 74,600.") == []
+    assert found(parse_references, "Of Asaph. A psalm.\n\n1\nHear us") == []
+    assert found(parse_references, "colossiens 3.16") == ["Col 3:16"]
+
+
+def test_ambiguous_names_are_kept_in_queries():
+    assert found(parse_query, "Is 53") == ["Es 53"]
+    assert found(parse_query, "is 53:4") == ["Es 53:4"]
+    assert found(parse_query, "so 3") == ["So 3"]
+    assert format_reference(parse_reference("Is 53")) == "Es 53"
+
+
+def test_chapter_or_verse_zero_is_rejected():
+    for text_content in ("Col 0:0", "Ps 0", "Col 3:0", "Col 0:16", "Col 3:0-2"):
+        assert found(parse_query, text_content) == [], text_content
+        assert found(parse_references, text_content) == [], text_content
+    assert parse_reference("Ps 0") is None
+    # Seul l'élément fautif d'une liste est écarté
+    assert found(parse_references, "Col 0:1; 3:16") == ["Col 3:16"]
+
+
+def test_lists():
+    assert found(parse_references, "Ex 3:5, 7, 2 Co 1") == ["Ex 3:5", "Ex 3:7", "2Co 1"]
+    assert found(parse_references, "Comparer avec 1 Jn 3.16 et 1 Co 13.4-5") == ["1Jn 3:16", "1Co 13:4-5"]
+    assert found(parse_query, "Gen 1.1; 2.3-5") == ["Gen 1:1", "Gen 2:3-5"]
+    assert found(parse_query, "Col 3:16; Ep 5:19") == ["Col 3:16", "Ep 5:19"]
+    assert format_reference(parse_reference("Gen 1.1; 2.3-5")) == "Gen 1:1"
+
+
+def test_ranges_and_chapters():
+    chapter, = parse_query("Ps 23")
+    assert chapter.start_verse is None and chapter.end_verse is None
+    position = chapter.position
+    assert reference_ordinals(chapter) == (verse_ordinal(position, 23, 1), verse_ordinal(position, 23, 999))
+    crossing, = parse_query("Col 3:16-4:2")
+    assert format_reference(crossing) == "Col 3:16-4:2"
+    assert reference_ordinals(crossing)[1] == verse_ordinal(crossing.position, 4, 2)
+
+
+if __name__ == "__main__":
+    run_tests(globals())
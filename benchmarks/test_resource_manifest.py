@@ -0,0 +1,101 @@
+"""
+Vérifications du manifeste d'ingestion (utils/resource_manifest) : delta de
+scan_resources entre deux passages (nouveau, inchangé, seulement touché,
+modifié, disparu) sur un répertoire temporaire.
+
+Usage (depuis la racine du dépôt) :
+    python -m benchmarks.test_resource_manifest
+"""
+import os
+import sqlite3
+import tempfile
+
+from benchmarks.fixtures import run_tests
+from utils.resource_manifest import ensure_manifest_table, forget_entry, record_ingestion, scan_resources
+
+
+def write_file(path, data, mtime_ns=None):
+    with open(path, "wb") as f:
+        f.write(data)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def paths(delta):
+    return {kind: sorted(entry["path"] for entry in entries) for kind, entries in delta.items()}
+
+
+def scanned_directory(directory):
+    """Base en mémoire dont le manifeste connaît a.epub, b.epub, c.epub et d.epub (book_id 1 à 4)."""
+    for book_id, name in enumerate(("a", "b", "c", "d"), start=1):
+        write_file(os.path.join(directory, f"{name}.epub"), f"contenu {name}".encode(), 1_000_000_000 * book_id)
+    write_file(os.path.join(directory, "notes.txt"), b"ignore")
+    cursor = sqlite3.connect(":memory:").cursor()
+    ensure_manifest_table(cursor)
+    delta = scan_resources(cursor, directory)
+    assert paths(delta) == {"new": ["a.epub", "b.epub", "c.epub", "d.epub"], "changed": [], "unchanged": [], "deleted": []}
+    for book_id, entry in enumerate(delta["new"], start=1):
+        record_ingestion(cursor, entry, book_id)
+    return cursor
+
+
+def test_unchanged_directory():
+    with tempfile.TemporaryDirectory() as directory:
+        cursor = scanned_directory(directory)
+        delta = scan_resources(cursor, directory)
+        assert paths(delta) == {"new": [], "changed": [], "unchanged": ["a.epub", "b.epub", "c.epub", "d.epub"],
+                                "deleted": []}
+        assert [entry["book_id"] for entry in delta["unchanged"]] == [1, 2, 3, 4]
+
+
+def test_deltas():
+    with tempfile.TemporaryDirectory() as directory:
+        cursor = scanned_directory(directory)
+        # b : seulement touché ; c : même taille, autre contenu ; d : disparu ; e : nouveau
+        write_file(os.path.join(directory, "b.epub"), b"contenu b", 9_000_000_000)
+        write_file(os.path.join(directory, "c.epub"), b"contenu C", 3_000_000_000)
+        os.utime(os.path.join(directory, "c.epub"), ns=(9_000_000_000, 9_000_000_000))
+        os.remove(os.path.join(directory, "d.epub"))
+        write_file(os.path.join(directory, "e.epub"), b"contenu e")
+
+        delta = scan_resources(cursor, directory)
+        assert paths(delta) == {"new": ["e.epub"], "changed": ["c.epub"], "unchanged": ["a.epub", "b.epub"],
+                                "deleted": ["d.epub"]}
+        changed, = delta["changed"]
+        deleted, = delta["deleted"]
+        assert changed["book_id"] == 3 and deleted["book_id"] == 4
+        assert delta["new"][0]["book_id"] is None and delta["new"][0]["sha256"]
+
+
+def test_touched_file_refreshes_the_manifest():
+    with tempfile.TemporaryDirectory() as directory:
+        cursor = scanned_directory(directory)
+        write_file(os.path.join(directory, "b.epub"), b"contenu b", 9_000_000_000)
+        scan_resources(cursor, directory)
+        cursor.execute("SELECT mtime_ns FROM ingestion_manifest WHERE path = 'b.epub'")
+        assert cursor.fetchone()[0] == 9_000_000_000
+
+
+def test_changed_file_stays_changed_until_recorded():
+    with tempfile.TemporaryDirectory() as directory:
+        cursor = scanned_directory(directory)
+        write_file(os.path.join(directory, "c.epub"), b"contenu c, 2e version")
+        assert paths(scan_resources(cursor, directory))["changed"] == ["c.epub"]
+        # Non réingéré (manifeste inchangé) : toujours "modifié" au passage suivant
+        delta = scan_resources(cursor, directory)
+        assert paths(delta)["changed"] == ["c.epub"]
+        record_ingestion(cursor, delta["changed"][0], 3)
+        assert paths(scan_resources(cursor, directory))["unchanged"] == ["a.epub", "b.epub", "c.epub", "d.epub"]
+
+
+def test_forgotten_file_is_no_longer_deleted():
+    with tempfile.TemporaryDirectory() as directory:
+        cursor = scanned_directory(directory)
+        os.remove(os.path.join(directory, "d.epub"))
+        assert paths(scan_resources(cursor, directory))["deleted"] == ["d.epub"]
+        forget_entry(cursor, "d.epub")
+        assert paths(scan_resources(cursor, directory))["deleted"] == []
+
+
+if __name__ == "__main__":
+    run_tests(globals())
@@ -1,154 +1,443 @@
 import sys
 import os
+import time
 import sqlite3
 
-# Import du script qui va gérer la mise à jour des ressources
-from utils.check_resources_update import parse_directory
+# Imports légers uniquement : la recherche d'une référence ne charge que sqlite3,
+# le parseur de références et le résolveur (sans compiler le motif complet des
+# noms de livres, voir reference_parser.parse_reference). L'ingestion (ebooklib, lxml...),
+# la recherche plein texte et le profilage sont importés dans leurs sous-commandes.
+from utils.reference_parser import format_reference, parse_query, parse_reference, reference_ordinals
+from utils.reference_resolver import iter_range, parse_range_key, range_key, resolve_batch
+from utils.settings import database_path
+from utils.verse_keys import ensure_ordinal_schema, has_ordinal_schema
 
-def parse_reference(ref_str):
+USAGE = """\
+Usage: python main.py [--db CHEMIN] [--profile[=rapport.txt]] <commande> ...
+  query  "Colossians 3.16" [--limit N] [--after CLÉ]
+                                   contenus liés à un verset, une plage ("Gen 1.1-3.5"),
+                                   un chapitre ("Ps 119") ou une liste ("Gen 1.1; 2.3-5"),
+                                   aperçus de 300 caractères ; --limit/--after : une seule référence
+  batch  <fichier|->               une référence par ligne, sortie JSON lines
+  parallel "Ps 3" [--book TITRE ...]  toutes les traductions, versets alignés
+  related "Col 3:16" [--limit 20]  passages cités avec ce verset dans les commentaires
+  search "grâce" [--category commentary] [--book TITRE] [--limit 20]
+  ingest [--workers N] [--category-mode auto|prompt|manual] [--staged]
+                                   met la base à jour avec les EPUB de $RESOURCES_PATH
+                                   (--staged : dans une copie, publiée à la fin)
+  serve  [--host 127.0.0.1] [--port 8765] [--pool 4] [--cache 4096]
+                                   service HTTP local (JSON), voir utils/query_service.py
+  export [--book ID ...] [--output DOSSIER]
+                                   magasins de versets mmap (utils/verse_store.py),
+                                   lus par serve (GET /text)
+  compress [--threshold 1024] [--book ID ...] [--decompress] [--vacuum]
+                                   compression zlib des textes longs (utils/text_compression.py)
+Base : --db, sinon $DATABASE_FILE (environnement ou .env), sinon db/database.db.
+Magasins : --output, sinon $VERSE_STORE_PATH, sinon db/verse_store/.
+Les anciennes formes restent acceptées : main.py "Col 3.16", --batch, --search."""
+
+COMMANDS = ("query", "batch", "parallel", "related", "search", "ingest", "serve", "export", "compress")
+# Anciennes options -> sous-commandes
+LEGACY_COMMANDS = {"--batch": "batch", "--search": "search"}
+# Aperçu des contenus affichés par query (tronqué dans SQLite)
+PREVIEW_CHARS = 300
+
+def open_database(db_path):
     """
-    Convertit 'Colossians 3.16' en (book_name, chapitre, verset).
-    Exemples de formats attendus :
-      - 'Colossians 3.16'
-      - 'Gen 1.1'
-    On peut ajuster la logique selon tes besoins (regex, etc.).
+    Connexion pour les commandes de recherche. La base doit exister (sinon
+    sqlite3 créerait un fichier vide) ; une base antérieure aux clés canoniques
+    est migrée une fois (verse_keys), sans écriture les fois suivantes.
     """
-    # Séparation (simplifiée) sur l'espace pour livre + la partie chap.verset
-    # ex: "Colossians 3.16" => ["Colossians", "3.16"]
-    parts = ref_str.split(" ", 1)
-    if len(parts) < 2:
-        return None, None, None
+    if not os.path.exists(db_path):
+        raise SystemExit(f"[ERROR] Base introuvable : {db_path} "
+                         f"(python main.py ingest, ou --db / $DATABASE_FILE).")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    if not has_ordinal_schema(cursor):
+        ensure_ordinal_schema(cursor)
+        conn.commit()
+    return conn
 
-    book_name = parts[0]
-    chap_verse = parts[1]
+def read_reference_lines(source):
+    """Références non vides, une par ligne, lues dans 'source' ('-' = stdin)."""
+    if source == "-":
+        lines = sys.stdin
+    else:
+        lines = open(source, encoding="utf-8")
+    with lines:
+        for line in lines:
+            line = line.strip()
+            if line:
+                yield line
 
-    # Séparation du chapitre et verset par le point "."
-    cv_parts = chap_verse.split(".")
-    if len(cv_parts) < 2:
-        return book_name, None, None
+def run_query(db_path, reference_str, limit=None, after=None):
+    """
+    Affiche les contenus liés à une référence : un verset, une plage
+    ("Gen 1.1-3.5"), un chapitre entier ("Ps 119") ou une liste ("Gen 1.1; 2.3-5",
+    chaque référence sous son propre en-tête). Les contenus sont lus au fil de
+    l'affichage (iter_range : pages, aperçu tronqué par SQL) ; avec 'limit'
+    (une seule référence), la commande s'arrête après 'limit' contenus et
+    indique la valeur de --after qui reprend à la suite. Retourne les contenus affichés.
+    """
+    references = parse_query(reference_str)
+    if not references:
+        print(f"[ERROR] Impossible de parser la référence '{reference_str}' (format attendu: 'BookName X.Y').")
+        return []
+    if len(references) > 1 and (limit or after):
+        print("[ERROR] --limit et --after ne s'appliquent qu'à une seule référence, pas à une liste.")
+        return []
+    after_key = None
+    if after:
+        after_key = parse_range_key(after)
+        if after_key is None:
+            print(f"[ERROR] Valeur --after invalide : '{after}'.")
+            return []
 
-    try:
-        chapter = int(cv_parts[0])
-        verse = int(cv_parts[1])
-        return book_name, chapter, verse
-    except ValueError:
-        # Si le parsing échoue, on renvoie None
-        return book_name, None, None
+    conn = open_database(db_path)
+    cursor = conn.cursor()
+    results = []
+    for reference in references:
+        label = format_reference(reference) if len(references) > 1 else reference_str
+        if len(references) > 1:
+            print(f"===== {label}")
+        results.extend(print_range(cursor, reference, label, limit, after_key))
+    conn.close()
+    return results
 
-def search_contents_for_verse(db_path, book_name, chapter, verse):
+def print_range(cursor, reference, label, limit=None, after_key=None):
+    """Affichage de run_query pour une référence ; retourne les contenus affichés."""
+    start_ordinal, end_ordinal = reference_ordinals(reference)
+    results = []
+    for record in iter_range(cursor, start_ordinal, end_ordinal, PREVIEW_CHARS, after_key):
+        if limit and len(results) == limit:
+            print("-----")
+            print(f"[INFO] Suite : --after {range_key(results[-1])}")
+            break
+        results.append(record)
+        print("-----")
+        print(f"Source Book: {record['book_title']} (ID: {record['book_id']})")
+        print(f"Verses Range: {record['start_verse_id']} -> {record['end_verse_id']}")
+        print("Content:")
+        print(record["text"], "..." if record["truncated"] else "")  # aperçu : PREVIEW_CHARS premiers caractères
+
+    if not results and after_key is None:
+        cursor.execute("SELECT 1 FROM verses WHERE ordinal BETWEEN ? AND ? LIMIT 1", (start_ordinal, end_ordinal))
+        if cursor.fetchone() is None:
+            print(f"[WARN] Aucune correspondance pour {format_reference(reference)} dans la base.")
+        print(f"Aucun contenu trouvé pour {label}.")
+    return results
+
+def run_batch(db_path, source, output=None):
     """
-    Recherche tout ce qui concerne 'book_name chapter:verse'
-    dans la DB.
-    - Retrouve d'abord l'ID du livre biblique (bible_books)
-    - Puis l'ID du chapitre, l'ID du verset
-    - Enfin, récupère tous les contenus (bible, commentaire, intro)
-      dont la plage [start_verse_id, end_verse_id] inclut ce verset
+    Mode batch : résout toutes les références de 'source' (versets, plages,
+    chapitres, listes) avec une seule connexion et une requête ensembliste, et
+    écrit une ligne JSON par référence (voir reference_resolver.resolve_batch).
+    Retourne le nombre de références traitées.
     """
-    conn = sqlite3.connect(db_path)
+    import json
+
+    output = output or sys.stdout
+    conn = open_database(db_path)
     cursor = conn.cursor()
+    parsed_refs = ((ref_str, parse_query(ref_str)) for ref_str in read_reference_lines(source))
 
-    # 1. Trouver le livre biblique correspondant au 'book_name'
-    #    Ici on suppose que bible_books.title ou abbreviation match "Colossians", "Genèse", etc.
-    #    Ajuste selon ta table. On utilise un LIKE pour être souple.
-    cursor.execute("""
-        SELECT id FROM bible_books
-        WHERE title LIKE ? OR abbreviation LIKE ?
-        LIMIT 1
-    """, (f"%{book_name}%", f"%{book_name}%"))
-    row_bible_book = cursor.fetchone()
-    if not row_bible_book:
-        conn.close()
-        return [], f"[WARN] Aucune correspondance pour le livre '{book_name}' dans bible_books."
-
-    bible_book_id = row_bible_book[0]
-
-    # 2. Trouver le chapter_id correspondant
-    cursor.execute("""
-        SELECT id FROM chapters
-        WHERE bible_book_id = ?
-          AND number = ?
-        LIMIT 1
-    """, (bible_book_id, chapter))
-    row_chapter = cursor.fetchone()
-    if not row_chapter:
-        conn.close()
-        return [], f"[WARN] Aucune correspondance pour le chapitre {chapter} du livre {book_name}."
-
-    chapter_id = row_chapter[0]
-
-    # 3. Trouver le verse_id
-    cursor.execute("""
-        SELECT id FROM verses
-        WHERE chapter_id = ?
-          AND number = ?
-        LIMIT 1
-    """, (chapter_id, verse))
-    row_verse = cursor.fetchone()
-    if not row_verse:
-        conn.close()
-        return [], f"[WARN] Aucune correspondance pour le verset {chapter}.{verse} du livre {book_name}."
-
-    verse_id = row_verse[0]
-
-    # 4. Maintenant, on récupère tous les contenus (table 'contents')
-    #    dont la plage [start_verse_id, end_verse_id] inclut verse_id.
-    #    start_verse_id <= verse_id <= end_verse_id
-    #    On gère aussi le cas où start_verse_id = end_verse_id = verse_id
-    #    Ou le cas où start_verse_id ou end_verse_id est NULL => on l’ignore
-    #    ou on considère autrement (ex. contenu global). Adaptation selon besoin.
-    cursor.execute("""
-        SELECT c.id, c.book_id, c.start_verse_id, c.end_verse_id, c.text,
-               b.title AS book_title
-        FROM contents c
-        JOIN books b ON b.id = c.book_id
-        WHERE (c.start_verse_id IS NOT NULL AND c.end_verse_id IS NOT NULL
-               AND c.start_verse_id <= ?
-               AND c.end_verse_id >= ?)
-           OR (c.start_verse_id = ? AND c.end_verse_id = ?) -- si les deux identiques
-    """, (verse_id, verse_id, verse_id, verse_id))
-
-    results = cursor.fetchall()
+    count = 0
+    for record in resolve_batch(cursor, parsed_refs):
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
 
     conn.close()
+    return count
 
-    return results, None
+def run_parallel(db_path, reference_str, books=None):
+    """
+    Vue parallèle : le texte de chaque traduction pour un verset, un chapitre ou
+    une plage, aligné sur la versification de référence (Ml 3:19 de la TOB
+    en face de Ml 4:1 de la NIV, voir utils/versification.py).
+    """
+    from utils.versification import ensure_alignment_schema, parallel_ordinals, parallel_verses
 
-def main():
-    # Exemple d’utilisation :
-    # python main.py "Colossians 3.16"
-    # 1) Lance check_and_update_resources() pour mettre la DB à jour
-    # 2) Cherche la référence dans la DB
+    reference = parse_reference(reference_str)
+    if reference is None:
+        print(f"[ERROR] Impossible de parser la référence '{reference_str}' (format attendu: 'BookName X.Y').")
+        return []
 
-    if len(sys.argv) < 2:
-        print("Usage: python main.py \"Colossians 3.16\"")
-        return
+    conn = open_database(db_path)
+    cursor = conn.cursor()
+    ensure_alignment_schema(cursor)
+    conn.commit()
+    view = parallel_verses(cursor, *parallel_ordinals(reference), books)
+    conn.close()
 
-    reference_str = sys.argv[1]
+    if not view:
+        print(f"Aucune traduction trouvée pour {reference_str}.")
+    for verse in view:
+        print(f"== {verse['reference']} ==")
+        for translation in verse["translations"]:
+            label = translation["book_title"]
+            if translation["reference"] != verse["reference"]:
+                label += f", {translation['reference']}"
+            print(f"[{label}] {translation['text']}")
+    return view
+
+def run_related(db_path, reference_str, limit=20):
+    """
+    Passages cités dans les mêmes blocs de commentaire qu'un verset ou une
+    plage, classés par nombre de blocs (graphe précalculé, voir utils/cross_references.py).
+    """
+    from utils.cross_references import ensure_citation_schema, related_passages
 
-    # 1. Lancer la mise à jour des ressources
-    parse_directory()
-    # 2. Extraire "book_name", "chapitre", "verset" de la référence
-    book_name, chapter, verse = parse_reference(reference_str)
-    if not book_name or not chapter or not verse:
+    reference = parse_reference(reference_str)
+    if reference is None:
         print(f"[ERROR] Impossible de parser la référence '{reference_str}' (format attendu: 'BookName X.Y').")
+        return []
+
+    conn = open_database(db_path)
+    cursor = conn.cursor()
+    ensure_citation_schema(cursor)
+    conn.commit()
+    passages = related_passages(cursor, *reference_ordinals(reference), limit)
+    conn.close()
+
+    if not passages:
+        print(f"Aucun passage cité avec {format_reference(reference)}.")
+    for passage in passages:
+        print(f"{passage['weight']:>5}  {passage['reference']}")
+    return passages
+
+def run_search(db_path, query, category=None, book=None, limit=20):
+    """
+    Mode recherche plein texte :
+      python main.py search "grâce" [--category commentary] [--book "Titre"] [--limit 20]
+    Affiche les résultats classés par BM25, avec un extrait.
+    """
+    from utils.fulltext import ensure_fulltext_schema, search_contents
+
+    conn = open_database(db_path)
+    cursor = conn.cursor()
+    ensure_fulltext_schema(cursor)
+    conn.commit()
+    hits = search_contents(cursor, query, category, book, limit)
+    conn.close()
+
+    if not hits:
+        print(f"Aucun contenu trouvé pour '{query}'.")
+    for hit in hits:
+        print("-----")
+        print(f"Source Book: {hit['book_title']} (ID: {hit['book_id']}, {hit['category']})")
+        if hit["reference"]:
+            print(f"Reference: {hit['reference']}")
+        print(f"Score: {hit['score']:.2f}")
+        print(hit["snippet"])
+    return hits
+
+def run_ingest(workers=None, category_mode=None, staged=None):
+    """Met la base à jour avec les EPUB nouveaux ou modifiés (voir check_resources_update)."""
+    from utils.check_resources_update import parse_directory
+
+    parse_directory(workers=workers, category_mode=category_mode, staged=staged)
+
+def run_serve(db_path, host, port, pool_size, cache_size):
+    """Service de requêtes HTTP (verset, plage, lot, plein texte) jusqu'à Ctrl+C."""
+    from utils.query_service import serve
+
+    serve(db_path, host, port, pool_size, cache_size)
+
+def run_export(db_path, books=None, directory=None):
+    """
+    Exporte chaque Bible (ou les id 'books') en magasin de versets compact,
+    lu par mmap sans passer par SQLite (voir utils/verse_store.py) ; le
+    service (serve, GET /text) lit les magasins de $VERSE_STORE_PATH.
+    """
+    from utils.settings import verse_store_path
+    from utils.verse_store import export_verse_stores
+
+    directory = directory or verse_store_path()
+    conn = open_database(db_path)
+    cursor = conn.cursor()
+    exported = export_verse_stores(cursor, directory, books)
+    conn.commit()
+    conn.close()
+
+    if not exported:
+        print("[WARN] Aucune Bible à exporter.")
+    for book_id, title, path, slot_count, size in exported:
+        print(f"[INFO] {title} (ID: {book_id}) : {slot_count} versets, {size / 1024:.0f} Kio -> {path}")
+    return exported
+
+def run_compress(db_path, threshold, books=None, decompress=False, vacuum=False):
+    """
+    Compresse (ou remet en clair) les textes d'au moins 'threshold' caractères,
+    livre par livre, puis affiche le gain ; --vacuum rend la place libérée au
+    système de fichiers. Les requêtes décompressent à la lecture.
+    """
+    from utils.fulltext import ensure_fulltext_schema, optimize_fulltext
+    from utils.text_compression import compress_book, compression_report, database_size, decompress_book
+
+    conn = open_database(db_path)
+    cursor = conn.cursor()
+    ensure_fulltext_schema(cursor)
+    conn.commit()
+    used_before, _ = database_size(cursor)
+    cursor.execute("SELECT id, title FROM books ORDER BY id")
+    for book_id, title in cursor.fetchall():
+        if books and book_id not in books:
+            continue
+        if decompress:
+            print(f"[INFO] {title} (ID: {book_id}) : {decompress_book(cursor, book_id)} textes remis en clair")
+        else:
+            rows, plain_size, compressed_size = compress_book(cursor, book_id, threshold)
+            if rows:
+                print(f"[INFO] {title} (ID: {book_id}) : {rows} textes, "
+                      f"{plain_size / 1024:.0f} -> {compressed_size / 1024:.0f} Kio")
+        conn.commit()
+    if decompress:
+        # Chaque texte remis en clair a été réindexé : segments FTS à fusionner
+        optimize_fulltext(cursor)
+        conn.commit()
+    if vacuum:
+        cursor.execute("VACUUM")
+    used_after, free_after = database_size(cursor)
+
+    print(f"{'livre':<40} {'contenus':>9} {'compressés':>11} {'texte (Kio)':>12}")
+    for book_id, title, rows, compressed, stored in compression_report(cursor):
+        print(f"{title[:40]:<40} {rows:>9} {compressed or 0:>11} {stored / 1024:>12.0f}")
+    print(f"[INFO] Pages utilisées : {used_before / 1048576:.1f} -> {used_after / 1048576:.1f} Mio"
+          f" ; fichier : {os.path.getsize(db_path) / 1048576:.1f} Mio"
+          + ("" if vacuum else f" dont {free_after / 1048576:.1f} Mio libres (--vacuum pour les rendre)"))
+    conn.close()
+
+def build_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="main.py", usage=USAGE)
+    parser.add_argument("--db", help="chemin de la base SQLite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query = commands.add_parser("query")
+    query.add_argument("reference")
+    query.add_argument("--limit", type=int, help="nombre maximal de contenus affichés")
+    query.add_argument("--after", help="reprend après cette clé (affichée quand --limit coupe la liste)")
+
+    batch = commands.add_parser("batch")
+    batch.add_argument("source", nargs="?", default="-")
+
+    parallel = commands.add_parser("parallel")
+    parallel.add_argument("reference")
+    parallel.add_argument("--book", action="append", help="titre exact ou id de la table books (répétable)")
+
+    related = commands.add_parser("related")
+    related.add_argument("reference")
+    related.add_argument("--limit", type=int, default=20)
+
+    search = commands.add_parser("search")
+    search.add_argument("query")
+    search.add_argument("--category", choices=("bible", "commentary", "intro"))
+    search.add_argument("--book", help="titre exact ou id de la table books")
+    search.add_argument("--limit", type=int, default=20)
+
+    ingest = commands.add_parser("ingest")
+    ingest.add_argument("--workers", type=int, help="processus d'extraction (défaut : $INGEST_WORKERS ou 1)")
+    ingest.add_argument("--category-mode", choices=("auto", "prompt", "manual"))
+    ingest.add_argument("--staged", action="store_true", default=None,
+                        help="copie de travail publiée à la fin (défaut : $INGEST_STAGED)")
+
+    serve = commands.add_parser("serve")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765, help="0 : port libre choisi par le système")
+    serve.add_argument("--pool", type=int, default=4, help="connexions en lecture seule (et threads)")
+    serve.add_argument("--cache", type=int, default=4096, help="réponses gardées en cache (0 : sans cache)")
+
+    export = commands.add_parser("export")
+    export.add_argument("--book", type=int, action="append", help="id de la table books (répétable)")
+    export.add_argument("--output", help="dossier des magasins")
+
+    compress = commands.add_parser("compress")
+    compress.add_argument("--threshold", type=int, default=1024, help="taille minimale (caractères)")
+    compress.add_argument("--book", type=int, action="append", help="id de la table books (répétable)")
+    compress.add_argument("--decompress", action="store_true", help="remet les textes en clair")
+    compress.add_argument("--vacuum", action="store_true", help="réduit le fichier après coup")
+    return parser
+
+def split_profile_option(argv):
+    """
+    Retire '--profile' ou '--profile=rapport.txt' des arguments.
+    Retourne (arguments restants, chemin du rapport ou None).
+    """
+    remaining = []
+    profile_path = None
+    for arg in argv:
+        if arg == "--profile" or arg.startswith("--profile="):
+            profile_path = arg.partition("=")[2] or os.path.join(
+                "profiles", time.strftime("profile-%Y%m%d-%H%M%S.txt"))
+        else:
+            remaining.append(arg)
+    return remaining, profile_path
+
+def normalize_argv(argv):
+    """Anciennes formes ("Col 3.16", --batch, --search) -> sous-commandes."""
+    index = 0
+    while index < len(argv) and argv[index].startswith("--db"):
+        index += 1 if "=" in argv[index] else 2
+    if index >= len(argv) or argv[index] in COMMANDS or argv[index] in ("-h", "--help"):
+        return argv
+    head, command, rest = argv[:index], argv[index], argv[index + 1:]
+    if command in LEGACY_COMMANDS:
+        return head + [LEGACY_COMMANDS[command]] + rest
+    return head + ["query", command] + rest
+
+def main():
+    # --profile[=rapport.txt] : exécution sous cProfile + tracemalloc (voir utils/instrumentation.py)
+    argv, profile_path = split_profile_option(sys.argv[1:])
+    if not argv:
+        print(USAGE)
         return
+    if profile_path is None:
+        run(argv)
+        return
+    from utils.instrumentation import profiled
 
-    # 3. Ouvrir la DB et chercher tout ce qui concerne la référence
-    db_path = os.path.join("data", "bible_database.db")
-    results, warning = search_contents_for_verse(db_path, book_name, chapter, verse)
+    with profiled(profile_path):
+        run(argv)
 
-    if warning:
-        print(warning)
-    if results:
-        for row in results:
-            content_id, book_id, start_v, end_v, text, book_title = row
-            print("-----")
-            print(f"Source Book: {book_title} (ID: {book_id})")
-            print(f"Verses Range: {start_v} -> {end_v}")
-            print("Content:")
-            print(text[:300], "..." if len(text) > 300 else "")  # on affiche les 300 premiers caractères
-    else:
-        print(f"Aucun contenu trouvé pour {reference_str}.")
+def run(argv):
+    # Exemples :
+    # python main.py query "Colossians 3.16"
+    # python main.py query "Gen 1.1-3.5" --limit 20   (puis --after <clé affichée>)
+    # python main.py batch refs.txt      (ou batch - pour lire stdin)
+    # python main.py parallel "Ml 4:1-6"
+    # python main.py related "Col 3:16"
+    # python main.py search "grâce" --category commentary
+    # python main.py ingest --workers 4  (INGEST_EVENTS=- pour les événements JSON)
+    # python main.py ingest --staged     (les requêtes en cours ne voient que la base publiée)
+    # python main.py --profile ingest
+    # python main.py serve --port 8765    (GET /verse?ref=Col+3:16)
+    # python main.py export              (db/verse_store/book-<id>.verses)
+    # python main.py compress --vacuum   (TEXT_COMPRESSION_THRESHOLD=1024 : dès l'ingestion)
+    args = build_parser().parse_args(normalize_argv(argv))
+    if args.db:
+        # Un seul chemin pour toute l'exécution, parseurs d'ingestion compris
+        os.environ["DATABASE_FILE"] = args.db
+    db_path = database_path()
+
+    if args.command == "query":
+        run_query(db_path, args.reference, args.limit, args.after)
+    elif args.command == "batch":
+        run_batch(db_path, args.source)
+    elif args.command == "parallel":
+        run_parallel(db_path, args.reference, args.book)
+    elif args.command == "related":
+        run_related(db_path, args.reference, args.limit)
+    elif args.command == "search":
+        run_search(db_path, args.query, args.category, args.book, args.limit)
+    elif args.command == "ingest":
+        run_ingest(args.workers, args.category_mode, args.staged)
+    elif args.command == "serve":
+        run_serve(db_path, args.host, args.port, args.pool, args.cache)
+    elif args.command == "export":
+        run_export(db_path, args.book, args.output)
+    elif args.command == "compress":
+        run_compress(db_path, args.threshold, args.book, args.decompress, args.vacuum)
 
 if __name__ == "__main__":
     main()
@@ -1,12 +1,42 @@
 import re
 import sqlite3
 import os
-from .epub_parser import parse_epub_generic
-from dotenv import load_dotenv
-from ebooklib import epub
-from bs4 import BeautifulSoup
+from .canon import book_position, ensure_bible_books
+from .db_bulk import apply_ingest_pragmas, can_drop_secondary_indexes, drop_secondary_indexes, create_secondary_indexes
+from .extraction_cache import cached_extract_text
+from .instrumentation import count, stage
+from .opf_reader import iter_spine_documents
+from .verse_keys import ensure_ordinal_schema, verse_ordinal
+from .versification import align_translation, ensure_alignment_schema
+from .settings import database_path, setting
 
-load_dotenv()
+
+# Appel de note "[12]" laissé dans le texte par les <sup> de renvoi
+FOOTNOTE_MARK_PATTERN = re.compile(r"\[\d+\]")
+# Début d'un corps de note NIV : "1:5" ou "6:1-14" seul sur sa ligne (<i>1:5</i> Or ordain)
+FOOTNOTE_BODY_PATTERN = re.compile(r"^\d+:\d+(?:[-–,]\s?\d+(?::\d+)?)*[a-z]?$")
+# Numéro de verset : <sup>16</sup> donne une ligne ne contenant que "16"
+VERSE_NUMBER_PATTERN = re.compile(r"^\d+$")
+# Titre de chapitre : "Colossiens 3", "Titus 1", "1 Jean 4"
+CHAPTER_HEADING_PATTERN = re.compile(r"^(\d?\s?\D[^\d]{0,40}?)\s+(\d{1,3})$")
+# Titre d'un livre d'un seul chapitre : "Abdias", "3 Jean"
+BOOK_TITLE_PATTERN = re.compile(r"^(?:[1-3]\s?)?\D{2,40}$")
+
+# Marqueur de fin de document dans le flux de lignes
+DOCUMENT_BREAK = None
+
+
+def iter_spine_texts(epub_path):
+    """
+    Génère le texte brut (sans balises) de chaque document de l'EPUB,
+    un document à la fois, dans l'ordre du "spine".
+    Les documents sont lus directement dans l'archive (opf_reader) :
+    les images et polices ne sont jamais chargées.
+    Le texte d'un document déjà vu est relu dans le cache d'extraction (extraction_cache).
+    """
+    for _, content in iter_spine_documents(epub_path):
+        # Même sortie que BeautifulSoup.get_text
+        yield cached_extract_text(content)
 
 
 def flatten_epub(epub_path, output_path=None):
@@ -14,82 +44,371 @@ def flatten_epub(epub_path, output_path=None):
     Lit un fichier EPUB et crée un unique fichier texte
     contenant le contenu brut de tous les documents dans l'ordre de lecture,
     SANS balises HTML (uniquement le texte).
+    Conservé pour le débogage : parse_bible n'en a plus besoin.
     """
     # Déterminer le chemin de sortie si non fourni
     if output_path is None:
         base_name = os.path.splitext(os.path.basename(epub_path))[0]
         output_path = f"{base_name}_flattened.txt"
 
-    # 1. Lire l'EPUB
-    book = epub.read_epub(epub_path)
+    # Écrire dans le fichier de sortie document par document
+    with open(output_path, "w", encoding="utf-8") as f:
+        for index, text_content in enumerate(iter_spine_texts(epub_path)):
+            if index:
+                f.write("\n")
+            f.write(text_content)
+        f.write("\n")
 
-    # 2. Parcourir les éléments dans l'ordre du "spine"
-    #    (c'est la table qui définit l'ordre logique de lecture)
-    all_text_parts = []
+    print(f"[INFO] EPUB aplati (texte brut) et enregistré dans : {output_path}")
+    return output_path  # On retourne le chemin pour une utilisation ultérieure
 
-    for itemref in book.spine:
-        item_id = itemref[0]  # l'ID de l'item dans la liste spine
-        item = book.get_item_with_id(item_id)
 
-        # Vérifier qu'il s'agit bien d'un document (HTML/XHTML)
-        if item is not None:
-            # 3. Décoder le contenu HTML
-            html_content = item.get_content().decode("utf-8", errors="ignore")
+def iter_document_lines(texts):
+    """Découpe chaque texte en lignes, suivies de DOCUMENT_BREAK."""
+    for text_content in texts:
+        yield from text_content.split("\n")
+        yield DOCUMENT_BREAK
 
-            # Parser avec BeautifulSoup pour extraire uniquement le texte
-            soup = BeautifulSoup(html_content, "html.parser")
-            text_content = soup.get_text(separator="\n")
 
-            # Ajouter des délimiteurs pour repérer l'origine du fichier (optionnel)
-            all_text_parts.append(text_content)
+def is_block_break(line):
+    """
+    Vrai pour une ligne issue d'un nœud texte "\\n" entre deux balises bloc
+    (séparation de paragraphes). Une espace isolée entre deux balises en ligne
+    (ex. "<i>50:11</i> <i>Abel</i>") n'en est pas une.
+    """
+    return not line.strip("\r\t")
 
-    # 4. Écrire dans le fichier de sortie (pur texte ou .html sans balises)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(all_text_parts))
-        f.write("\n")
 
-    print(f"[INFO] EPUB aplati (texte brut) et enregistré dans : {output_path}")
-    return output_path  # On retourne le chemin pour une utilisation ultérieure
+def _is_note_paragraph(paragraph):
+    """Un paragraphe de notes commence par un appel [n], ou contient "[n]" suivi de "c:v"."""
+    previous_was_mark = False
+    first = True
+    for line in paragraph:
+        stripped = line.strip()
+        if not stripped:
+            continue
+        is_mark = FOOTNOTE_MARK_PATTERN.fullmatch(stripped) is not None
+        if first and is_mark:
+            return True
+        if previous_was_mark and FOOTNOTE_BODY_PATTERN.match(stripped):
+            return True
+        previous_was_mark = is_mark
+        first = False
+    return False
+
+
+def strip_footnotes(lines):
+    """
+    Retire du flux, paragraphe par paragraphe :
+      - les paragraphes de notes ("[1]" puis "1:5 Or ordain") ;
+      - les appels de note [n] dans le texte (une ligne qui ne contenait
+        que l'appel disparaît).
+    Un seul paragraphe est gardé en mémoire à la fois.
+    """
+    paragraph = []
+
+    def release():
+        if _is_note_paragraph(paragraph):
+            return
+        for line in paragraph:
+            cleaned = FOOTNOTE_MARK_PATTERN.sub("", line)
+            if len(cleaned) != len(line) and not cleaned.strip():
+                continue
+            yield cleaned
+
+    for line in lines:
+        if line is DOCUMENT_BREAK or is_block_break(line):
+            yield from release()
+            paragraph = []
+            yield line
+        else:
+            paragraph.append(line)
+    yield from release()
+
+
+def iter_verses(lines):
+    """
+    Détecte les frontières de versets dans un flux de lignes et génère
+    des tuples (nom_livre, chapitre, verset, texte) au fil de l'eau.
+    - Un numéro de verset est une ligne ne contenant qu'un nombre (<sup>16</sup>),
+      suivie d'un texte qui ne commence pas par une espace (sinon c'est un
+      nombre dans le texte, ex. "the <a>32</a> kings"). Dans un chapitre,
+      les numéros sont croissants.
+    - Un titre "Livre N" (ou "Livre" seul en tête de document, pour les livres
+      d'un seul chapitre) ouvre le chapitre N si le verset suivant est le 1 ;
+      sinon c'est un simple intertitre (ex. "Saying 1" dans Proverbes) recollé
+      au texte. Un titre qui revient en arrière dans le même livre (titres des
+      notes en fin de livre) clôt le texte biblique jusqu'au prochain chapitre.
+    - Les autres lignes sont ajoutées au verset courant ; une ligne vide
+      (séparation de paragraphes) devient une espace.
+    Le texte situé entre un titre de chapitre et son verset 1 est ignoré.
+    """
+    state = {
+        "book": None,
+        "chapter": None,
+        "verse": None,       # verset en cours de lecture
+        "last_verse": 0,     # plus grand numéro vu dans le chapitre
+        "closed": True,      # hors texte biblique (préface, notes, annexes)
+    }
+    parts = []
+    paragraph_break = False
+    # Titre candidat en attente de confirmation :
+    # (livre, chapitre, lignes lues depuis, titre numéroté ?)
+    pending = None
+    # Numéro lu, en attente de la ligne suivante pour savoir si c'est un verset
+    held_number = None
+    first_line_of_document = True
+
+    def flush():
+        text_content = "".join(parts).strip()
+        parts.clear()
+        if not state["closed"] and state["verse"] is not None and text_content:
+            return (state["book"], state["chapter"], state["verse"], text_content)
+        return None
+
+    def start_verse(number):
+        """Traite un numéro de verset confirmé ; renvoie le verset terminé éventuel."""
+        nonlocal pending
+        if pending is not None:
+            book_name, chapter, buffered, numbered = pending
+            pending = None
+            same_book = book_name == state["book"]
+            if number == 1 and not (same_book and chapter <= state["chapter"]):
+                # Titre confirmé : nouveau chapitre
+                record = flush()
+                state.update(book=book_name, chapter=chapter, verse=1,
+                             last_verse=1, closed=False)
+                return record
+            if numbered and same_book and chapter <= state["chapter"]:
+                # Retour en arrière dans le livre : notes ou annexes
+                record = flush()
+                state.update(verse=None, closed=True)
+                return record
+            # Faux titre : on le rend au verset courant
+            parts.extend(buffered)
+        if state["closed"]:
+            return None
+        if number <= state["last_verse"]:
+            parts.append(str(number))
+            return None
+        record = flush()
+        state.update(verse=number, last_verse=number)
+        return record
+
+    for line in lines:
+        if line is DOCUMENT_BREAK:
+            record = flush()
+            if record:
+                yield record
+            state["verse"], pending, held_number = None, None, None
+            paragraph_break = False
+            first_line_of_document = True
+            continue
 
-def clean_text(file_path):
+        stripped = line.strip()
+        if not stripped:
+            paragraph_break = True
+            continue
+
+        target = parts if pending is None else pending[2]
+        if held_number is not None:
+            if paragraph_break or line[0] in " \t":
+                # Nombre isolé dans le texte (renvoi, cellule de tableau)
+                target.append(str(held_number))
+            else:
+                record = start_verse(held_number)
+                if record:
+                    yield record
+                paragraph_break = False
+            held_number = None
+            target = parts if pending is None else pending[2]
+
+        if VERSE_NUMBER_PATTERN.match(line.rstrip("\r")):
+            held_number = int(stripped)
+            first_line_of_document = False
+            if paragraph_break and target:
+                target.append(" ")
+            paragraph_break = False
+            continue
+
+        if paragraph_break and target:
+            target.append(" ")
+        paragraph_break = False
+
+        heading = CHAPTER_HEADING_PATTERN.match(stripped)
+        bare_title = first_line_of_document and BOOK_TITLE_PATTERN.match(stripped)
+        first_line_of_document = False
+        if pending is not None and pending[3] and heading:
+            # Un titre numéroté est déjà en attente (ex. "Proverbs 23" puis
+            # l'intertitre "Saying 7") : le second n'est que du texte
+            heading = None
+        if heading or bare_title:
+            if pending is not None:
+                parts.extend(pending[2])
+            if heading:
+                pending = (heading.group(1).strip(), int(heading.group(2)), [line.replace("\r", "")], True)
+            else:
+                pending = (stripped, 1, [line.replace("\r", "")], False)
+            continue
+
+        target.append(line.replace("\r", ""))
+
+    record = flush()
+    if record:
+        yield record
+
+
+def _dump_lines(lines, dump_path):
+    """Recopie le flux de lignes dans dump_path (débogage) sans le modifier."""
+    with open(dump_path, "w", encoding="utf-8") as f:
+        for line in lines:
+            f.write("\n" if line is DOCUMENT_BREAK else line + "\n")
+            yield line
+    print(f"[INFO] Texte intermédiaire enregistré dans : {dump_path}")
+
+
+def iter_bible_verses(epub_path, dump_path=None):
     """
-    Ouvre le fichier texte `file_path`, effectue deux opérations :
-      1. Retire toutes les occurrences de type [n] (chiffres entre crochets).
-      2. Supprime les retours à la ligne sauf si la ligne suivante débute par un chiffre.
-         Dans ce dernier cas, on conserve un seul \n.
-    Puis réécrit le fichier nettoyé dans file_path.
+    Pipeline en flux : document du spine -> texte -> suppression des notes
+    -> détection des versets. Génère des tuples (nom_livre, chapitre, verset, texte)
+    sans fichier temporaire ; un seul document est en mémoire à la fois.
+    - dump_path : si fourni, le texte intermédiaire (notes retirées) y est écrit.
     """
+    lines = strip_footnotes(iter_document_lines(iter_spine_texts(epub_path)))
+    if dump_path is not None:
+        lines = _dump_lines(lines, dump_path)
+    yield from iter_verses(lines)
+
+
+def extract_bible_rows(epub_path):
+    """
+    Partie "CPU" du parsing d'une Bible, sans accès à la DB
+    (exécutable dans un processus worker, voir parallel_ingest).
+    Retourne la liste des tuples (nom_livre, chapitre, verset, texte).
+    Si BIBLE_DEBUG_DUMP désigne un dossier, le texte intermédiaire y est écrit.
+    """
+    dump_path = None
+    dump_dir = setting("BIBLE_DEBUG_DUMP")
+    if dump_dir:
+        base_name = os.path.splitext(os.path.basename(epub_path))[0]
+        dump_path = os.path.join(dump_dir, f"{base_name}_flattened.txt")
+    rows = list(iter_bible_verses(epub_path, dump_path=dump_path))
+    count("verses", len(rows))
+    return rows
 
-    # 1. Lire tout le contenu du fichier
-    with open(file_path, "r", encoding="utf-8") as f:
-        text_content = f.read()
+def _load_chapter_ids(cursor, min_id=0):
+    """(bible_book_id, numéro) -> chapters.id, pour les chapitres d'id > min_id."""
+    cursor.execute("SELECT id, bible_book_id, number FROM chapters WHERE id > ?", (min_id,))
+    return {(bible_book_id, number): chapter_id for chapter_id, bible_book_id, number in cursor}
 
-    # 2. Supprimer les motifs [nombre]
-    #    Regex : \[\d+\] => correspond à [123], [4], etc.
-    text_content = re.sub(r"\[\d+\]", "", text_content)
 
-    # 3. Gérer les retours à la ligne
-    #    - On veut conserver le \n si le caractère suivant est un digit (ex. 12),
-    #      et supprimer tous les \n sinon.
-    #
-    #    Explication de la regex : 
-    #      \n+(?!\d)
-    #      - \n+ : une ou plusieurs fins de ligne
-    #      - (?!\d) : si le prochain caractère n'est PAS un chiffre
-    #
-    #    On remplace cela par "" (pas d'espace) pour coller les lignes.
-    text_content = re.sub(r"\n+(?!\d)", "", text_content)
+def _load_verse_ids(cursor, min_id=0):
+    """(chapter_id, numéro) -> verses.id, pour les versets d'id > min_id."""
+    cursor.execute("SELECT id, chapter_id, number FROM verses WHERE id > ?", (min_id,))
+    return {(chapter_id, number): verse_id for verse_id, chapter_id, number in cursor}
 
-    # 4. Réécrire dans le fichier (en écrasant l’ancien contenu)
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(text_content)
 
-    print(f"[INFO] Fichier nettoyé et réécrit : {file_path}")
-    print("  - [chiffres] supprimés")
-    print("  - Retours à la ligne supprimés sauf devant un chiffre.")
+def _max_id(cursor, table):
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def write_bible_rows(cursor, book_id, rows):
+    """
+    Insère les versets produits par extract_bible_rows pour la traduction 'book_id'.
+    - chapters / verses sont partagés entre traductions : seuls les manquants sont créés ;
+    - chaque verset donne une ligne contents (start_verse_id = end_verse_id),
+      avec sa clé canonique (verse_keys) dans verses.ordinal et contents.start/end_ordinal ;
+    - les versets sont ensuite alignés sur la versification de référence
+      (versification.align_translation, table verse_alignment).
+    Le schéma doit avoir été migré (verse_keys.ensure_ordinal_schema).
+    Tout passe par executemany ; les id sont résolus en mémoire (pas de SELECT par verset).
+    Ne fait pas de commit : l'appelant valide la transaction du livre.
+    Retourne le nombre de lignes contents insérées.
+    """
+    bible_book_ids = ensure_bible_books(cursor)
+    ensure_alignment_schema(cursor)
+
+    # 1. Nom de livre (tel qu'écrit dans l'EPUB) -> bible_books.id / position canonique
+    book_ids = {}
+    positions = {}
+    unknown = set()
+    for book_name, _, _, _ in rows:
+        if book_name in book_ids or book_name in unknown:
+            continue
+        position = book_position(book_name)
+        if position is None:
+            unknown.add(book_name)
+            print(f"[WARN] Livre biblique inconnu '{book_name}', versets ignorés.")
+        else:
+            book_ids[book_name] = bible_book_ids[position]
+            positions[book_name] = position
+
+    # 2. Chapitres manquants
+    chapter_ids = _load_chapter_ids(cursor)
+    missing = []
+    for book_name, chapter, _, _ in rows:
+        key = (book_ids.get(book_name), chapter)
+        if key[0] is not None and key not in chapter_ids:
+            chapter_ids[key] = None
+            missing.append(key)
+    if missing:
+        first_new_id = _max_id(cursor, "chapters")
+        cursor.executemany("INSERT INTO chapters (bible_book_id, number) VALUES (?, ?)", missing)
+        chapter_ids.update(_load_chapter_ids(cursor, first_new_id))
+
+    # 3. Versets manquants
+    verse_ids = _load_verse_ids(cursor)
+    missing = []
+    for book_name, chapter, verse, _ in rows:
+        bible_book_id = book_ids.get(book_name)
+        if bible_book_id is None:
+            continue
+        key = (chapter_ids[(bible_book_id, chapter)], verse)
+        if key not in verse_ids:
+            verse_ids[key] = None
+            missing.append(key + (verse_ordinal(positions[book_name], chapter, verse),))
+    if missing:
+        first_new_id = _max_id(cursor, "verses")
+        cursor.executemany("INSERT INTO verses (chapter_id, number, ordinal) VALUES (?, ?, ?)",
+                           missing)
+        verse_ids.update(_load_verse_ids(cursor, first_new_id))
+
+    # 4. Texte des versets
+    contents = []
+    for book_name, chapter, verse, text_content in rows:
+        bible_book_id = book_ids.get(book_name)
+        if bible_book_id is None:
+            continue
+        verse_id = verse_ids[(chapter_ids[(bible_book_id, chapter)], verse)]
+        ordinal = verse_ordinal(positions[book_name], chapter, verse)
+        contents.append((book_id, verse_id, verse_id, ordinal, ordinal, text_content))
+    first_content_id = _max_id(cursor, "contents")
+    cursor.executemany(
+        """INSERT INTO contents (book_id, start_verse_id, end_verse_id,
+                                 start_ordinal, end_ordinal, text)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        contents,
+    )
+
+    # 5. Alignement des versifications (vue parallèle des traductions)
+    align_translation(cursor, book_id, first_content_id)
+    return len(contents)
+
+
+def clear_bible_rows(cursor, book_id):
+    """
+    Supprime les versets de la traduction 'book_id' avant sa réingestion ;
+    chapters / verses, partagés entre traductions, sont conservés et les
+    triggers retirent plages, entrées plein texte et alignements. Ne fait pas
+    de commit. Retourne le nombre de lignes supprimées.
+    """
+    cursor.execute("DELETE FROM contents WHERE book_id = ?", (book_id,))
+    return cursor.rowcount
+
 
 def parse_bible(epub_path, book_id):
-    db_path = os.environ["DATABASE_FILE"]
+    db_path = database_path()
     """
     Parse un EPUB de type 'Bible' et insère le texte verset par verset dans la DB.
     - epub_path: chemin vers l'EPUB
@@ -97,14 +416,25 @@ def parse_bible(epub_path, book_id):
     - book_id: ID de la table 'books' correspondant à ce livre
     """
     # 1. Extraire le contenu brut
-    result = parse_epub_generic(epub_path)
-    metadata = result["metadata"]
+    with stage("extract", epub=epub_path, category="bible"):
+        rows = extract_bible_rows(epub_path)
 
-    flatten_epub_path = flatten_epub(epub_path)
-    clean_text(flatten_epub_path)
-    # 2. Connexion DB
+    # 2. Connexion DB (réglages de chargement en masse ; sur une base vide,
+    #    index supprimés puis reconstruits après)
     conn = sqlite3.connect(db_path)
+    apply_ingest_pragmas(conn)
     cursor = conn.cursor()
-    conn.commit()
+    ensure_ordinal_schema(cursor)
+    drop_indexes = can_drop_secondary_indexes(cursor)
+    if drop_indexes:
+        drop_secondary_indexes(cursor)
+    with stage("write", epub=epub_path, category="bible", book_id=book_id):
+        row_count = write_bible_rows(cursor, book_id, rows)
+        count("rows_inserted", row_count)
+        conn.commit()
+    if drop_indexes:
+        with stage("index_rebuild"):
+            create_secondary_indexes(cursor)
+            conn.commit()
     conn.close()
-    print(f"[INFO] Bible parsed and inserted into DB. Book ID: {book_id}")
+    print(f"[INFO] Bible parsed and inserted into DB ({row_count} verses). Book ID: {book_id}")
@@ -0,0 +1,145 @@
+import re
+import unicodedata
+
+# Canon protestant (66 livres), dans l'ordre canonique.
+# (abréviation, titre français, titre anglais, testament, autres noms et abréviations FR/EN)
+# L'abréviation est celle stockée dans bible_books.abbreviation.
+CANON_BOOKS = [
+    ("Gen", "Genèse", "Genesis", "OT", ("Gn", "Ge")),
+    ("Ex", "Exode", "Exodus", "OT", ("Exod",)),
+    ("Lv", "Lévitique", "Leviticus", "OT", ("Lév", "Lev")),
+    ("Nb", "Nombres", "Numbers", "OT", ("Nomb", "Num")),
+    ("Dt", "Deutéronome", "Deuteronomy", "OT", ("Deut",)),
+    ("Jos", "Josué", "Joshua", "OT", ("Josh",)),
+    ("Jg", "Juges", "Judges", "OT", ("Jug", "Judg")),
+    ("Rt", "Ruth", "Ruth", "OT", ()),
+    ("1S", "1 Samuel", "1 Samuel", "OT", ("1 Sam",)),
+    ("2S", "2 Samuel", "2 Samuel", "OT", ("2 Sam",)),
+    ("1R", "1 Rois", "1 Kings", "OT", ("1 Kgs",)),
+    ("2R", "2 Rois", "2 Kings", "OT", ("2 Kgs",)),
+    ("1Ch", "1 Chroniques", "1 Chronicles", "OT", ("1 Chr", "1 Chron")),
+    ("2Ch", "2 Chroniques", "2 Chronicles", "OT", ("2 Chr", "2 Chron")),
+    ("Esd", "Esdras", "Ezra", "OT", ()),
+    ("Ne", "Néhémie", "Nehemiah", "OT", ("Néh", "Neh")),
+    ("Est", "Esther", "Esther", "OT", ("Esth",)),
+    ("Jb", "Job", "Job", "OT", ()),
+    ("Ps", "Psaumes", "Psalms", "OT", ("Psaume", "Psalm", "Pss")),
+    ("Pr", "Proverbes", "Proverbs", "OT", ("Prov",)),
+    ("Ec", "Ecclésiaste", "Ecclesiastes", "OT", ("Qohéleth", "Eccl", "Eccles", "Qo")),
+    ("Ct", "Cantique des cantiques", "Song of Songs", "OT", ("Cantique", "Song of Solomon", "Song")),
+    ("Es", "Ésaïe", "Isaiah", "OT", ("Isaïe", "Esaïe", "Esa", "Is", "Isa")),
+    ("Jr", "Jérémie", "Jeremiah", "OT", ("Jér", "Jer")),
+    ("Lm", "Lamentations", "Lamentations", "OT", ("Lam",)),
+    ("Ez", "Ézéchiel", "Ezekiel", "OT", ("Ézék", "Ezek")),
+    ("Dn", "Daniel", "Daniel", "OT", ("Dan",)),
+    ("Os", "Osée", "Hosea", "OT", ("Hos",)),
+    ("Jl", "Joël", "Joel", "OT", ()),
+    ("Am", "Amos", "Amos", "OT", ()),
+    ("Ab", "Abdias", "Obadiah", "OT", ("Obad",)),
+    ("Jon", "Jonas", "Jonah", "OT", ()),
+    ("Mi", "Michée", "Micah", "OT", ("Mic",)),
+    ("Na", "Nahum", "Nahum", "OT", ("Nah",)),
+    ("Ha", "Habacuc", "Habakkuk", "OT", ("Hab",)),
+    ("So", "Sophonie", "Zephaniah", "OT", ("Soph", "Zeph")),
+    ("Ag", "Aggée", "Haggai", "OT", ("Hag",)),
+    ("Za", "Zacharie", "Zechariah", "OT", ("Zach", "Zech")),
+    ("Ml", "Malachie", "Malachi", "OT", ("Mal",)),
+    ("Mt", "Matthieu", "Matthew", "NT", ("Matt", "Mat")),
+    ("Mc", "Marc", "Mark", "NT", ("Mk",)),
+    ("Lc", "Luc", "Luke", "NT", ("Lk",)),
+    ("Jn", "Jean", "John", "NT", ("Jhn",)),
+    ("Ac", "Actes", "Acts", "NT", ("Actes des apôtres",)),
+    ("Rm", "Romains", "Romans", "NT", ("Rom",)),
+    ("1Co", "1 Corinthiens", "1 Corinthians", "NT", ("1 Cor",)),
+    ("2Co", "2 Corinthiens", "2 Corinthians", "NT", ("2 Cor",)),
+    ("Ga", "Galates", "Galatians", "NT", ("Gal",)),
+    ("Ep", "Éphésiens", "Ephesians", "NT", ("Éph", "Eph")),
+    ("Ph", "Philippiens", "Philippians", "NT", ("Phil",)),
+    ("Col", "Colossiens", "Colossians", "NT", ()),
+    ("1Th", "1 Thessaloniciens", "1 Thessalonians", "NT", ("1 Thess",)),
+    ("2Th", "2 Thessaloniciens", "2 Thessalonians", "NT", ("2 Thess",)),
+    ("1Tm", "1 Timothée", "1 Timothy", "NT", ("1 Tim",)),
+    ("2Tm", "2 Timothée", "2 Timothy", "NT", ("2 Tim",)),
+    ("Tt", "Tite", "Titus", "NT", ("Tit",)),
+    ("Phm", "Philémon", "Philemon", "NT", ("Philém", "Phlm")),
+    ("He", "Hébreux", "Hebrews", "NT", ("Héb", "Heb")),
+    ("Jc", "Jacques", "James", "NT", ("Jac", "Jas")),
+    ("1P", "1 Pierre", "1 Peter", "NT", ("1 Pi", "1 Pet")),
+    ("2P", "2 Pierre", "2 Peter", "NT", ("2 Pi", "2 Pet")),
+    ("1Jn", "1 Jean", "1 John", "NT", ()),
+    ("2Jn", "2 Jean", "2 John", "NT", ()),
+    ("3Jn", "3 Jean", "3 John", "NT", ()),
+    ("Jude", "Jude", "Jude", "NT", ()),
+    ("Ap", "Apocalypse", "Revelation", "NT", ("Apoc", "Rev")),
+]
+
+_NON_ALNUM_PATTERN = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_book_name(name):
+    """
+    Clé de comparaison d'un nom de livre : sans accents, sans casse,
+    sans espaces ni ponctuation ("1 Jean" -> "1jean", "Ésaïe" -> "esaie").
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM_PATTERN.sub("", without_accents.casefold())
+
+
+def canon_names(position):
+    """Tous les noms connus (abréviation, titres FR/EN, alias) du livre à 'position'."""
+    abbreviation, french, english, _, aliases = CANON_BOOKS[position]
+    return (abbreviation, french, english) + aliases
+
+
+def _build_name_index():
+    index = {}
+    for position in range(len(CANON_BOOKS)):
+        for name in canon_names(position):
+            index.setdefault(normalize_book_name(name), position)
+    return index
+
+
+_NAME_INDEX = _build_name_index()
+
+
+def book_position(name):
+    """Position canonique (0 = Genèse) d'un nom de livre FR/EN, ou None."""
+    if not name:
+        return None
+    return _NAME_INDEX.get(normalize_book_name(name))
+
+
+def bible_book_ids(cursor):
+    """
+    Lignes existantes de bible_books, reconnues par leur titre ou abréviation
+    (lecture seule). Retourne un dict position_canonique -> bible_books.id.
+    """
+    ids = {}
+    cursor.execute("SELECT id, title, abbreviation FROM bible_books ORDER BY id")
+    for bible_book_id, title, abbreviation in cursor.fetchall():
+        position = book_position(title)
+        if position is None:
+            position = book_position(abbreviation)
+        if position is not None:
+            ids.setdefault(position, bible_book_id)
+    return ids
+
+
+def ensure_bible_books(cursor):
+    """
+    S'assure que les 66 livres canoniques existent dans bible_books
+    (les lignes existantes sont reconnues par bible_book_ids).
+    Retourne un dict position_canonique -> bible_books.id.
+    """
+    ids = bible_book_ids(cursor)
+    for position, (abbreviation, french, _, testament, _) in enumerate(CANON_BOOKS):
+        if position in ids:
+            continue
+        cursor.execute(
+            """INSERT INTO bible_books (title, abbreviation, is_old_testament, is_new_testament)
+               VALUES (?, ?, ?, ?)""",
+            (french, abbreviation, int(testament == "OT"), int(testament == "NT")),
+        )
+        ids[position] = cursor.lastrowid
+    return ids
@@ -0,0 +1,228 @@
+import json
+import os
+import zipfile
+
+from .canon import normalize_book_name
+from .commentary_parser import header_reference, iter_paragraphs
+from .opf_reader import DOCUMENT_TYPES, read_opf
+from .reference_parser import default_matcher, parse_references
+from .settings import setting
+from .text_extractor import extract_text
+
+# Détection automatique de la catégorie d'un EPUB (bible / commentary / intro),
+# sans prompt : on lit les premiers documents du spine par le chemin "texte
+# seul" (zipfile + OPF + lxml, pas d'ebooklib) et on mesure, pour 1000 caractères :
+#  - la densité de numéros de versets (<sup>16</sup>, ou lignes "16" isolées) ;
+#  - la densité de références ("Col 3:16", "Deut. 5:16–20"...) ;
+#  - les motifs de titres : titres de chapitre ("Genèse 1", typiques d'une Bible)
+#    et en-têtes de bloc ("Colossiens 3.16-17", typiques d'un commentaire).
+# Le titre de l'EPUB ("Bible", "Commentaire", "Introduction") donne un bonus.
+# Une introduction est ce qui reste : de la prose, peu de versets et d'en-têtes.
+
+# Nombre de documents échantillonnés (les pages de moins de MIN_DOCUMENT_CHARS
+# caractères - couverture, page de titre - ne comptent pas)
+SAMPLE_DOCUMENTS = 8
+# Arrêt de l'échantillonnage au-delà de ce volume de texte
+SAMPLE_CHARS = 250_000
+MIN_DOCUMENT_CHARS = 200
+# Confiance minimale pour accepter la catégorie sans intervention
+MIN_CONFIDENCE = 0.6
+
+CATEGORIES = ("bible", "commentary", "intro")
+CATEGORY_MODES = ("auto", "prompt", "manual")
+SIDECAR_EXTENSION = ".category"
+
+# Mots du titre qui orientent la décision (comparés après normalize_book_name)
+TITLE_HINTS = {
+    "bible": ("bible", "bibel", "biblia", "testament"),
+    "commentary": ("commentaire", "commentary", "commentaries", "exegese", "exegesis"),
+    "intro": ("introduction", "intro", "survey"),
+}
+TITLE_BONUS = 0.25
+
+
+def sample_texts(epub_path, sample_documents=SAMPLE_DOCUMENTS, sample_chars=SAMPLE_CHARS):
+    """
+    (titre OPF, liste de (texte, marqueurs)) des premiers documents XHTML du spine.
+    Les médias ne sont jamais décompressés.
+    """
+    samples = []
+    total = 0
+    with zipfile.ZipFile(epub_path) as archive:
+        opf = read_opf(archive)
+        for zip_path, media_type in opf["spine"]:
+            if media_type not in DOCUMENT_TYPES:
+                continue
+            text_content, markers = extract_text(archive.read(zip_path), markers=True)
+            if len(text_content.strip()) < MIN_DOCUMENT_CHARS:
+                continue
+            samples.append((text_content, markers))
+            total += len(text_content)
+            if len(samples) >= sample_documents or total >= sample_chars:
+                break
+    return opf["title"], samples
+
+
+def text_features(samples, matcher=None):
+    """Mesures (pour 1000 caractères) sur les textes échantillonnés."""
+    matcher = matcher or default_matcher()
+    chars = 0
+    verse_numbers = 0
+    references = 0
+    chapter_headings = 0
+    verse_headers = 0
+    for text_content, markers in samples:
+        chars += len(text_content)
+        verse_markers = sum(1 for kind, _, _ in markers if kind == "verse")
+        number_lines = sum(1 for line in text_content.split("\n")
+                           if line.strip().isdigit() and len(line.strip()) <= 3)
+        verse_numbers += max(verse_markers, number_lines)
+        references += sum(1 for _ in parse_references(text_content, matcher))
+        for paragraph in iter_paragraphs(text_content):
+            header = header_reference(paragraph, None, matcher)
+            if header is None or header.end < len(paragraph) // 2:
+                continue
+            if header.start_verse is None:
+                chapter_headings += 1
+            else:
+                verse_headers += 1
+
+    per_k = 1000 / chars if chars else 0
+    return {
+        "documents": len(samples),
+        "chars": chars,
+        "verse_density": verse_numbers * per_k,
+        "reference_density": references * per_k,
+        "chapter_heading_density": chapter_headings * per_k,
+        "verse_header_density": verse_headers * per_k,
+    }
+
+
+def title_hint(title):
+    """Catégorie suggérée par le titre de l'EPUB, ou None."""
+    words = set(normalize_book_name(word) for word in (title or "").split())
+    for category, hints in TITLE_HINTS.items():
+        if words.intersection(hints):
+            return category
+    return None
+
+
+def score_features(features, title=None):
+    """
+    Scores de chaque catégorie à partir des mesures (entre 0 et 1, plus
+    TITLE_BONUS pour la catégorie suggérée par le titre).
+    Une Bible a plusieurs numéros de versets pour 1000 caractères ; un
+    commentaire a des en-têtes de bloc réguliers et beaucoup de références.
+    """
+    bible = min(1.0, features["verse_density"] / 3.0)
+    bible = max(bible, min(1.0, features["chapter_heading_density"] / 0.2) * 0.5)
+    commentary = min(1.0, features["verse_header_density"] / 0.3) * 0.6
+    commentary += min(1.0, features["reference_density"] / 3.0) * 0.4
+    commentary *= 1.0 - bible
+    intro = max(0.0, 1.0 - bible - commentary)
+
+    scores = {"bible": bible, "commentary": commentary, "intro": intro}
+    hint = title_hint(title)
+    if hint is not None:
+        scores[hint] += TITLE_BONUS
+    return scores
+
+
+def classify_epub(epub_path, sample_documents=SAMPLE_DOCUMENTS):
+    """
+    Devine la catégorie d'un EPUB.
+    Retourne un dict : category, confidence (part du meilleur score, entre 0 et 1),
+    scores, features, title.
+    """
+    title, samples = sample_texts(epub_path, sample_documents)
+    features = text_features(samples)
+    scores = score_features(features, title)
+    total = sum(scores.values())
+    category = max(CATEGORIES, key=scores.get)
+    return {
+        "category": category,
+        "confidence": scores[category] / total if total else 0.0,
+        "scores": scores,
+        "features": features,
+        "title": title,
+    }
+
+
+def load_category_overrides(config_path=None):
+    """
+    Table de correspondance fichier -> catégorie, lue dans le fichier JSON
+    désigné par $CATEGORY_OVERRIDES (ex. {"niv.epub": "bible", "notes.epub": "skip"}).
+    Les clés sont des chemins relatifs au répertoire des ressources ou des noms de fichier.
+    """
+    config_path = config_path or setting("CATEGORY_OVERRIDES")
+    if not config_path:
+        return {}
+    with open(config_path, encoding="utf-8") as f:
+        mapping = json.load(f)
+    return {key: str(value).strip().lower() for key, value in mapping.items()}
+
+
+def category_override(epub_path, rel_path=None, overrides=None):
+    """
+    Catégorie imposée pour un EPUB, ou None :
+      1. fichier "sidecar" à côté de l'EPUB (livre.category contenant "bible") ;
+      2. entrée de la table de correspondance (chemin relatif, puis nom de fichier).
+    """
+    sidecar_path = os.path.splitext(epub_path)[0] + SIDECAR_EXTENSION
+    if os.path.exists(sidecar_path):
+        with open(sidecar_path, encoding="utf-8") as f:
+            value = f.read().strip().lower()
+        if value:
+            return value
+    overrides = overrides or {}
+    for key in (rel_path, os.path.basename(epub_path)):
+        if key and key in overrides:
+            return overrides[key]
+    return None
+
+
+def prompt_category(epub_title, suggestion=None):
+    """Prompt interactif (mode de repli explicite), la suggestion est la valeur par défaut."""
+    default = f" [{suggestion}]" if suggestion else ""
+    answer = input(f"Catégorie pour '{epub_title}'? (bible/commentary/intro/skip){default} : ")
+    return answer.strip().lower() or suggestion or "skip"
+
+
+def choose_category(epub_path, epub_title, rel_path=None, overrides=None, mode=None,
+                    min_confidence=None):
+    """
+    Catégorie à utiliser pour un EPUB, dans l'ordre :
+      - override (sidecar ou $CATEGORY_OVERRIDES) ;
+      - mode "manual" : prompt systématique (ancien comportement) ;
+      - classification automatique ; si la confiance est sous le seuil, prompt
+        en mode "prompt", sinon "skip" en mode "auto" (le fichier sera
+        réexaminé à la prochaine exécution).
+    - mode           : "auto" (défaut, jamais de prompt), "prompt" ou "manual" ($CATEGORY_MODE)
+    - min_confidence : seuil d'acceptation ($CATEGORY_MIN_CONFIDENCE, défaut 0.6)
+    Retourne "bible", "commentary", "intro" ou "skip".
+    """
+    mode = (mode or setting("CATEGORY_MODE", "auto")).lower()
+    if mode not in CATEGORY_MODES:
+        raise ValueError(f"CATEGORY_MODE inconnu : {mode} (attendu : {', '.join(CATEGORY_MODES)})")
+    if min_confidence is None:
+        min_confidence = float(setting("CATEGORY_MIN_CONFIDENCE", MIN_CONFIDENCE))
+
+    override = category_override(epub_path, rel_path, overrides)
+    if override is not None:
+        print(f"[INFO] Category '{override}' for '{epub_title}' (override).")
+        return override
+
+    if mode == "manual":
+        return prompt_category(epub_title)
+
+    result = classify_epub(epub_path)
+    category, confidence = result["category"], result["confidence"]
+    if confidence >= min_confidence:
+        print(f"[INFO] Category '{category}' for '{epub_title}' (confidence {confidence:.2f}).")
+        return category
+    if mode == "prompt":
+        print(f"[INFO] Low confidence for '{epub_title}': {category} ({confidence:.2f}).")
+        return prompt_category(epub_title, category)
+    print(f"[WARN] Category of '{epub_title}' is uncertain: {category} ({confidence:.2f}). "
+          f"Skipping; add a '{SIDECAR_EXTENSION}' sidecar or a CATEGORY_OVERRIDES entry.")
+    return "skip"
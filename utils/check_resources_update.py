@@ -1,10 +1,21 @@
-import os
 import sqlite3
-from utils.epub_parser import parse_epub_generic
-from utils.bible_parser import parse_bible
-from utils.commentary_parser import parse_commentary
-from utils.introduction_parser import parse_introduction
-from dotenv import load_dotenv
+from utils.category_classifier import choose_category, load_category_overrides
+from utils.extraction_cache import cache_stats
+from utils.instrumentation import counters, counters_since, emit, stage
+from utils.opf_reader import read_epub_metadata
+from utils.db_bulk import INGEST_PRAGMAS, STAGING_PRAGMAS
+from utils.parallel_ingest import run_ingestion_jobs, CLEARERS, EXTRACTORS
+from utils.settings import database_path, resources_path, setting
+from utils.resource_manifest import (
+    ensure_manifest_table,
+    scan_resources,
+    record_ingestion,
+    forget_entry,
+    print_delta,
+)
+from utils.fulltext import CATEGORY_TITLES, ensure_fulltext_schema
+from utils.staging import discard_staging, open_staging, publish_staging, staged_ingest_enabled
+from utils.verse_keys import ensure_ordinal_schema
 import warnings
 
 # Ignorer les UserWarnings spécifiques d'ebooklib
@@ -16,96 +27,189 @@ warnings.filterwarnings("ignore", category=FutureWarning, module="ebooklib.epub"
 # Ignorer les warnings XML/HTML de BeautifulSoup
 warnings.filterwarnings("ignore", category=UserWarning, module="html.parser")
 
-def parse_directory():
-
-    load_dotenv()
-    db_path = os.environ["DATABASE_FILE"]
-    directory_path = os.environ["RESOURCES_PATH"]
+def parse_directory(workers=None, category_mode=None, staged=None):
     """
-    Boucle sur tous les EPUB de 'directory_path'.
-    Si le livre n'existe pas déjà dans la DB, on l'insère et on parse le fichier.
+    Boucle sur les EPUB de 'directory_path' qui sont nouveaux ou modifiés
+    depuis la dernière ingestion (voir ingestion_manifest).
+    Les fichiers inchangés (même taille, même mtime) ne sont pas ouverts.
+    Si le livre n'existe pas déjà dans la DB, on l'insère et on parse le fichier,
+    dans une seule transaction ; un livre existant sans contenu est réingéré.
+    Un livre modifié (même titre) est réingéré en place, sous le même id ; s'il
+    ne peut pas l'être, son entrée du manifeste n'est pas mise à jour et le
+    fichier reste "modifié" au passage suivant.
+    - workers : nombre de processus d'extraction (défaut: $INGEST_WORKERS ou 1).
+      Le contenu final de la DB est le même quel que soit ce nombre.
+    - category_mode : "auto" (défaut, aucun prompt), "prompt" (prompt si la
+      détection est incertaine) ou "manual" (prompt systématique) ; voir
+      utils/category_classifier.choose_category ($CATEGORY_MODE).
+    - staged : écrit dans une copie de la base, vérifiée puis publiée en une
+      transaction à la fin ; les lecteurs ne voient jamais l'ingestion en cours
+      (défaut: $INGEST_STAGED ; voir utils/staging.py).
     """
-    # Connexion DB
-    conn = sqlite3.connect(db_path)
+    db_path = database_path()
+    directory_path = resources_path()
+    if workers is None:
+        workers = int(setting("INGEST_WORKERS", "1"))
+    if staged is None:
+        staged = staged_ingest_enabled()
+    # Connexion DB (ou à sa copie de travail)
+    conn = open_staging(db_path) if staged else sqlite3.connect(db_path)
     cursor = conn.cursor()
-
-    # 1. Récupérer la liste des fichiers EPUB
-    epub_files = [f for f in os.listdir(directory_path) if f.lower().endswith(".epub")]
-
-    for filename in epub_files:
-        epub_path = os.path.join(directory_path, filename)
+    ensure_manifest_table(cursor)
+    ensure_ordinal_schema(cursor)
+    ensure_fulltext_schema(cursor)
+
+    counters_before = counters()
+
+    # 1. Calculer le delta entre le répertoire et le manifeste
+    with stage("scan", directory=directory_path) as fields:
+        delta = scan_resources(cursor, directory_path)
+        fields.update({name: len(entries) for name, entries in delta.items()})
+    print_delta(delta)
+
+    for entry in delta["deleted"]:
+        forget_entry(cursor, entry["path"])
+    conn.commit()
+
+    overrides = load_category_overrides()
+    changed_paths = {entry["path"] for entry in delta["changed"]}
+    categories = {title: name for name, title in CATEGORY_TITLES.items()}
+    jobs = []
+    # Titres des nouveaux livres de ce passage : leur ligne books n'est insérée
+    # qu'à l'écriture (insert_book), un doublon ne se voit pas encore en base
+    queued_titles = set()
+    for entry in delta["new"] + delta["changed"]:
+        filename = entry["path"]
+        epub_path = entry["abs_path"]
         print(f"[INFO] Found EPUB: {epub_path}")
 
-        # 2. On peut extraire des infos de base (titre, auteur...) via parse_epub_generic
-        #    juste pour check la présence en DB
-        result = parse_epub_generic(epub_path)
-        metadata = result.get("metadata", {})
+        # 2. Lire uniquement l'OPF (titre, auteurs, langue...) pour vérifier
+        #    la présence en DB, sans décompresser les documents de contenu
+        metadata = read_epub_metadata(epub_path)
         epub_title = metadata.get("title") or filename  # Si l'EPUB n'a pas de titre, fallback sur filename
-        author = metadata.get("authors") or "unknown"  # Si l'EPUB n'a pas de titre, fallback sur filename
-        epub_title = next(iter(epub_title), (None,))[0]
-        author = next(iter(author), (None,))[0]
+        author = next(iter(metadata.get("creators") or []), "unknown")
             # 3. Vérifier si le titre existe dans la base
-        cursor.execute("SELECT id FROM books WHERE title = ?", (epub_title,))
+        cursor.execute("""SELECT b.id, cat.title FROM books b
+                          LEFT JOIN category cat ON cat.id = b.category_id
+                          WHERE b.title = ?""", (epub_title,))
         row = cursor.fetchone()
-
-        if row:
+        category = categories.get(row[1]) if row else None
+        has_contents = row is not None and cursor.execute(
+            "SELECT 1 FROM contents WHERE book_id = ? LIMIT 1", (row[0],)).fetchone() is not None
+
+        if row and filename in changed_paths and row[0] == entry["book_id"] and category in CLEARERS:
+            # Fichier modifié d'un livre réingérable : ses lignes sont
+            # remplacées dans la transaction du livre, sous le même id
+            print(f"[INFO] Book '{epub_title}' changed (id={row[0]}). Re-parsing.")
+            jobs.append({
+                "book_id": row[0],
+                "category": category,
+                "epub_path": epub_path,
+                "entry": entry,
+                "replace": True,
+            })
+        elif row and not has_contents and category in EXTRACTORS:
+            # Livre sans contenu (ingestion interrompue avant ce correctif) : réingéré sous le même id
+            print(f"[INFO] Book '{epub_title}' has no contents (id={row[0]}). Re-parsing.")
+            jobs.append({
+                "book_id": row[0],
+                "category": category,
+                "epub_path": epub_path,
+                "entry": entry,
+            })
+        elif row and filename in changed_paths:
+            # Fichier modifié qui ne peut pas être réingéré (catégorie inconnue, ou
+            # titre d'un autre livre) : le manifeste garde l'ancienne empreinte
+            print(f"[WARN] Book '{epub_title}' changed but cannot be re-parsed (id={row[0]}). "
+                  "Manifest entry left unchanged.")
+        elif row:
             # Livre déjà existant
             print(f"[INFO] Book '{epub_title}' already in DB (id={row[0]}). Skipping parse.")
+            record_ingestion(cursor, entry, row[0])
+            conn.commit()
+        elif epub_title in queued_titles:
+            # Même titre qu'un livre de ce passage : enregistré au prochain passage
+            print(f"[INFO] Book '{epub_title}' already queued. Skipping parse.")
         else:
             print(f"[INFO] Book '{epub_title}' not found in DB. Parsing & inserting.")
 
-            # 4. Déterminer la catégorie (ex. via un paramètre, un champ metadata,
-            #    ou un prompt à l'utilisateur)
-            #    Ci-dessous, on suppose un prompt (très simplifié) :
-            cat_input = input(f"Catégorie pour '{epub_title}'? (bible/commentary/intro/skip) : ").strip().lower()
+            # 4. Déterminer la catégorie : override (sidecar / $CATEGORY_OVERRIDES),
+            #    sinon détection automatique sur les premiers documents du spine
+            with stage("classify", epub=epub_path) as fields:
+                cat_input = choose_category(epub_path, epub_title, rel_path=filename,
+                                            overrides=overrides, mode=category_mode)
+                fields["category"] = cat_input
 
             if cat_input == "skip":
-                print("[INFO] Skipped by user request.")
+                print("[INFO] Skipped.")
+                continue
+
+            if cat_input not in EXTRACTORS:
+                print("[WARN] Unknown category. Skipping parser.")
                 continue
 
-            # 5. Insérer le nouveau livre dans la table 'books'
-            #    Il faudra associer un category_id en fonction de la catégorie
-            category_id = get_category_id(cursor, cat_input)
-            cursor.execute(
-                """INSERT INTO books (title, abbreviation, language, authors, cover, category_id)
-                   VALUES (?, ?, ?, ?, ?, ?)""",
-                (
+            # 5. Le nouveau livre sera inséré dans la table 'books' par le writer,
+            #    dans la transaction de ses contenus (insert_book)
+            queued_titles.add(epub_title)
+            jobs.append({
+                "book_id": None,
+                "category": cat_input,
+                "epub_path": epub_path,
+                "entry": entry,
+                "book": (
                     epub_title,
-                    metadata.get("abbreviation"),
-                    metadata.get("language", "unknown"),
+                    None,  # abbreviation
+                    metadata.get("language") or "unknown",
                     author,
                     None,  # cover
-                    category_id
-                )
-            )
-            new_book_id = cursor.lastrowid
-            # TODO REMOVE COMMENT TO ADD BOOK
-            # conn.commit()
-
-            # 6. Appeler le parseur adapté
-            if cat_input == "bible":
-                parse_bible(epub_path, new_book_id)
-            elif cat_input == "commentary":
-                parse_commentary(epub_path, new_book_id)
-            elif cat_input == "intro":
-                parse_introduction(epub_path, new_book_id)
-            else:
-                print("[WARN] Unknown category. Skipping parser.")
-
-    conn.close()
+                    get_category_id(cursor, cat_input),
+                ),
+            })
+
+    # 6. Appeler le parseur adapté (extraction en parallèle si workers > 1).
+    #    La ligne books et le manifeste sont écrits dans la même transaction que
+    #    les contenus : un livre dont l'ingestion échoue n'est pas enregistré.
+    def on_book_start(cursor, job):
+        if job.get("book") is not None:
+            job["book_id"] = insert_book(cursor, job["book"])
+
+    def on_book_done(cursor, job, row_count):
+        record_ingestion(cursor, job["entry"], job["book_id"])
+
+    run_ingestion_jobs(conn, jobs, workers=workers, on_book_done=on_book_done,
+                       pragmas=STAGING_PRAGMAS if staged else INGEST_PRAGMAS, on_book_start=on_book_start)
+
+    if not staged:
+        conn.close()
+    elif conn.total_changes:
+        publish_staging(conn, db_path)
+        print(f"[INFO] Copie de travail vérifiée et publiée dans {db_path}.")
+    else:
+        discard_staging(conn, db_path)
+    # Bilan du processus principal (les compteurs d'extraction des workers
+    # figurent dans leurs propres événements "extract")
+    emit("summary", books=len(jobs), workers=workers, extraction_cache=cache_stats(),
+         counters=counters_since(counters_before))
     print("[INFO] Finished parsing directory.")
 
+def insert_book(cursor, book):
+    """
+    Insère la ligne books d'un nouveau livre (titre, abréviation, langue,
+    auteurs, couverture, category_id). Ne fait pas de commit. Retourne son id.
+    """
+    cursor.execute(
+        """INSERT INTO books (title, abbreviation, language, authors, cover, category_id)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        book,
+    )
+    return cursor.lastrowid
+
 def get_category_id(cursor, cat_input):
     """
     Récupère l'id de la table category pour 'bible', 'commentary', etc.
     À adapter selon ta table category.
     """
-    cat_mapping = {
-        "bible": "Bible",
-        "commentary": "Commentaire",
-        "intro": "Introduction",
-    }
-    cat_title = cat_mapping.get(cat_input, None)
+    cat_title = CATEGORY_TITLES.get(cat_input, None)
     if cat_title is None:
         return None
 
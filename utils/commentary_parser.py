@@ -1,56 +1,179 @@
 import re
-import sqlite3
-import os
-from .epub_parser import parse_epub_generic
-from dotenv import load_dotenv
-load_dotenv()
-
-def parse_commentary(epub_path, book_id):
-    db_path = os.environ["DATABASE_FILE"]
-    """
-    Parse un EPUB de type 'Commentaire' et insère les textes par bloc (par plage de versets).
-    - epub_path: chemin vers l'EPUB
-    - db_path: chemin vers la base SQLite
-    - book_id: ID de la table 'books' correspondant au commentaire
-    """
-    result = parse_epub_generic(epub_path)
-    metadata = result["metadata"]
-    sections = result["sections"]
-
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # Repère ex: "Col 3:16-20" ou "Mat 5:1–12" => \1= "Col" / \2= "3" / \3="16" / \4="20"
-    ref_range_pattern = re.compile(r"([1-3]?\s?[A-Z][a-z]+)\s+(\d+):(\d+)(?:–|-)(\d+)")
-
-    for section_title, text_content in sections:
-        # Logique : repérer chaque mention de "Col 3:16-20" puis associer le bloc de commentaire qui suit
-        matches = ref_range_pattern.finditer(text_content)
-        for match in matches:
-            # Ex: "Col", "3", "16", "20"
-            book_abbrev = match.group(1)
-            chap_num = int(match.group(2))
-            start_v = int(match.group(3))
-            end_v = int(match.group(4))
-
-            # Récupérer l'ID du verset start, l'ID du verset end
-            # => Sur base du livre biblique (table bible_books), du chapitre, etc.
-            # Ici c'est purement indicatif :
-            # 1) Trouver le bible_books.id correspondant à "Col" (ou "Colossiens" dans ta DB)
-            # 2) Trouver chapters.id où (bible_book_id=?), number=chap_num
-            # 3) Trouver verses.id pour le verset start_v
-            # 4) Trouver verses.id pour end_v
-
-            # Ensuite, extraire le "bloc" de commentaire.
-            # => Dans la pratique, tu devras parser plus finement
-            #    ou décider que tout le paragraphe est rattaché à la plage de versets.
-
-            # Pour l'exemple, on insère juste un record minimal:
-            cursor.execute("""
-                INSERT INTO contents (book_id, start_verse_id, end_verse_id, text)
-                VALUES (?, ?, ?, ?)
-            """, (book_id, 999, 1000, f"Commentaire pour {book_abbrev} {chap_num}:{start_v}-{end_v}..."))
-
-    conn.commit()
-    conn.close()
-    print(f"[INFO] Commentary parsed and inserted into DB. Book ID: {book_id}")
+from bisect import bisect_left, bisect_right
+from .bible_parser import is_block_break
+from .canon import book_position
+from .cross_references import ensure_citation_schema, index_citations
+from .epub_parser import iter_sections
+from .instrumentation import count, stage
+from .reference_parser import default_matcher, parse_references, reference_ordinals, Reference
+
+# Segmentation d'un commentaire :
+#  - chaque section est parcourue une seule fois, paragraphe par paragraphe ;
+#  - un paragraphe court qui commence par une référence ("Colossiens 3.16-17",
+#    ou "3:16-17" quand le livre est déjà connu) est un en-tête : il ouvre un bloc ;
+#  - le bloc contient tous les paragraphes suivants jusqu'au prochain en-tête.
+# Le texte situé avant le premier en-tête (préface, titre du livre) est ignoré.
+
+# Longueur maximale d'un titre de livre seul ("Colossiens") fixant le livre courant
+MAX_TITLE_LENGTH = 40
+# Longueur maximale d'un paragraphe d'en-tête ("Col 3:16-17 — La parole de Christ")
+MAX_HEADER_LENGTH = 120
+# En-tête sans nom de livre : "3:16", "3.16-17", "3:16–4:2"
+BARE_HEADER_PATTERN = re.compile(
+    r"(?P<a>\d{1,3})[:.](?P<b>\d{1,3})(?:\s*[-–—]\s*(?P<c>\d{1,3})(?:[:.](?P<d>\d{1,3}))?)?(?![\d:])"
+)
+_SPACES_PATTERN = re.compile(r"\s+")
+
+
+def iter_paragraphs(text_content):
+    """
+    Paragraphes d'un texte issu de text_extractor : les lignes d'un même
+    paragraphe (fragments de balises en ligne) sont recollées.
+    """
+    fragments = []
+    for line in text_content.split("\n"):
+        if is_block_break(line):
+            if fragments:
+                paragraph = _SPACES_PATTERN.sub(" ", "".join(fragments)).strip()
+                if paragraph:
+                    yield paragraph
+                fragments = []
+        else:
+            fragments.append(line)
+    if fragments:
+        paragraph = _SPACES_PATTERN.sub(" ", "".join(fragments)).strip()
+        if paragraph:
+            yield paragraph
+
+
+def header_reference(paragraph, current_position, matcher=None):
+    """Reference portée par un paragraphe d'en-tête, ou None si ce n'en est pas un."""
+    if len(paragraph) > MAX_HEADER_LENGTH:
+        return None
+    reference = next(parse_references(paragraph, matcher), None)
+    if reference is not None:
+        return reference if reference.start == 0 else None
+    if current_position is None:
+        return None
+    match = BARE_HEADER_PATTERN.match(paragraph)
+    if match is None:
+        return None
+    a, b, c, d = match.group("a", "b", "c", "d")
+    chapter, verse = int(a), int(b)
+    end_chapter, end_verse = chapter, verse
+    if d is not None:
+        end_chapter, end_verse = int(c), int(d)
+    elif c is not None:
+        end_verse = int(c)
+    if (end_chapter, end_verse) < (chapter, verse):
+        return None
+    return Reference(current_position, chapter, verse, end_chapter, end_verse, 0, match.end())
+
+
+def segment_commentary(texts, matcher=None):
+    """
+    Découpe une suite de textes (sections) en blocs de commentaire.
+    Génère des tuples (start_ordinal, end_ordinal, texte_du_bloc).
+    Le livre courant est conservé d'une section à l'autre (en-têtes "3:16").
+    """
+    matcher = matcher or default_matcher()
+    current_position = None
+    for text_content in texts:
+        reference = None
+        block = []
+        for paragraph in iter_paragraphs(text_content):
+            header = header_reference(paragraph, current_position, matcher)
+            if header is None:
+                if len(paragraph) <= MAX_TITLE_LENGTH and book_position(paragraph) is not None:
+                    # Titre de livre : contexte des en-têtes "3:16" qui suivent
+                    current_position = book_position(paragraph)
+                elif reference is not None:
+                    block.append(paragraph)
+                continue
+            if reference is not None and block:
+                yield reference_ordinals(reference) + ("\n\n".join(block),)
+            reference = header
+            current_position = header.position
+            block = []
+        if reference is not None and block:
+            yield reference_ordinals(reference) + ("\n\n".join(block),)
+
+
+def iter_commentary_rows(epub_path):
+    """
+    Génère les blocs (start_ordinal, end_ordinal, texte_du_bloc) d'un commentaire,
+    en lisant les documents du spine un par un (epub_parser.iter_sections).
+    """
+    return segment_commentary(text_content for _, text_content in iter_sections(epub_path))
+
+
+def extract_commentary_rows(epub_path):
+    """
+    Partie "CPU" du parsing d'un commentaire, sans accès à la DB
+    (exécutable dans un processus worker, voir parallel_ingest).
+    Retourne une liste de tuples (start_ordinal, end_ordinal, texte_du_bloc).
+    """
+    rows = list(iter_commentary_rows(epub_path))
+    count("blocks", len(rows))
+    return rows
+
+
+def load_verse_index(cursor):
+    """
+    Cache de résolution clé canonique -> verses.id : une seule requête charge
+    toutes les clés, triées, dans deux listes parallèles (ordinals, ids).
+    """
+    cursor.execute("SELECT ordinal, id FROM verses WHERE ordinal IS NOT NULL ORDER BY ordinal")
+    rows = cursor.fetchall()
+    return [ordinal for ordinal, _ in rows], [verse_id for _, verse_id in rows]
+
+
+def resolve_verse_ids(verse_index, start_ordinal, end_ordinal):
+    """
+    (start_verse_id, end_verse_id) des premier et dernier versets existants
+    de la plage (un chapitre entier "Ps 23" inclus), par recherche dichotomique ;
+    (None, None) si aucun verset de la plage n'existe.
+    """
+    ordinals, ids = verse_index
+    low = bisect_left(ordinals, start_ordinal)
+    high = bisect_right(ordinals, end_ordinal) - 1
+    if low > high:
+        return None, None
+    return ids[low], ids[high]
+
+
+def write_commentary_rows(cursor, book_id, rows):
+    """
+    Insère les blocs produits par extract_commentary_rows ou iter_commentary_rows
+    (executemany, sans requête par bloc ; 'rows' peut être un itérateur). Les clés canoniques sont toujours renseignées ; les
+    verse_id le sont si les versets existent déjà (Bible ingérée).
+    Les références citées par les blocs alimentent ensuite le graphe des
+    co-citations (cross_references.index_citations).
+    Ne fait pas de commit : l'appelant valide la transaction du livre.
+    Retourne le nombre de lignes insérées.
+    """
+    ensure_citation_schema(cursor)
+    verse_index = load_verse_index(cursor)
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM contents")
+    first_content_id = cursor.fetchone()[0]
+    cursor.executemany("""
+        INSERT INTO contents (book_id, start_verse_id, end_verse_id, start_ordinal, end_ordinal, text)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (
+        (book_id, *resolve_verse_ids(verse_index, start_ordinal, end_ordinal), start_ordinal, end_ordinal, text_content)
+        for start_ordinal, end_ordinal, text_content in rows
+    ))
+    row_count = cursor.rowcount
+    with stage("citations", book_id=book_id) as fields:
+        fields["blocks"] = index_citations(cursor, book_id, first_content_id)
+    return row_count
+
+
+def clear_commentary_rows(cursor, book_id):
+    """
+    Supprime les blocs du commentaire 'book_id' avant sa réingestion ; les
+    triggers retirent plages, entrées plein texte, citations et arêtes du
+    graphe des co-citations. Ne fait pas de commit. Retourne le nombre de blocs.
+    """
+    cursor.execute("DELETE FROM contents WHERE book_id = ?", (book_id,))
+    return cursor.rowcount
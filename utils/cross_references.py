@@ -0,0 +1,159 @@
+from collections import Counter
+from itertools import permutations
+
+from .instrumentation import count
+from .reference_parser import Reference, default_matcher, format_reference, parse_references, reference_ordinals
+from .text_compression import inflate_text
+from .verse_keys import CHAPTER_FACTOR, split_ordinal
+
+# Graphe des co-citations : deux versets sont voisins quand un même bloc de
+# commentaire les cite (ou commente l'un et cite l'autre) ; le poids d'une
+# arête est le nombre de blocs où ils apparaissent ensemble.
+#  - content_citations : versets cités par chaque bloc (contents.id), en-tête
+#    du bloc compris. Seuls les passages d'un chapitre d'au plus
+#    MAX_PASSAGE_VERSES versets comptent : un chapitre entier ou une plage
+#    longue est trop vague pour un voisinage verset à verset. Un bloc qui cite
+#    plus de MAX_BLOCK_VERSES versets (liste de références) est ignoré.
+#  - cocitations : liste d'adjacence (verset, voisin, poids), clé canonique
+#    (verse_keys) des deux côtés, stockée dans les deux sens : les voisins d'un
+#    verset ou d'une plage sortent d'une lecture d'index.
+# À l'ingestion, index_citations ajoute les blocs d'un commentaire (paires
+# comptées en Python, un UPSERT par arête). La suppression passe par un
+# trigger : un bloc supprimé décrémente les arêtes entre ses versets et retire
+# ses citations. Réingérer un commentaire ne touche donc que ses arêtes.
+
+MAX_PASSAGE_VERSES = 12
+MAX_BLOCK_VERSES = 100
+DEFAULT_RELATED_LIMIT = 20
+
+CITATION_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS content_citations (
+        content_id INTEGER NOT NULL,
+        ordinal    INTEGER NOT NULL,
+        PRIMARY KEY (content_id, ordinal)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS cocitations (
+        ordinal  INTEGER NOT NULL,
+        neighbor INTEGER NOT NULL,
+        weight   INTEGER NOT NULL,
+        PRIMARY KEY (ordinal, neighbor)
+    ) WITHOUT ROWID""",
+    # Bloc supprimé : chacune de ses paires perd un bloc, puis ses citations disparaissent
+    """CREATE TRIGGER IF NOT EXISTS content_citations_ad AFTER DELETE ON contents
+    BEGIN
+        UPDATE cocitations SET weight = weight - 1
+         WHERE ordinal IN (SELECT ordinal FROM content_citations WHERE content_id = OLD.id)
+           AND neighbor IN (SELECT ordinal FROM content_citations WHERE content_id = OLD.id);
+        DELETE FROM cocitations
+         WHERE weight <= 0
+           AND ordinal IN (SELECT ordinal FROM content_citations WHERE content_id = OLD.id)
+           AND neighbor IN (SELECT ordinal FROM content_citations WHERE content_id = OLD.id);
+        DELETE FROM content_citations WHERE content_id = OLD.id;
+    END""",
+]
+
+RELATED_SQL = """
+SELECT neighbor, SUM(weight)
+FROM cocitations
+WHERE ordinal BETWEEN ? AND ? AND (neighbor < ? OR neighbor > ?)
+GROUP BY neighbor
+"""
+
+
+def passage_verses(start_ordinal, end_ordinal):
+    """Clés des versets d'un passage d'un seul chapitre d'au plus MAX_PASSAGE_VERSES versets, sinon vide."""
+    if start_ordinal // CHAPTER_FACTOR != end_ordinal // CHAPTER_FACTOR:
+        return range(0)
+    if end_ordinal - start_ordinal >= MAX_PASSAGE_VERSES:
+        return range(0)
+    return range(start_ordinal, end_ordinal + 1)
+
+
+def cited_verses(text_content, start_ordinal=None, end_ordinal=None, matcher=None):
+    """Versets (clés triées) cités par un bloc : son en-tête [start_ordinal, end_ordinal] et les références du texte."""
+    verses = set()
+    if start_ordinal is not None:
+        verses.update(passage_verses(start_ordinal, end_ordinal if end_ordinal is not None else start_ordinal))
+    for reference in parse_references(text_content, matcher):
+        # Un chapitre entier ("Ps 23" : versets 1 à 999) dépasse MAX_PASSAGE_VERSES
+        verses.update(passage_verses(*reference_ordinals(reference)))
+    return sorted(verses)
+
+
+def ensure_citation_schema(cursor):
+    """
+    Crée les tables du graphe si besoin ; à la création, les commentaires déjà
+    présents sont indexés. Pas d'executescript (qui validerait la transaction en cours).
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'cocitations'")
+    if cursor.fetchone() is not None:
+        return
+    for statement in CITATION_SCHEMA:
+        cursor.execute(statement)
+    cursor.execute("""
+        SELECT b.id FROM books b JOIN category cat ON cat.id = b.category_id
+        WHERE cat.title = 'Commentaire'
+    """)
+    for (book_id,) in cursor.fetchall():
+        index_citations(cursor, book_id)
+
+
+def index_citations(cursor, book_id, min_content_id=0, matcher=None):
+    """
+    Ajoute au graphe les blocs du commentaire 'book_id' (contents d'id >
+    min_content_id). Ne fait pas de commit. Retourne le nombre de blocs indexés.
+    """
+    matcher = matcher or default_matcher()
+    citations = []
+    pairs = Counter()
+    blocks = 0
+    rows = cursor.connection.execute(
+        "SELECT id, start_ordinal, end_ordinal, text FROM contents WHERE id > ? AND book_id = ?",
+        (min_content_id, book_id),
+    )
+    for content_id, start_ordinal, end_ordinal, value in rows:
+        verses = cited_verses(inflate_text(cursor, book_id, value), start_ordinal, end_ordinal, matcher)
+        if len(verses) < 2 or len(verses) > MAX_BLOCK_VERSES:
+            continue
+        blocks += 1
+        citations.extend((content_id, ordinal) for ordinal in verses)
+        pairs.update(permutations(verses, 2))
+
+    cursor.executemany("INSERT OR IGNORE INTO content_citations (content_id, ordinal) VALUES (?, ?)", citations)
+    cursor.executemany("""
+        INSERT INTO cocitations (ordinal, neighbor, weight) VALUES (?, ?, ?)
+        ON CONFLICT (ordinal, neighbor) DO UPDATE SET weight = weight + excluded.weight
+    """, ((ordinal, neighbor, weight) for (ordinal, neighbor), weight in pairs.items()))
+    count("citations", len(citations))
+    count("cocitation_pairs", len(pairs))
+    return blocks
+
+
+def related_passages(cursor, start_ordinal, end_ordinal, limit=DEFAULT_RELATED_LIMIT):
+    """
+    Passages cités avec le verset ou la plage [start_ordinal, end_ordinal], du
+    plus au moins souvent. Les versets voisins de même poids sont regroupés
+    ("Eph 5:19-20"). Liste de dicts (reference, start_ordinal, end_ordinal, weight).
+    """
+    cursor.execute(RELATED_SQL, (start_ordinal, end_ordinal, start_ordinal, end_ordinal))
+    passages = []
+    for neighbor, weight in sorted(cursor.fetchall()):
+        last = passages[-1] if passages else None
+        if last is not None and last[1] + 1 == neighbor and last[2] == weight \
+                and last[1] // CHAPTER_FACTOR == neighbor // CHAPTER_FACTOR:
+            last[1] = neighbor
+        else:
+            passages.append([neighbor, neighbor, weight])
+    passages.sort(key=lambda passage: (-passage[2], passage[0]))
+
+    results = []
+    for start, end, weight in passages[:limit]:
+        position, chapter, verse = split_ordinal(start)
+        end_verse = split_ordinal(end)[2]
+        results.append({
+            "reference": format_reference(Reference(position, chapter, verse, chapter, end_verse, 0, 0)),
+            "start_ordinal": start,
+            "end_ordinal": end,
+            "weight": weight,
+        })
+    return results
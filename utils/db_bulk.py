@@ -0,0 +1,77 @@
+# Réglages SQLite pour les chargements en masse (ingestion d'une Bible entière).
+#  - WAL + synchronous=NORMAL : un seul fsync par checkpoint au lieu d'un par commit,
+#    sans risque de corruption (au pire on perd la dernière transaction) ;
+#  - cache de 64 Mio et tables temporaires en mémoire ;
+#  - les index secondaires sont supprimés avant le chargement et reconstruits
+#    après : un tri unique coûte bien moins cher que 31 000 insertions dans un B-tree.
+#    Seulement si aucun lecteur n'en dépend (copie de travail ou base vide, voir
+#    can_drop_secondary_indexes) : sur une base en service, les requêtes
+#    passeraient en parcours complet et l'unicité de verses.ordinal ne serait
+#    plus vérifiée pendant toute l'ingestion.
+
+INGEST_PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA temp_store = MEMORY",
+]
+
+# Copie de travail de l'ingestion "build and swap" (staging.py) : jetable tant
+# qu'elle n'est pas publiée, donc ni fsync ni journal sur disque (le journal en
+# mémoire garde le ROLLBACK d'un livre en échec) ; verrou exclusif gardé jusqu'à
+# la fermeture, sans aller-retour de verrouillage à chaque transaction.
+STAGING_PRAGMAS = [
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA cache_size = -65536",
+    "PRAGMA temp_store = MEMORY",
+]
+
+# En dessous, une base est considérée vide : aucune traduction n'y est chargée
+EMPTY_DATABASE_ROWS = 1000
+
+# nom -> instruction de création
+SECONDARY_INDEXES = {
+    "idx_chapters_book_number": "CREATE INDEX IF NOT EXISTS idx_chapters_book_number "
+                                "ON chapters (bible_book_id, number)",
+    "idx_verses_chapter_number": "CREATE INDEX IF NOT EXISTS idx_verses_chapter_number "
+                                 "ON verses (chapter_id, number)",
+    "idx_verses_ordinal": "CREATE UNIQUE INDEX IF NOT EXISTS idx_verses_ordinal "
+                          "ON verses (ordinal)",
+    "idx_contents_book": "CREATE INDEX IF NOT EXISTS idx_contents_book "
+                         "ON contents (book_id)",
+    "idx_contents_verses": "CREATE INDEX IF NOT EXISTS idx_contents_verses "
+                           "ON contents (start_verse_id, end_verse_id)",
+}
+
+
+def apply_ingest_pragmas(conn, pragmas=INGEST_PRAGMAS):
+    """Applique INGEST_PRAGMAS ou 'pragmas' (à appeler hors transaction, juste après connect)."""
+    for pragma in pragmas:
+        conn.execute(pragma)
+
+
+def can_drop_secondary_indexes(cursor, pragmas=INGEST_PRAGMAS):
+    """
+    Vrai si les index secondaires peuvent être supprimés le temps d'un
+    chargement : copie de travail (STAGING_PRAGMAS) ou base vide (moins de
+    EMPTY_DATABASE_ROWS contenus, ex. les lignes d'exemple d'init_db).
+    """
+    if pragmas == STAGING_PRAGMAS:
+        return True
+    cursor.execute("SELECT COUNT(*) FROM (SELECT 1 FROM contents LIMIT ?)", (EMPTY_DATABASE_ROWS,))
+    return cursor.fetchone()[0] < EMPTY_DATABASE_ROWS
+
+
+def drop_secondary_indexes(cursor):
+    """Supprime les index secondaires avant un chargement en masse."""
+    for name in SECONDARY_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def create_secondary_indexes(cursor):
+    """(Re)crée les index secondaires, puis met à jour les statistiques du planificateur."""
+    for statement in SECONDARY_INDEXES.values():
+        cursor.execute(statement)
+    cursor.execute("ANALYZE")
@@ -1,5 +1,8 @@
+import ebooklib
 from ebooklib import epub
-from bs4 import BeautifulSoup
+from .extraction_cache import cached_extract_text
+from .opf_reader import iter_spine_documents
+from .text_extractor import extract_text
 
 def open_epub(epub_path):
     """Charge et retourne l'objet ebooklib du fichier EPUB."""
@@ -13,27 +16,34 @@ def extract_sections(book):
     """
     sections = []
     for item in book.get_items():
-        if item.get_type() == epub.ITEM_DOCUMENT:
-            # HTML brut
-            html_content = item.get_content().decode("utf-8", errors="ignore")
+        if item.get_type() == ebooklib.ITEM_DOCUMENT:
             # Si besoin, on peut récupérer un titre depuis la table des matières (metadata),
             # mais ici on se contente du nom du fichier
             title = item.get_name()
 
-            # Convertir en texte brut + possible usage de BeautifulSoup
-            soup = BeautifulSoup(html_content, 'html.parser')
-            text_content = soup.get_text(separator="\n")
+            # Convertir le HTML brut en texte (parseur C de lxml)
+            text_content = extract_text(item.get_content())
             sections.append((title, text_content))
     return sections
 
+def iter_sections(epub_path):
+    """
+    Version paresseuse d'extract_sections : génère (chemin_zip, contenu_texte)
+    pour chaque document du spine, dans l'ordre de lecture, sans charger
+    l'EPUB entier (images, polices ignorées ; un document en mémoire à la fois).
+    Le texte passe par le cache d'extraction s'il est activé (extraction_cache).
+    """
+    for zip_path, content in iter_spine_documents(epub_path):
+        yield zip_path, cached_extract_text(content)
+
 def parse_epub_generic(epub_path):
     """
     Exemple d'usage: ouvre l'EPUB, récupère les sections,
     renvoie une structure de base (metadata + list de (title, text)).
+    L'identification des EPUB passe par opf_reader.read_epub_metadata.
     """
     book = open_epub(epub_path)
-    # sections = extract_sections(book)
-
+    sections = extract_sections(book)
 
     # Métadonnées (titre, auteurs...) si l'EPUB les fournit
     title = book.get_metadata('DC', 'title')
@@ -47,4 +57,5 @@ def parse_epub_generic(epub_path):
 
     return {
         "metadata": metadata,
+        "sections": sections,
     }
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import sqlite3
+import time
+import zlib
+
+from .settings import setting
+from .text_extractor import EXTRACTOR_VERSION, extract_text
+
+# Cache disque du texte extrait de chaque document XHTML (HTML -> texte), adressé
+# par le contenu : clé = (sha256 des octets du membre ZIP, EXTRACTOR_VERSION).
+#  - un document inchangé n'est plus reparsé, même si l'EPUB qui le contient
+#    a changé ou si le parseur de versets / de commentaires a été modifié ;
+#  - changer text_extractor (EXTRACTOR_VERSION) invalide toutes les entrées ;
+#  - le texte est stocké compressé (zlib) dans une petite base SQLite ;
+#  - la taille totale est bornée : les entrées les moins récemment utilisées
+#    sont supprimées au-delà de $EXTRACTION_CACHE_MAX_MB.
+# Le cache est activé en désignant son fichier : EXTRACTION_CACHE=.cache/extraction.db
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extraction_cache (
+    digest TEXT NOT NULL,
+    extractor_version INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (digest, extractor_version)
+);
+CREATE INDEX IF NOT EXISTS idx_extraction_cache_last_used ON extraction_cache (last_used);
+"""
+
+DEFAULT_MAX_MB = 512
+COMPRESSION_LEVEL = 6
+# Après la suppression, la taille redescend à cette fraction du maximum
+# (évite une éviction à chaque nouvelle entrée)
+EVICTION_TARGET = 0.9
+
+# Compteurs du processus courant (voir cache_stats)
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+# Chemin -> état du cache ouvert : connexion, pid, octets écrits depuis la dernière vérification
+_caches = {}
+
+
+def cache_path_from_env():
+    """Fichier du cache ($EXTRACTION_CACHE), ou None si le cache est désactivé."""
+    return setting("EXTRACTION_CACHE")
+
+
+def open_cache(cache_path):
+    """
+    État du cache 'cache_path' pour ce processus (connexion créée au premier appel).
+    Une connexion héritée d'un fork (workers de parallel_ingest) n'est jamais réutilisée.
+    """
+    state = _caches.get(cache_path)
+    if state is not None and state["pid"] == os.getpid():
+        return state
+
+    directory = os.path.dirname(cache_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Autocommit : chaque entrée est visible tout de suite par les autres workers
+    conn = sqlite3.connect(cache_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.executescript(CACHE_SCHEMA)
+    max_mb = float(setting("EXTRACTION_CACHE_MAX_MB", DEFAULT_MAX_MB))
+    state = {
+        "conn": conn,
+        "pid": os.getpid(),
+        "max_bytes": int(max_mb * 1_000_000),
+        "pending": 0,
+    }
+    _caches[cache_path] = state
+    evict(state)
+    return state
+
+
+def close_caches():
+    """Ferme les connexions ouvertes par ce processus."""
+    for cache_path, state in list(_caches.items()):
+        if state["pid"] == os.getpid():
+            state["conn"].close()
+        del _caches[cache_path]
+
+
+def cached_extract_text(content, cache_path=None):
+    """
+    extract_text(content) en passant par le cache disque s'il est activé
+    ('cache_path', ou $EXTRACTION_CACHE). Même résultat que extract_text.
+    """
+    cache_path = cache_path or cache_path_from_env()
+    if cache_path is None:
+        return extract_text(content)
+
+    state = open_cache(cache_path)
+    conn = state["conn"]
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    digest = hashlib.sha256(content).hexdigest()
+    key = (digest, EXTRACTOR_VERSION)
+
+    row = conn.execute(
+        "SELECT data FROM extraction_cache WHERE digest = ? AND extractor_version = ?", key
+    ).fetchone()
+    if row is not None:
+        _stats["hits"] += 1
+        conn.execute(
+            "UPDATE extraction_cache SET last_used = ? WHERE digest = ? AND extractor_version = ?",
+            (time.time(),) + key,
+        )
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    _stats["misses"] += 1
+    text_content = extract_text(content)
+    data = zlib.compress(text_content.encode("utf-8"), COMPRESSION_LEVEL)
+    conn.execute(
+        """INSERT OR REPLACE INTO extraction_cache (digest, extractor_version, size, last_used, data)
+           VALUES (?, ?, ?, ?, ?)""",
+        key + (len(data), time.time(), data),
+    )
+    state["pending"] += len(data)
+    # La taille totale n'est recalculée qu'après ~5 % du maximum écrit
+    if state["pending"] * 20 >= state["max_bytes"]:
+        evict(state)
+    return text_content
+
+
+def evict(state):
+    """Supprime les entrées les moins récemment utilisées si le cache dépasse sa taille."""
+    conn = state["conn"]
+    state["pending"] = 0
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+    if total <= state["max_bytes"]:
+        return 0
+
+    target = total - int(state["max_bytes"] * EVICTION_TARGET)
+    freed = 0
+    victims = []
+    for digest, version, size in conn.execute(
+        "SELECT digest, extractor_version, size FROM extraction_cache ORDER BY last_used"
+    ):
+        victims.append((digest, version))
+        freed += size
+        if freed >= target:
+            break
+    conn.execute("BEGIN")
+    conn.executemany(
+        "DELETE FROM extraction_cache WHERE digest = ? AND extractor_version = ?", victims
+    )
+    conn.execute("COMMIT")
+    _stats["evictions"] += len(victims)
+    return len(victims)
+
+
+def cache_stats():
+    """Copie des compteurs du processus courant : hits, misses, evictions."""
+    return dict(_stats)
+
+
+def reset_cache_stats():
+    for name in _stats:
+        _stats[name] = 0
+
+
+def merge_cache_stats(delta):
+    """Ajoute aux compteurs ceux d'un autre processus (worker)."""
+    for name, value in delta.items():
+        _stats[name] = _stats.get(name, 0) + value
+
+
+def cache_usage(cache_path=None):
+    """(nombre d'entrées, taille compressée en octets) du cache, ou None s'il est désactivé."""
+    cache_path = cache_path or cache_path_from_env()
+    if cache_path is None:
+        return None
+    conn = open_cache(cache_path)["conn"]
+    return conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()
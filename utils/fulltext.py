@@ -0,0 +1,268 @@
+import re
+import sqlite3
+import unicodedata
+
+from .canon import CANON_BOOKS
+from .text_compression import inflate_text
+from .verse_keys import split_ordinal
+
+# Recherche plein texte sur contents.text (SQLite FTS5).
+#  - contents_fts ne relit jamais contents : contents.text peut être un BLOB
+#    compressé (text_compression.py), que FTS5 ne sait pas lire. Avec SQLite
+#    >= 3.43, l'index est "sans contenu" (contentless_delete) : pas de copie du
+#    texte, les extraits (snippet) sont construits en Python ; sinon c'est une
+#    table FTS5 ordinaire, qui garde sa copie du texte en clair.
+#    Dans les deux cas une ligne se retire par son rowid : 'integrity-check'
+#    est valide, et supprimer un texte compressé ne laisse pas de jetons.
+#  - Tokenizer unicode61 avec remove_diacritics 2 : "grâce", "grace" et "GRÂCE"
+#    donnent le même jeton, pour le français comme pour l'anglais.
+#  - Des triggers tiennent l'index à jour à chaque INSERT/UPDATE/DELETE de
+#    contents. Compresser un texte ne change pas son texte en clair : l'index
+#    n'est pas touché ; le remettre en clair le réindexe.
+
+CONTENTLESS_DELETE = sqlite3.sqlite_version_info >= (3, 43, 0)
+
+FULLTEXT_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS contents_fts USING fts5(
+    text,{options}
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+""".format(options="\n    content = '',\n    contentless_delete = 1," if CONTENTLESS_DELETE else "")
+
+# Index d'avant la compression des textes : contenu externe, relu dans contents
+_EXTERNAL_CONTENT_PATTERN = re.compile(r"content\s*=\s*'contents'")
+
+FULLTEXT_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS contents_fts_ai AFTER INSERT ON contents
+    BEGIN
+        INSERT INTO contents_fts (rowid, text)
+        SELECT NEW.id, NEW.text WHERE typeof(NEW.text) != 'blob';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS contents_fts_ad AFTER DELETE ON contents
+    BEGIN
+        DELETE FROM contents_fts WHERE rowid = OLD.id;
+    END""",
+    # Un BLOB est le même texte compressé (compress_book) : index inchangé
+    """CREATE TRIGGER IF NOT EXISTS contents_fts_au AFTER UPDATE OF text ON contents
+    WHEN typeof(NEW.text) != 'blob'
+    BEGIN
+        DELETE FROM contents_fts WHERE rowid = OLD.id;
+        INSERT INTO contents_fts (rowid, text) VALUES (NEW.id, NEW.text);
+    END""",
+]
+FULLTEXT_TRIGGER_NAMES = ("contents_fts_ai", "contents_fts_ad", "contents_fts_au")
+
+# Catégories acceptées par le filtre (mêmes clés que le prompt d'ingestion)
+CATEGORY_TITLES = {
+    "bible": "Bible",
+    "commentary": "Commentaire",
+    "intro": "Introduction",
+}
+
+# Index sans contenu : snippet() est NULL, l'extrait est construit en Python
+# (text_snippet) à partir de contents.text, décompressé si besoin
+SEARCH_SQL = """
+SELECT c.id, c.book_id, b.title, cat.title, c.start_ordinal, c.end_ordinal,
+       bm25(contents_fts) AS score,
+       snippet(contents_fts, 0, '[', ']', '…', {snippet_tokens}), c.text
+FROM contents_fts
+JOIN contents c ON c.id = contents_fts.rowid
+JOIN books b ON b.id = c.book_id
+LEFT JOIN category cat ON cat.id = b.category_id
+WHERE contents_fts MATCH ?{filters}
+ORDER BY score
+LIMIT ?
+"""
+
+_TERM_PATTERN = re.compile(r"\S+")
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def ensure_fulltext_schema(cursor):
+    """
+    Crée contents_fts et ses triggers si besoin ; à la création, l'index est
+    construit à partir des lignes déjà présentes dans contents (textes
+    compressés compris). Un index à contenu externe (content = 'contents') est
+    remplacé.
+    """
+    cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'contents_fts'")
+    row = cursor.fetchone()
+    if row is not None and _EXTERNAL_CONTENT_PATTERN.search(row[0]):
+        print("[INFO] Index plein texte à contenu externe : reconstruction.")
+        for name in FULLTEXT_TRIGGER_NAMES:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute("DROP TABLE contents_fts")
+        row = None
+    cursor.execute(FULLTEXT_SCHEMA)
+    ensure_fulltext_triggers(cursor)
+    if row is None:
+        cursor.execute("INSERT INTO contents_fts (rowid, text) SELECT id, text FROM contents "
+                       "WHERE typeof(text) != 'blob'")
+        cursor.execute("SELECT id, book_id, text FROM contents WHERE typeof(text) = 'blob'")
+        cursor.executemany("INSERT INTO contents_fts (rowid, text) VALUES (?, ?)", [
+            (content_id, inflate_text(cursor, book_id, value)) for content_id, book_id, value in cursor.fetchall()
+        ])
+
+
+def ensure_fulltext_triggers(cursor):
+    """Crée les triggers de synchronisation ; ceux d'un index à contenu externe ('delete') sont remplacés."""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'contents_fts_ad'")
+    row = cursor.fetchone()
+    if row is not None and "'delete'" in row[0]:
+        for name in FULLTEXT_TRIGGER_NAMES:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    for statement in FULLTEXT_TRIGGERS:
+        cursor.execute(statement)
+
+
+def optimize_fulltext(cursor):
+    """Fusionne les segments de contents_fts (après de nombreuses mises à jour, ex. decompress_book)."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'contents_fts'")
+    if cursor.fetchone() is not None:
+        cursor.execute("INSERT INTO contents_fts (contents_fts) VALUES ('optimize')")
+
+
+def to_fts_query(query):
+    """
+    Convertit une saisie libre en requête FTS5 : chaque mot devient une chaîne
+    entre guillemets (la ponctuation ne casse plus la syntaxe), tous les mots
+    sont requis ; un mot terminé par * reste une recherche par préfixe.
+    """
+    terms = []
+    for term in _TERM_PATTERN.findall(query):
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', '""')
+        if term:
+            terms.append(f'"{term}"*' if prefix else f'"{term}"')
+    return " ".join(terms)
+
+
+def search_contents(cursor, query, category=None, book=None, limit=20, snippet_tokens=16):
+    """
+    Recherche 'query' dans contents, classée par BM25 (meilleurs résultats d'abord).
+    - category : "bible", "commentary" ou "intro" (optionnel)
+    - book     : titre exact ou id de la table books (optionnel)
+    Retourne une liste de dict (content_id, book_id, book_title, category,
+    reference, score, snippet).
+    """
+    fts_query = to_fts_query(query)
+    if not fts_query:
+        return []
+
+    filters = []
+    params = [fts_query]
+    if category:
+        filters.append("cat.title = ?")
+        params.append(CATEGORY_TITLES.get(category, category))
+    if book:
+        if str(book).isdigit():
+            filters.append("b.id = ?")
+            params.append(int(book))
+        else:
+            filters.append("b.title = ?")
+            params.append(book)
+    params.append(limit)
+
+    sql = SEARCH_SQL.format(
+        snippet_tokens=int(snippet_tokens),
+        filters="".join(f"\n  AND {condition}" for condition in filters),
+    )
+    cursor.execute(sql, params)
+    return [
+        {
+            "content_id": content_id,
+            "book_id": book_id,
+            "book_title": book_title,
+            "category": category_title,
+            "reference": format_ordinal_range(start_ordinal, end_ordinal),
+            "score": score,
+            "snippet": (snippet if snippet is not None
+                        else text_snippet(inflate_text(cursor, book_id, value), query, snippet_tokens)),
+        }
+        for (content_id, book_id, book_title, category_title, start_ordinal, end_ordinal,
+             score, snippet, value) in cursor.fetchall()
+    ]
+
+
+def fold(text_content):
+    """Minuscules sans diacritiques, comme le tokenizer (remove_diacritics 2)."""
+    decomposed = unicodedata.normalize("NFKD", text_content.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def text_snippet(text_content, query, snippet_tokens=16):
+    """
+    Extrait comme snippet() de FTS5, pour un index sans contenu : fenêtre de
+    'snippet_tokens' mots qui contient le plus de termes distincts de 'query',
+    de préférence en début de phrase ; termes entre crochets, '…' aux coupures.
+    """
+    terms = []
+    for term in _TERM_PATTERN.findall(query):
+        folded = fold(term.rstrip("*"))
+        if folded:
+            terms.append((folded, term.endswith("*")))
+
+    tokens = list(_TOKEN_PATTERN.finditer(text_content))
+    hits = {}
+    for index, token in enumerate(tokens):
+        folded = fold(token.group())
+        for term_index, (term, prefix) in enumerate(terms):
+            if folded.startswith(term) if prefix else folded == term:
+                hits[index] = term_index
+                break
+
+    def score(first):
+        seen = set()
+        total = 0
+        for index in range(first, first + snippet_tokens):
+            if index in hits:
+                total += 1 if hits[index] in seen else 1000
+                seen.add(hits[index])
+        return total
+
+    # Débuts de phrase : mot précédé de '.' ou ':' (comme le découpage de FTS5)
+    sentence_starts = [0] + [index for index in range(1, len(tokens))
+                             if re.search(r"[.:]\s*$", text_content[tokens[index - 1].end():tokens[index].start()])]
+    best_score, start = -1, 0
+    if len(tokens) > snippet_tokens:
+        for hit in sorted(hits):
+            last = max(index for index in hits if hit <= index < hit + snippet_tokens)
+            adjusted = max(0, min(hit - (snippet_tokens - (last + 1 - hit)) // 2, len(tokens) - snippet_tokens))
+            candidates = [(score(hit), adjusted)]
+            sentence = max((index for index in sentence_starts if index < hit), default=None)
+            if sentence is not None:
+                candidates.append((score(sentence) + (120 if sentence == 0 else 100), sentence))
+            for candidate_score, candidate_start in candidates:
+                if candidate_score > best_score:
+                    best_score, start = candidate_score, candidate_start
+
+    window = tokens[start:start + snippet_tokens]
+    if not window:
+        return text_content[:200]
+    parts = [text_content[:window[0].start()] if start == 0 else "…"]
+    position = window[0].start()
+    for index, token in enumerate(window, start):
+        parts.append(text_content[position:token.start()])
+        parts.append(f"[{token.group()}]" if index in hits else token.group())
+        position = token.end()
+    parts.append("…" if start + snippet_tokens < len(tokens) else text_content[position:])
+    return "".join(parts)
+
+
+def format_ordinal_range(start_ordinal, end_ordinal):
+    """"Col 3:16" ou "Col 3:16-4:2" à partir de deux clés canoniques (None si inconnues)."""
+    if start_ordinal is None:
+        return None
+    position, chapter, verse = split_ordinal(start_ordinal)
+    if not 0 <= position < len(CANON_BOOKS):
+        return None
+    text_content = f"{CANON_BOOKS[position][0]} {chapter}:{verse}"
+    if end_ordinal is not None and end_ordinal != start_ordinal:
+        end_position, end_chapter, end_verse = split_ordinal(end_ordinal)
+        if end_position != position:
+            text_content += f"-{CANON_BOOKS[end_position][0]} {end_chapter}:{end_verse}"
+        elif end_chapter != chapter:
+            text_content += f"-{end_chapter}:{end_verse}"
+        else:
+            text_content += f"-{end_verse}"
+    return text_content
@@ -0,0 +1,156 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+from .settings import setting
+
+# Instrumentation légère de l'ingestion :
+#  - count(nom, n) incrémente un compteur du processus (documents, octets
+#    décodés, versets, blocs, lignes insérées...) ;
+#  - stage(nom, **champs) chronomètre une étape et, à sa sortie, émet un
+#    événement JSON avec sa durée et les compteurs incrémentés pendant l'étape ;
+#    la durée est aussi cumulée dans le compteur "<nom>_ms" (ex. write_ms =
+#    temps passé dans SQLite pour écrire les livres).
+# Les événements (une ligne JSON chacun) sont écrits dans le fichier désigné par
+# $INGEST_EVENTS ("-" pour stderr) ; sans cette variable, rien n'est écrit et le
+# coût se limite aux compteurs. Les workers de parallel_ingest émettent leurs
+# propres événements (champ "pid").
+#
+# profiled(chemin) enveloppe une exécution dans cProfile + tracemalloc et
+# enregistre un rapport texte (fonctions les plus coûteuses, allocations) et le
+# profil brut (.prof, lisible avec pstats ou snakeviz). Seul le processus courant
+# est profilé (pas les workers).
+
+_counters = Counter()
+
+# Nombre de lignes des sections du rapport de profilage
+PROFILE_FUNCTIONS = 40
+PROFILE_ALLOCATIONS = 25
+
+
+def count(name, value=1):
+    """Incrémente le compteur 'name' du processus courant."""
+    _counters[name] += value
+
+
+def counters():
+    """Copie des compteurs du processus courant."""
+    return dict(_counters)
+
+
+def reset_counters():
+    _counters.clear()
+
+
+def events_target():
+    """Destination des événements ($INGEST_EVENTS : chemin ou "-"), ou None."""
+    return setting("INGEST_EVENTS")
+
+
+def emit(event, **fields):
+    """Écrit un événement JSON (une ligne) si $INGEST_EVENTS est défini."""
+    target = events_target()
+    if target is None:
+        return
+    record = {"ts": round(time.time(), 3), "event": event, "pid": os.getpid()}
+    record.update(fields)
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    if target == "-":
+        sys.stderr.write(line)
+        return
+    # Ouverture en ajout à chaque événement : plusieurs processus peuvent écrire
+    with open(target, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def counters_since(before):
+    """Compteurs modifiés depuis l'instantané 'before' (voir counters), valeurs arrondies."""
+    delta = {}
+    for name, value in _counters.items():
+        change = value - before.get(name, 0)
+        if change:
+            delta[name] = round(change, 3) if isinstance(change, float) else change
+    return delta
+
+
+@contextmanager
+def stage(name, **fields):
+    """
+    Chronomètre l'étape 'name' (ex. "extract", "write", "index_rebuild").
+    'fields' est ajouté à l'événement ; le dict renvoyé par le with peut être
+    complété pendant l'étape (ex. fields["rows"] = 42).
+    L'événement est émis même si l'étape échoue (status "error").
+    """
+    before = dict(_counters)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield fields
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        _counters[f"{name}_ms"] += duration_ms
+        emit("stage", stage=name, status=status, duration_ms=round(duration_ms, 3),
+             counters=counters_since(before), **fields)
+
+
+def stop_inherited_profiling():
+    """
+    Initialiseur des workers : un processus créé par fork hérite du hook de
+    cProfile et de tracemalloc du parent, qui le ralentiraient sans être rapportés.
+    """
+    sys.setprofile(None)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+@contextmanager
+def profiled(report_path):
+    """
+    Profile le bloc (cProfile + tracemalloc) et écrit 'report_path' (texte)
+    et 'report_path' sans extension + ".prof" (profil brut).
+    """
+    directory = os.path.dirname(report_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        raw_path = os.path.splitext(report_path)[0] + ".prof"
+        profiler.dump_stats(raw_path)
+        buffer = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buffer)
+        stats.sort_stats("cumulative").print_stats(PROFILE_FUNCTIONS)
+        buffer.write("\n")
+        stats.sort_stats("tottime").print_stats(PROFILE_FUNCTIONS)
+
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(f"Durée totale : {elapsed:.2f} s\n")
+            f.write(f"Mémoire Python : pic {peak / 1e6:.1f} Mo, fin {current / 1e6:.1f} Mo\n\n")
+            f.write(f"== Allocations encore vivantes, par ligne (top {PROFILE_ALLOCATIONS}) ==\n")
+            for statistic in snapshot.statistics("lineno")[:PROFILE_ALLOCATIONS]:
+                f.write(f"{statistic}\n")
+            f.write(f"\n== Compteurs ==\n{json.dumps(counters(), indent=2, default=str)}\n")
+            f.write("\n== cProfile ==\n")
+            f.write(buffer.getvalue())
+        print(f"[INFO] Rapport de profilage : {report_path} (profil brut : {raw_path})",
+              file=sys.stderr)
@@ -1,29 +1,42 @@
-import sqlite3
-import os
-from .epub_parser import parse_epub_generic
-from dotenv import load_dotenv
+from .epub_parser import iter_sections
+from .instrumentation import count
 
-load_dotenv()
-
-def parse_introduction(epub_path, book_id):
-    db_path = os.environ["DATABASE_FILE"]
+def iter_introduction_rows(epub_path):
     """
-    Parse un EPUB de type 'Introduction' : pas de lien spécifique vers des versets,
-    insertion en un ou plusieurs blocs dans la table contents.
+    Génère un tuple (texte_section,) par document du spine, dans l'ordre
+    de lecture, un document en mémoire à la fois.
     """
-    result = parse_epub_generic(epub_path)
-    sections = result["sections"]
+    for section_title, text_content in iter_sections(epub_path):
+        yield (text_content,)
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+def extract_introduction_rows(epub_path):
+    """
+    Partie "CPU" du parsing d'une introduction, sans accès à la DB
+    (exécutable dans un processus worker, voir parallel_ingest).
+    Retourne une liste de tuples (texte_section,).
+    """
+    rows = list(iter_introduction_rows(epub_path))
+    count("sections", len(rows))
+    return rows
 
+def write_introduction_rows(cursor, book_id, rows):
+    """
+    Insère les lignes produites par extract_introduction_rows ou
+    iter_introduction_rows ('rows' peut être un itérateur).
+    Retourne le nombre de lignes insérées.
+    """
     # Insertion simplifiée : chaque section de l'EPUB => un bloc dans contents
-    for section_title, text_content in sections:
-        cursor.execute("""
-            INSERT INTO contents (book_id, start_verse_id, end_verse_id, text)
-            VALUES (?, NULL, NULL, ?)
-        """, (book_id, text_content))
+    cursor.executemany("""
+        INSERT INTO contents (book_id, start_verse_id, end_verse_id, text)
+        VALUES (?, NULL, NULL, ?)
+    """, ((book_id, text_content) for (text_content,) in rows))
+    return cursor.rowcount
 
-    conn.commit()
-    conn.close()
-    print(f"[INFO] Introduction parsed. Book ID: {book_id}")
+def clear_introduction_rows(cursor, book_id):
+    """
+    Supprime les sections de l'introduction 'book_id' avant sa réingestion
+    (les triggers retirent les entrées plein texte). Ne fait pas de commit.
+    Retourne le nombre de sections supprimées.
+    """
+    cursor.execute("DELETE FROM contents WHERE book_id = ?", (book_id,))
+    return cursor.rowcount
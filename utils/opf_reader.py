@@ -0,0 +1,117 @@
+import posixpath
+import zipfile
+from urllib.parse import unquote
+from xml.etree import ElementTree
+
+from .instrumentation import count
+
+# Lecture "métadonnées seulement" d'un EPUB : on ne lit que le répertoire central
+# du ZIP, META-INF/container.xml et le document OPF. Aucun document de contenu
+# (XHTML, images, polices) n'est décompressé.
+# iter_spine_documents lit ensuite les documents du spine un par un, directement
+# depuis leur membre ZIP : la mémoire reste bornée par le plus gros document,
+# quelle que soit la taille de l'EPUB (images, polices jamais lues).
+
+CONTAINER_PATH = "META-INF/container.xml"
+# Types des documents de contenu ; les autres entrées du spine (images...) sont ignorées
+DOCUMENT_TYPES = ("application/xhtml+xml", "text/html")
+
+
+def find_opf_path(archive):
+    """Retourne le chemin du document OPF déclaré dans META-INF/container.xml."""
+    container = ElementTree.fromstring(archive.read(CONTAINER_PATH))
+    rootfile = container.find(".//{*}rootfile")
+    if rootfile is None or not rootfile.get("full-path"):
+        raise ValueError("container.xml ne déclare aucun rootfile")
+    return rootfile.get("full-path")
+
+
+def _texts(metadata, tag):
+    """Liste des textes non vides des éléments Dublin Core 'tag'."""
+    values = []
+    for element in metadata.findall(f"{{*}}{tag}"):
+        text = (element.text or "").strip()
+        if text:
+            values.append(text)
+    return values
+
+
+def read_opf(archive):
+    """
+    Parse l'OPF d'une archive EPUB déjà ouverte.
+    Retourne un dict : title, creators, language, identifier, opf_path,
+    spine (liste ordonnée de (chemin_zip, media_type)).
+    """
+    opf_path = find_opf_path(archive)
+    package = ElementTree.fromstring(archive.read(opf_path))
+    opf_dir = posixpath.dirname(opf_path)
+
+    metadata = package.find("{*}metadata")
+    if metadata is None:
+        metadata = ElementTree.Element("metadata")
+
+    titles = _texts(metadata, "title")
+    languages = _texts(metadata, "language")
+
+    # Identifiant : de préférence celui désigné par unique-identifier
+    identifier = None
+    unique_id = package.get("unique-identifier")
+    for element in metadata.findall("{*}identifier"):
+        text = (element.text or "").strip()
+        if not text:
+            continue
+        if identifier is None or element.get("id") == unique_id:
+            identifier = text
+
+    # Manifest : id -> (href résolu, media-type)
+    manifest = {}
+    for item in package.iterfind("{*}manifest/{*}item"):
+        href = unquote(item.get("href", ""))
+        manifest[item.get("id")] = (
+            posixpath.normpath(posixpath.join(opf_dir, href)),
+            item.get("media-type"),
+        )
+
+    spine = []
+    for itemref in package.iterfind("{*}spine/{*}itemref"):
+        item = manifest.get(itemref.get("idref"))
+        if item is not None:
+            spine.append(item)
+
+    return {
+        "title": titles[0] if titles else None,
+        "creators": _texts(metadata, "creator"),
+        "language": languages[0] if languages else None,
+        "identifier": identifier,
+        "opf_path": opf_path,
+        "spine": spine,
+    }
+
+
+def read_epub_metadata(epub_path):
+    """
+    Lit uniquement les métadonnées d'un EPUB (titre, auteurs, langue,
+    identifiant, ordre du spine) sans charger les documents de contenu.
+    """
+    with zipfile.ZipFile(epub_path) as archive:
+        return read_opf(archive)
+
+
+def iter_spine_documents(epub_path):
+    """
+    Génère (chemin_zip, contenu_brut) pour chaque document XHTML du spine,
+    dans l'ordre de lecture, un seul document décompressé à la fois.
+    Un document déclaré dans l'OPF mais absent de l'archive est signalé et ignoré.
+    """
+    with zipfile.ZipFile(epub_path) as archive:
+        for zip_path, media_type in read_opf(archive)["spine"]:
+            if media_type not in DOCUMENT_TYPES:
+                continue
+            try:
+                content = archive.read(zip_path)
+            except KeyError:
+                print(f"[WARN] Document du spine absent de l'archive : {zip_path}")
+                continue
+            count("documents")
+            count("bytes_decoded", len(content))
+            yield zip_path, content
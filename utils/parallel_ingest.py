@@ -0,0 +1,152 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from .bible_parser import clear_bible_rows, extract_bible_rows, write_bible_rows
+from .db_bulk import (INGEST_PRAGMAS, apply_ingest_pragmas, can_drop_secondary_indexes,
+                      create_secondary_indexes, drop_secondary_indexes)
+from .commentary_parser import clear_commentary_rows, extract_commentary_rows, write_commentary_rows
+from .extraction_cache import cache_path_from_env, cache_stats, merge_cache_stats
+from .instrumentation import count, stage, stop_inherited_profiling
+from .introduction_parser import clear_introduction_rows, extract_introduction_rows, write_introduction_rows
+from .text_compression import compress_book, compression_threshold
+
+# Ingestion de plusieurs EPUB :
+#  - l'extraction (HTML -> texte, segmentation versets/commentaires) tourne
+#    dans des processus workers et renvoie des tuples compacts ;
+#  - un seul "writer" (le processus principal) possède la connexion SQLite
+#    et insère les lignes, une transaction par livre ;
+#  - s'il y a au moins une Bible, les réglages de chargement en masse (db_bulk)
+#    sont appliqués ; sur une copie de travail ou une base vide, les index
+#    secondaires sont supprimés puis reconstruits une seule fois à la fin, sur
+#    une base en service ils restent en place (une transaction par livre) ;
+#  - avec $TEXT_COMPRESSION_THRESHOLD, les textes longs de chaque livre sont
+#    compressés dans sa transaction (text_compression.compress_book) ;
+#  - un job "replace" (EPUB modifié) efface d'abord les anciennes lignes
+#    du livre, dans la même transaction que les nouvelles ; la ligne books d'un
+#    nouveau livre est insérée dans cette transaction aussi (on_book_start).
+# Le writer consomme les résultats dans l'ordre des jobs : les id auto-incrémentés
+# sont donc identiques à ceux d'une exécution séquentielle.
+
+EXTRACTORS = {
+    "bible": extract_bible_rows,
+    "commentary": extract_commentary_rows,
+    "intro": extract_introduction_rows,
+}
+
+WRITERS = {
+    "bible": write_bible_rows,
+    "commentary": write_commentary_rows,
+    "intro": write_introduction_rows,
+}
+
+# Catégories réingérables en place (job["replace"])
+CLEARERS = {
+    "bible": clear_bible_rows,
+    "commentary": clear_commentary_rows,
+    "intro": clear_introduction_rows,
+}
+
+
+def extract_job(job):
+    """Exécuté dans un worker : renvoie les lignes extraites pour un job."""
+    with stage("extract", epub=job["epub_path"], category=job["category"]):
+        return EXTRACTORS[job["category"]](job["epub_path"])
+
+
+def extract_job_with_stats(job):
+    """
+    extract_job, plus les compteurs du cache d'extraction de ce job : les workers
+    étant des processus séparés, le processus principal les additionne aux siens.
+    """
+    before = cache_stats()
+    rows = extract_job(job)
+    after = cache_stats()
+    return rows, {name: after[name] - before[name] for name in after}
+
+
+def _merge_worker_stats(results):
+    for rows, stats in results:
+        merge_cache_stats(stats)
+        yield rows
+
+
+def run_ingestion_jobs(conn, jobs, workers=1, on_book_done=None, pragmas=INGEST_PRAGMAS, on_book_start=None):
+    """
+    Extrait puis écrit chaque job dict(book_id, category, epub_path, ...).
+    - workers <= 1 : tout est fait dans le processus courant.
+    - workers > 1  : extraction dans un ProcessPoolExecutor, écriture ici.
+    on_book_start(cursor, job) est appelé dans la transaction du livre, avant
+    l'écriture ; il peut fixer job["book_id"] (ex. pour insérer la ligne books :
+    un livre dont l'ingestion échoue ne reste pas sans contenu).
+    on_book_done(cursor, job, row_count) est appelé dans la transaction du livre,
+    juste avant son commit (ex. pour mettre à jour le manifeste).
+    pragmas : réglages du chargement en masse (db_bulk.STAGING_PRAGMAS pour une
+    copie de travail, voir staging.py).
+    """
+    cursor = conn.cursor()
+    stats_before = cache_stats()
+    bulk = any(job["category"] == "bible" for job in jobs)
+    drop_indexes = bulk and can_drop_secondary_indexes(cursor, pragmas)
+    if bulk:
+        apply_ingest_pragmas(conn, pragmas)
+    if drop_indexes:
+        drop_secondary_indexes(cursor)
+
+    try:
+        with stage("ingestion", jobs=len(jobs), workers=workers):
+            _run_jobs(conn, cursor, jobs, workers, on_book_start, on_book_done)
+        if jobs and compression_threshold():
+            # Les UPDATE de la compression laissent des pages à moitié vides,
+            # que seul VACUUM récupère
+            with stage("vacuum"):
+                cursor.execute("VACUUM")
+    except BaseException:
+        # Le livre en cours n'est pas validé ; les livres précédents le sont déjà
+        conn.rollback()
+        raise
+    finally:
+        if drop_indexes:
+            with stage("index_rebuild"):
+                create_secondary_indexes(cursor)
+                conn.commit()
+    if jobs and cache_path_from_env():
+        stats = cache_stats()
+        print(f"[INFO] Extraction cache: {stats['hits'] - stats_before['hits']} hits, "
+              f"{stats['misses'] - stats_before['misses']} misses, "
+              f"{stats['evictions'] - stats_before['evictions']} evictions.")
+
+
+def _run_jobs(conn, cursor, jobs, workers, on_book_start, on_book_done):
+    """Extraction (ici ou dans un pool de processus) puis écriture."""
+    if workers <= 1 or len(jobs) <= 1:
+        results = (extract_job(job) for job in jobs)
+        _write_results(conn, cursor, jobs, results, on_book_start, on_book_done)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=stop_inherited_profiling) as executor:
+        # map() rend les résultats dans l'ordre des jobs, même si
+        # les workers terminent dans le désordre
+        results = _merge_worker_stats(executor.map(extract_job_with_stats, jobs))
+        _write_results(conn, cursor, jobs, results, on_book_start, on_book_done)
+
+
+def _write_results(conn, cursor, jobs, results, on_book_start, on_book_done):
+    """Boucle du writer : une transaction par livre."""
+    threshold = compression_threshold()
+    for job, rows in zip(jobs, results):
+        if on_book_start is not None:
+            on_book_start(cursor, job)
+        with stage("write", epub=job["epub_path"], category=job["category"], book_id=job["book_id"]):
+            if job.get("replace"):
+                count("rows_deleted", CLEARERS[job["category"]](cursor, job["book_id"]))
+            row_count = WRITERS[job["category"]](cursor, job["book_id"], rows)
+            count("rows_inserted", row_count)
+            if threshold:
+                with stage("compress", book_id=job["book_id"], threshold=threshold):
+                    compressed, plain_size, compressed_size = compress_book(cursor, job["book_id"], threshold)
+                    count("rows_compressed", compressed)
+                    count("bytes_saved", plain_size - compressed_size)
+            if on_book_done is not None:
+                on_book_done(cursor, job, row_count)
+            conn.commit()
+        print(f"[INFO] {job['category']} '{job['epub_path']}' ingested "
+              f"({row_count} rows, book_id={job['book_id']}).")
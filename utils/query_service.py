@@ -0,0 +1,554 @@
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from urllib.parse import parse_qs, quote, urlsplit
+
+from .cross_references import ensure_citation_schema, related_passages
+from .fulltext import ensure_fulltext_schema, search_contents
+from .reference_parser import format_reference, parse_query, parse_reference, reference_ordinals
+from .reference_resolver import (clear_alias_cache, iter_range, parse_range_key,
+                                 range_key, resolve_batch)
+from .settings import verse_store_path
+from .verse_keys import ensure_ordinal_schema, has_ordinal_schema
+from .verse_store import close_verse_store, load_verse_stores, range_texts, store_is_current
+from .versification import ensure_alignment_schema, format_canonical, parallel_ordinals, parallel_verses
+
+# Service de requêtes HTTP local (asyncio, bibliothèque standard uniquement),
+# pour remplacer un appel de main.py par requête :
+#   GET  /verse?ref=Col 3:16                contenus qui couvrent un verset
+#   GET  /range?ref=Col 3:16-4:2[&limit=N&preview=300&after=CLÉ]
+#                                           contenus qui recoupent une plage, par pages
+#                                           ("next" : valeur de after pour la suite)
+#   POST /batch  {"references": [...]}      plusieurs références (versets, plages,
+#                                           chapitres, listes) en une requête SQL
+#   GET  /parallel?ref=Ps 3[&book=LSG&book=2]  toutes les traductions, versets alignés
+#   GET  /text?ref=Ps 23[&book=4&book=5]    texte des versets de chaque Bible, lu dans
+#                                           les magasins mmap (main.py export) à jour
+#   GET  /related?ref=Col 3:16[&limit=20]   passages cités avec ce verset (co-citations)
+#   GET  /search?q=grâce[&category=&book=&limit=]
+#   GET  /status                            compteurs (cache, invalidations...)
+# Réponses en JSON (UTF-8), connexions HTTP/1.1 persistantes.
+#
+# Les requêtes SQL tournent dans un pool de threads, chacun empruntant une
+# connexion SQLite en lecture seule (mode=ro) ; sqlite3 relâche le GIL pendant
+# l'exécution, la boucle asyncio reste libre pour les autres clients.
+#
+# Cache LRU : les références analysées (parse_reference, parse_query) et les réponses déjà
+# rendues (JSON), indexées par clé canonique ("Col 3:16" et "Colossiens 3.16"
+# partagent la même entrée). Avant chaque requête, PRAGMA data_version d'une
+# connexion dédiée révèle tout commit d'une autre connexion (ingestion) : le
+# cache et les alias de livres sont alors vidés, et les magasins de versets
+# (verse_store.py, ouverts au démarrage) devenus périmés sont abandonnés : /text
+# lit alors ces traductions dans la base. Une réponse calculée avant une
+# invalidation n'est pas mise en cache.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_POOL_SIZE = 4
+DEFAULT_CACHE_SIZE = 4096
+MAX_BODY_BYTES = 1 << 20
+MAX_BATCH_REFERENCES = 1000
+MAX_LIMIT = 1000
+MAX_PREVIEW = 100000
+
+STATUS_TEXTS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+
+class RequestError(Exception):
+    """Requête invalide : 'status' et message renvoyés au client."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+parsed_reference = lru_cache(maxsize=DEFAULT_CACHE_SIZE)(parse_reference)
+
+
+@lru_cache(maxsize=DEFAULT_CACHE_SIZE)
+def parsed_query(ref_str):
+    """parse_query mis en cache ; tuple de Reference (vide si rien n'est reconnu)."""
+    return tuple(parse_query(ref_str))
+
+
+def connect_read_only(db_path):
+    """
+    Connexion en lecture seule, utilisable depuis un autre thread que celui qui
+    l'a ouverte. Mode autocommit : l'écriture dans la table temporaire de
+    resolve_batch n'ouvre pas de transaction qui garderait un verrou de lecture
+    (et bloquerait les commits de l'ingestion).
+    """
+    uri = f"file:{quote(os.path.abspath(db_path))}?mode=ro"
+    return sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None)
+
+
+def prepare_database(db_path):
+    """
+    Vérifie que la base existe et porte les clés canoniques, l'index plein
+    texte, l'alignement des versifications et le graphe des co-citations ; une
+    base plus ancienne est migrée une fois, avant l'ouverture du pool.
+    """
+    if not os.path.exists(db_path):
+        raise SystemExit(f"[ERROR] Base introuvable : {db_path} "
+                         f"(python main.py ingest, ou --db / $DATABASE_FILE).")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master "
+                   "WHERE name IN ('contents_fts', 'verse_alignment', 'cocitations')")
+    migrated = cursor.fetchone()[0] == 3 and has_ordinal_schema(cursor)
+    if not migrated:
+        ensure_ordinal_schema(cursor)
+        ensure_fulltext_schema(cursor)
+        ensure_alignment_schema(cursor)
+        ensure_citation_schema(cursor)
+        conn.commit()
+    conn.close()
+
+
+def create_service(db_path, pool_size=DEFAULT_POOL_SIZE, cache_size=DEFAULT_CACHE_SIZE, store_directory=None):
+    """
+    État du service : pool de connexions, threads, cache, compteurs et magasins
+    de versets à jour de 'store_directory' (défaut : settings.verse_store_path).
+    """
+    prepare_database(db_path)
+    pool = queue.Queue()
+    for _ in range(pool_size):
+        pool.put(connect_read_only(db_path))
+    watch = connect_read_only(db_path)
+    return {
+        "db_path": db_path,
+        "pool": pool,
+        "pool_size": pool_size,
+        "executor": ThreadPoolExecutor(pool_size, thread_name_prefix="query"),
+        "watch": watch,
+        "stores": load_verse_stores(store_directory or verse_store_path(), watch.cursor()),
+        "data_version": None,
+        "generation": 0,
+        "cache": OrderedDict(),
+        "cache_size": cache_size,
+        "stats": Counter(),
+    }
+
+
+def close_service(service):
+    service["executor"].shutdown(wait=True)
+    service["watch"].close()
+    while not service["pool"].empty():
+        service["pool"].get_nowait().close()
+    for store in service["stores"].values():
+        close_verse_store(store)
+
+
+def invalidate(service):
+    """
+    Vide le cache des réponses et les alias de livres (la base a changé) et
+    abandonne les magasins de versets périmés. Ils ne sont pas fermés : une
+    requête en cours peut encore les lire, la projection est libérée avec eux.
+    """
+    service["cache"].clear()
+    service["generation"] += 1
+    service["stats"]["invalidations"] += 1
+    clear_alias_cache()
+    cursor = service["watch"].cursor()
+    service["stores"] = {book_id: store for book_id, store in service["stores"].items()
+                         if store_is_current(store, cursor)}
+
+
+def check_data_version(service):
+    """Invalide le cache si une autre connexion a validé une écriture depuis le dernier appel."""
+    version = service["watch"].execute("PRAGMA data_version").fetchone()[0]
+    if version != service["data_version"]:
+        if service["data_version"] is not None:
+            invalidate(service)
+        service["data_version"] = version
+
+
+def _with_connection(service, func, args):
+    """Exécuté dans un thread du pool : emprunte une connexion le temps de 'func'."""
+    conn = service["pool"].get()
+    try:
+        return func(service["db_path"], conn.cursor(), *args)
+    finally:
+        service["pool"].put(conn)
+
+
+async def run_in_pool(service, func, *args):
+    """func(db_path, cursor, *args) sur une connexion du pool, hors de la boucle asyncio."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(service["executor"], _with_connection, service, func, args)
+
+
+def cache_get(service, key):
+    body = service["cache"].get(key)
+    if body is None:
+        service["stats"]["cache_misses"] += 1
+        return None
+    service["cache"].move_to_end(key)
+    service["stats"]["cache_hits"] += 1
+    return body
+
+
+def cache_put(service, key, body, generation):
+    """Met 'body' en cache, sauf s'il a été calculé avant une invalidation."""
+    cache = service["cache"]
+    if generation != service["generation"] or service["cache_size"] <= 0:
+        return
+    cache[key] = body
+    cache.move_to_end(key)
+    while len(cache) > service["cache_size"]:
+        cache.popitem(last=False)
+
+
+async def cached(service, key, func, *args):
+    """Réponse JSON (bytes) en cache sous 'key', sinon calculée par func dans le pool."""
+    body = cache_get(service, key)
+    if body is None:
+        generation = service["generation"]
+        body = await run_in_pool(service, func, *args)
+        cache_put(service, key, body, generation)
+    return body
+
+
+def render(payload):
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def param(params, name, default=None):
+    """Dernière valeur du paramètre 'name' de la requête (parse_qs : listes de valeurs)."""
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def required_reference(params):
+    ref_str = param(params, "ref", "").strip()
+    reference = parsed_reference(ref_str) if ref_str else None
+    if reference is None:
+        raise RequestError(400, f"Référence invalide : '{ref_str}' (paramètre ref, ex. Col 3:16).")
+    return reference
+
+
+def int_param(params, name, default, maximum):
+    value = param(params, name)
+    if value is None:
+        return default
+    if not value.isdigit() or not 0 < int(value) <= maximum:
+        raise RequestError(400, f"Paramètre {name} invalide : '{value}' (1 à {maximum}).")
+    return int(value)
+
+
+def _batch_records(db_path, cursor, queries):
+    """Enregistrements JSON (bytes), un par requête (tuple de Reference), via resolve_batch."""
+    parsed_refs = [("; ".join(format_reference(reference) for reference in references), references)
+                   for references in queries]
+    return [render(record) for record in resolve_batch(cursor, parsed_refs)]
+
+
+def _range_body(db_path, cursor, reference, limit, preview, after):
+    start_ordinal, end_ordinal = reference_ordinals(reference)
+    # Une page de limit + 1 contenus : le dernier indique seulement s'il y a une suite
+    results = list(islice(iter_range(cursor, start_ordinal, end_ordinal, preview, after, limit + 1), limit + 1))
+    return render({
+        "reference": format_reference(reference),
+        "start_ordinal": start_ordinal,
+        "end_ordinal": end_ordinal,
+        "results": results[:limit],
+        "next": range_key(results[limit - 1]) if len(results) > limit else None,
+    })
+
+
+def _parallel_body(db_path, cursor, reference, books):
+    start_ordinal, end_ordinal = parallel_ordinals(reference)
+    return render({
+        "reference": format_reference(reference),
+        "verses": parallel_verses(cursor, start_ordinal, end_ordinal, books),
+    })
+
+
+def _related_body(db_path, cursor, reference, limit):
+    start_ordinal, end_ordinal = reference_ordinals(reference)
+    return render({
+        "reference": format_reference(reference),
+        "results": related_passages(cursor, start_ordinal, end_ordinal, limit),
+    })
+
+
+def _text_body(db_path, cursor, reference, books, stores):
+    start_ordinal, end_ordinal = parallel_ordinals(reference)
+    if not books:
+        cursor.execute("""SELECT b.id FROM books b JOIN category cat ON cat.id = b.category_id
+                          WHERE cat.title = 'Bible' ORDER BY b.id""")
+        books = [row[0] for row in cursor.fetchall()]
+    translations = []
+    for book_id in books:
+        store = stores.get(book_id)
+        if store is not None:
+            verses = range_texts(store, start_ordinal, end_ordinal)
+        else:
+            # Comme le magasin : les textes d'un même verset canonique bout à bout
+            verses = [(verse["ordinal"], " ".join(translation["text"] or "" for translation in verse["translations"]))
+                      for verse in parallel_verses(cursor, start_ordinal, end_ordinal, [book_id])]
+        translations.append({
+            "book_id": book_id,
+            "source": "store" if store is not None else "database",
+            "verses": [{"ordinal": ordinal, "reference": format_canonical(ordinal), "text": text_content}
+                       for ordinal, text_content in verses],
+        })
+    return render({"reference": format_reference(reference), "translations": translations})
+
+
+def _search_body(db_path, cursor, query, category, book, limit):
+    return render({"query": query, "results": search_contents(cursor, query, category, book, limit)})
+
+
+def verse_key(reference):
+    """Clé de cache d'un verset : sa clé canonique (None : plage ou chapitre, non gérés par /verse)."""
+    start_ordinal, end_ordinal = reference_ordinals(reference)
+    if reference.start_verse is None or start_ordinal != end_ordinal:
+        return None
+    return ("verse", start_ordinal)
+
+
+def batch_key(references):
+    """Clé de cache d'une requête de /batch : celle du verset seul (partagée avec /verse), sinon ses plages."""
+    if len(references) == 1 and verse_key(references[0]) is not None:
+        return verse_key(references[0])
+    return ("ranges",) + tuple(reference_ordinals(reference) for reference in references)
+
+
+async def handle_verse(service, params, body):
+    reference = required_reference(params)
+    key = verse_key(reference)
+    if key is None:
+        raise RequestError(400, "Verset attendu (ex. Col 3:16) ; /range pour une plage ou un chapitre.")
+    cached_body = cache_get(service, key)
+    if cached_body is not None:
+        return cached_body
+    generation = service["generation"]
+    [record] = await run_in_pool(service, _batch_records, [(reference,)])
+    cache_put(service, key, record, generation)
+    return record
+
+
+async def handle_batch(service, params, body):
+    """
+    Corps : {"references": ["Col 3:16", "Ps 23", "Gen 1.1; 2.3-5", ...]} ou une
+    liste JSON. Les références déjà en cache sont reprises telles quelles ; les
+    autres sont résolues ensemble.
+    """
+    try:
+        ref_strings = json.loads(body or b"null")
+    except ValueError:
+        raise RequestError(400, "Corps JSON invalide.")
+    if isinstance(ref_strings, dict):
+        ref_strings = ref_strings.get("references")
+    if not isinstance(ref_strings, list) or not all(isinstance(ref, str) for ref in ref_strings):
+        raise RequestError(400, 'Corps attendu : {"references": ["Col 3:16", ...]}.')
+    if len(ref_strings) > MAX_BATCH_REFERENCES:
+        raise RequestError(413, f"Au plus {MAX_BATCH_REFERENCES} références par lot.")
+
+    records = [None] * len(ref_strings)
+    missing = []
+    for index, ref_str in enumerate(ref_strings):
+        references = parsed_query(ref_str.strip())
+        if not references:
+            records[index] = render({
+                "reference": ref_str, "ranges": [],
+                "warning": f"[ERROR] Impossible de parser la référence '{ref_str}'.",
+                "results": [],
+            })
+            continue
+        key = batch_key(references)
+        records[index] = cache_get(service, key)
+        if records[index] is None:
+            missing.append((index, key, references))
+
+    if missing:
+        generation = service["generation"]
+        resolved = await run_in_pool(service, _batch_records, [references for _, _, references in missing])
+        for (index, key, _), record in zip(missing, resolved):
+            records[index] = record
+            cache_put(service, key, record, generation)
+    return b'{"results": [' + b", ".join(records) + b"]}"
+
+
+async def handle_range(service, params, body):
+    reference = required_reference(params)
+    limit = int_param(params, "limit", MAX_LIMIT, MAX_LIMIT)
+    preview = int_param(params, "preview", None, MAX_PREVIEW)
+    after = param(params, "after")
+    if after is not None:
+        after = parse_range_key(after)
+        if after is None:
+            raise RequestError(400, "Paramètre after invalide (valeur \"next\" d'une réponse /range).")
+    start_ordinal, end_ordinal = reference_ordinals(reference)
+    return await cached(service, ("range", start_ordinal, end_ordinal, limit, preview, after),
+                        _range_body, reference, limit, preview, after)
+
+
+async def handle_parallel(service, params, body):
+    reference = required_reference(params)
+    books = tuple(params.get("book", ()))
+    return await cached(service, ("parallel",) + parallel_ordinals(reference) + (books,),
+                        _parallel_body, reference, books)
+
+
+async def handle_text(service, params, body):
+    reference = required_reference(params)
+    books = params.get("book", ())
+    if not all(book.isdigit() for book in books):
+        raise RequestError(400, "Paramètre book : id de la table books (ex. book=4).")
+    books = tuple(int(book) for book in books)
+    return await cached(service, ("text",) + parallel_ordinals(reference) + (books,),
+                        _text_body, reference, books, service["stores"])
+
+
+async def handle_related(service, params, body):
+    reference = required_reference(params)
+    limit = int_param(params, "limit", 20, MAX_LIMIT)
+    return await cached(service, ("related",) + reference_ordinals(reference) + (limit,),
+                        _related_body, reference, limit)
+
+
+async def handle_search(service, params, body):
+    query = param(params, "q", "").strip()
+    if not query:
+        raise RequestError(400, "Paramètre q manquant.")
+    category = param(params, "category") or None
+    book = param(params, "book") or None
+    limit = int_param(params, "limit", 20, MAX_LIMIT)
+    return await cached(service, ("search", query, category, book, limit),
+                        _search_body, query, category, book, limit)
+
+
+async def handle_status(service, params, body):
+    return render({
+        "db_path": service["db_path"],
+        "data_version": service["data_version"],
+        "pool_size": service["pool_size"],
+        "cache_entries": len(service["cache"]),
+        "cache_size": service["cache_size"],
+        "verse_stores": sorted(service["stores"]),
+        "stats": dict(service["stats"]),
+    })
+
+
+ROUTES = {
+    "/verse": ("GET", handle_verse),
+    "/range": ("GET", handle_range),
+    "/batch": ("POST", handle_batch),
+    "/parallel": ("GET", handle_parallel),
+    "/text": ("GET", handle_text),
+    "/related": ("GET", handle_related),
+    "/search": ("GET", handle_search),
+    "/status": ("GET", handle_status),
+}
+
+
+async def dispatch(service, method, target, body):
+    """Retourne (statut HTTP, corps JSON en bytes)."""
+    url = urlsplit(target)
+    route = ROUTES.get(url.path)
+    try:
+        if route is None:
+            raise RequestError(404, f"Chemin inconnu : {url.path}")
+        expected_method, handler = route
+        if method != expected_method:
+            raise RequestError(405, f"{url.path} attend {expected_method}.")
+        params = parse_qs(url.query)
+        service["stats"]["requests"] += 1
+        check_data_version(service)
+        return 200, await handler(service, params, body)
+    except RequestError as error:
+        return error.status, render({"error": str(error)})
+    except Exception as error:
+        print(f"[WARN] {method} {target} : {error!r}")
+        return 500, render({"error": repr(error)})
+
+
+async def read_request(reader):
+    """(méthode, cible, version, en-têtes, corps), ou None si le client a fermé la connexion."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, target, version = request_line.decode("utf-8", "replace").split()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY_BYTES:
+        raise RequestError(413, f"Corps limité à {MAX_BODY_BYTES} octets.")
+    body = await reader.readexactly(length) if length else b""
+    return method, target, version, headers, body
+
+
+async def handle_connection(service, reader, writer):
+    """Une connexion client : requêtes successives tant qu'elle reste ouverte (keep-alive)."""
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except RequestError as error:
+                status, body, keep_alive = error.status, render({"error": str(error)}), False
+            except ValueError:
+                status, body, keep_alive = 400, render({"error": "Requête HTTP invalide."}), False
+            else:
+                if request is None:
+                    break
+                method, target, version, headers, request_body = request
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                status, body = await dispatch(service, method, target, request_body)
+            writer.write(
+                f"HTTP/1.1 {status} {STATUS_TEXTS[status]}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_forever(service, host, port):
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(service, reader, writer), host, port)
+    address = server.sockets[0].getsockname()
+    print(f"[INFO] Service de requêtes : http://{address[0]}:{address[1]} "
+          f"(base {service['db_path']}, {service['pool_size']} connexions, "
+          f"cache de {service['cache_size']} réponses, "
+          f"{len(service['stores'])} magasins de versets)", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def serve(db_path, host=DEFAULT_HOST, port=DEFAULT_PORT,
+          pool_size=DEFAULT_POOL_SIZE, cache_size=DEFAULT_CACHE_SIZE):
+    """Lance le service jusqu'à Ctrl+C ; port 0 : port libre choisi par le système."""
+    service = create_service(db_path, pool_size, cache_size)
+    try:
+        asyncio.run(serve_forever(service, host, port))
+    except KeyboardInterrupt:
+        print("[INFO] Service arrêté.")
+    finally:
+        close_service(service)
@@ -0,0 +1,255 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from .canon import CANON_BOOKS, book_position, canon_names, normalize_book_name
+from .verse_keys import CHAPTER_FACTOR, verse_ordinal
+
+# Analyse des références bibliques, partagée par main.py et les parseurs.
+#
+# Un seul motif compilé reconnaît tous les noms de livres connus (canon FR/EN,
+# abréviations, et éventuellement les titres de bible_books). Les noms sont
+# rangés dans un trie puis écrits sous forme d'expression régulière factorisée
+# par préfixe ("Jo(?:b|el|nas|...)") : à chaque position du texte, le moteur ne
+# suit qu'une branche au lieu d'essayer des centaines d'alternatives.
+#
+# Formes reconnues (séparateur chapitre/verset ":" ou ".") :
+#   Col 3:16          Col 3:16-20        Col 3:16–4:2 (sur plusieurs chapitres)
+#   Ps 23             Ps 23-25           1 Jean 3.16
+#   Gen 1.1; 2.3-5    Ex 3:5, 7, 8       Ésaïe 13:10; 34:4
+#   1Co 13.4          1 Co 13.4          JEAN 3.16
+# Un verset absent (chapitre entier) est représenté par None ; un chapitre ou un
+# verset 0 n'existe pas, la référence est ignorée. Comme
+# book_position, l'analyse ignore la casse : le motif (noms en minuscules) est
+# appliqué au texte mis en minuscules, plus rapide que re.IGNORECASE. L'espace
+# après le numéro d'un livre numéroté est facultatif ("1Jn", "1 Jn", "1Jean").
+
+Reference = namedtuple(
+    "Reference",
+    ["position", "start_chapter", "start_verse", "end_chapter", "end_verse", "start", "end"],
+)
+
+# Un élément : "3", "3:16", "3:16a", "3:16-20", "3:16-4:2", "3-4"
+_ITEM = r"\d{1,3}(?:[:.]\d{1,3}[a-d]?)?(?:\s*[-–—]\s*\d{1,3}(?:[:.]\d{1,3})?[a-d]?)?"
+# Élément suivant d'une liste ; "1 Sam" ou "2 Rois" après une virgule n'en est pas un
+_NEXT_ITEM = r"\s*[,;]\s*(?![1-3]\s?[^\W\d_])" + _ITEM
+_ITEM_PATTERN = re.compile(
+    r"(?P<sep>[,;])?\s*(?P<a>\d+)(?:[:.](?P<b>\d+)[a-d]?)?"
+    r"(?:\s*[-–—]\s*(?P<c>\d+)(?:[:.](?P<d>\d+))?[a-d]?)?"
+)
+
+# Numéro de livre en tête de nom ("1Co" -> "1 Co" : l'espace devient facultatif dans le trie)
+_NUMBERED_NAME = re.compile(r"^([1-3])\s*(?=[^\W\d_])")
+
+# Livres d'un seul chapitre : "Jude 3" désigne le verset 3
+_SINGLE_CHAPTER_BOOKS = {book_position(name) for name in ("Ab", "Phm", "2Jn", "3Jn", "Jude")}
+# Abréviations qui sont aussi des mots courants (FR/EN) : dans un texte suivi,
+# retenues seulement avec un verset explicite ("So 3 men" n'est pas Sophonie 3,
+# "So 3:4" l'est). Une requête explicite ("Is 53") n'est pas filtrée.
+_AMBIGUOUS_NAMES = {"so", "he", "is", "am", "ha", "na", "mi", "os", "ne", "es"}
+
+# Entrée réduite à une seule référence ("Col 3:16", "1 Jean 3.16-18") : le livre
+# est cherché directement dans l'index du canon, sans compiler le motif complet
+# (quelques dizaines de ms au démarrage de main.py query)
+_SINGLE_REFERENCE = re.compile(
+    r"\s*(?P<book>(?:[1-3]\s?)?[^\W\d_][^\d]*?)\.?\s*(?P<body>" + _ITEM + r")\s*"
+)
+
+_default_matcher = None
+
+
+def _trie_pattern(names):
+    """Expression régulière factorisée par préfixe reconnaissant 'names' en minuscules."""
+    trie = {}
+    for name in names:
+        name = _NUMBERED_NAME.sub(r"\1 ", name).lower()
+        node = trie
+        for char in name:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node):
+        branches = []
+        for char in sorted(c for c in node if c):
+            token = r"\s?" if char == " " else re.escape(char)
+            branches.append(token + emit(node[char]))
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Nom complet à ce nœud : la suite est optionnelle (le plus long d'abord)
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+def build_matcher(extra_names=()):
+    """
+    Compile le motif de références.
+    extra_names : noms supplémentaires (ex. titres de bible_books) ; ceux que le
+    canon ne sait pas rattacher à un livre sont ignorés.
+    Retourne (motif_compilé, dict nom_normalisé -> position canonique).
+    """
+    positions = {}
+    names = set()
+    for position in range(len(CANON_BOOKS)):
+        for name in canon_names(position):
+            names.add(name)
+            positions.setdefault(normalize_book_name(name), position)
+    for name in extra_names:
+        position = book_position(name)
+        if name and position is not None:
+            names.add(name)
+            positions.setdefault(normalize_book_name(name), position)
+
+    # Pas de début de nom juste après "1 " : "1 Jn 3.16" n'est pas "Jn 3.16"
+    pattern = re.compile(
+        r"(?<!\w)(?<![1-3]\s)(?P<book>" + _trie_pattern(sorted(names)) + r")\.?\s*"
+        r"(?P<body>" + _ITEM + r"(?:" + _NEXT_ITEM + r")*)(?![\d:])"
+    )
+    return pattern, positions
+
+
+def default_matcher():
+    """Motif construit sur les seuls noms du canon (compilé au premier appel)."""
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = build_matcher()
+    return _default_matcher
+
+
+def _body_references(position, body, start, end):
+    """Découpe le corps "3:16-20, 22; 4:1" en références."""
+    references = []
+    chapter = None
+    has_verses = False
+    for item in _ITEM_PATTERN.finditer(body):
+        sep, a, b, c, d = item.group("sep", "a", "b", "c", "d")
+        if position in _SINGLE_CHAPTER_BOOKS and b is None:
+            # "Jude 3-5" -> "Jude 1:3-5"
+            a, b = "1", a
+            if c is not None and d is None:
+                c, d = "1", c
+        a = int(a)
+        if b is not None:
+            # "C:V..." : chapitre explicite
+            chapter, start_verse = a, int(b)
+            has_verses = True
+        elif sep == "," and has_verses:
+            # ", 22" après "3:16" : verset du même chapitre
+            start_verse = a
+        else:
+            # "3" ou "3-4" : chapitre(s) entier(s)
+            chapter, start_verse = a, None
+            has_verses = False
+
+        end_chapter, end_verse = chapter, start_verse
+        if d is not None:
+            end_chapter, end_verse = int(c), int(d)
+        elif c is not None:
+            if start_verse is None:
+                end_chapter = int(c)
+            else:
+                end_verse = int(c)
+
+        if 0 in (chapter, start_verse, end_chapter, end_verse):
+            continue  # chapitre ou verset 0 : n'existe pas
+        if (end_chapter, end_verse or 0) < (chapter, start_verse or 0):
+            continue  # plage à l'envers : ignorée
+        references.append(Reference(position, chapter, start_verse, end_chapter, end_verse,
+                                    start, end))
+    return references
+
+
+@lru_cache(maxsize=4096)
+def _book_key(book_text):
+    """normalize_book_name mis en cache : le texte d'un livre se répète beaucoup."""
+    return normalize_book_name(book_text)
+
+
+def parse_references(text_content, matcher=None, free_text=True):
+    """
+    Génère les Reference trouvées dans 'text_content', dans l'ordre du texte.
+    Dans un texte suivi (free_text), un nom en minuscules suivi d'un simple
+    numéro de chapitre ("numbers 74", "a psalm. 1") est un mot, pas une
+    référence : comme pour _AMBIGUOUS_NAMES, un verset explicite est exigé.
+    free_text=False : requête explicite, aucun de ces filtres ("is 53" = Ésaïe 53).
+    """
+    pattern, positions = matcher or default_matcher()
+    lowered = text_content.lower()
+    if len(lowered) != len(text_content):
+        # Rare ("İ" -> "i̇") : les positions du texte en minuscules seraient décalées
+        lowered = text_content
+    search_from = 0
+    while True:
+        match = pattern.search(lowered, search_from)
+        if match is None:
+            return
+        book_key = _book_key(match.group("book"))
+        position = positions.get(book_key)
+        needs_verse = free_text and (book_key in _AMBIGUOUS_NAMES
+                                     or text_content[match.start("book"):match.end("book")].islower())
+        found = False
+        if position is not None:
+            for reference in _body_references(position, match.group("body"), match.start(), match.end()):
+                if reference.start_verse is None and needs_verse:
+                    continue
+                found = True
+                yield reference
+        # Correspondance écartée ("he 1 Samuel 6") : la suite du texte est relue
+        search_from = match.end() if found else match.end("book")
+
+
+def parse_query(ref_str, matcher=None):
+    """
+    Références d'une requête explicite : une référence ("1 Jean 3.16", "Is 53")
+    ou une liste ("Gen 1.1; 2.3-5"). Retourne une liste, vide si rien n'est reconnu.
+    """
+    match = _SINGLE_REFERENCE.fullmatch(ref_str) if matcher is None else None
+    if match:
+        position = book_position(match.group("book"))
+        if position is not None:
+            return _body_references(position, match.group("body"),
+                                    match.start("book"), match.end("body"))
+    return list(parse_references(ref_str, matcher, free_text=False))
+
+
+def parse_reference(ref_str, matcher=None):
+    """Première référence de la requête 'ref_str' (voir parse_query), ou None."""
+    references = parse_query(ref_str, matcher)
+    return references[0] if references else None
+
+
+def scan_texts(texts, matcher=None):
+    """
+    API batch : parcourt une suite de textes (sections d'un commentaire...)
+    en une passe et génère (index_du_texte, Reference).
+    """
+    matcher = matcher or default_matcher()
+    for index, text_content in enumerate(texts):
+        for reference in parse_references(text_content, matcher):
+            yield index, reference
+
+
+def reference_ordinals(reference):
+    """(start_ordinal, end_ordinal) d'une Reference ; chapitre entier = versets 1 à 999."""
+    start_verse = reference.start_verse if reference.start_verse is not None else 1
+    end_verse = reference.end_verse if reference.end_verse is not None else CHAPTER_FACTOR - 1
+    return (
+        verse_ordinal(reference.position, reference.start_chapter, start_verse),
+        verse_ordinal(reference.position, reference.end_chapter, end_verse),
+    )
+
+
+def format_reference(reference):
+    """Forme courte "Col 3:16-20" (abréviation du canon)."""
+    abbreviation = CANON_BOOKS[reference.position][0]
+    text_content = f"{abbreviation} {reference.start_chapter}"
+    if reference.start_verse is not None:
+        text_content += f":{reference.start_verse}"
+    if reference.end_chapter != reference.start_chapter:
+        text_content += f"-{reference.end_chapter}"
+        if reference.end_verse is not None:
+            text_content += f":{reference.end_verse}"
+    elif reference.end_verse != reference.start_verse:
+        text_content += f"-{reference.end_verse}"
+    return text_content
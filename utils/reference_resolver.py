@@ -0,0 +1,253 @@
+from itertools import groupby
+
+from .canon import book_position, canon_names, normalize_book_name
+from .reference_parser import format_reference, reference_ordinals
+from .text_compression import inflate_text
+from .verse_keys import verse_ordinal
+
+# Résolution "livre chapitre:verset" -> contenus, en une seule requête SQL.
+#  - Les noms de livres sont résolus en mémoire : la table bible_books (titres et
+#    abréviations) est chargée une fois dans un dictionnaire de correspondance
+#    exacte, normalisé (casse, accents, espaces), complété par les noms FR/EN
+#    du canon (canon.py). Plus de LIKE '%x%' : "Ex" désigne l'Exode et rien d'autre.
+#  - Le verset devient une clé canonique (verse_keys) ; existence du verset et
+#    contenus qui le couvrent sortent d'une seule jointure indexée
+#    (index unique verses.ordinal + R*Tree contents_span).
+
+RESOLVE_VERSE_SQL = """
+SELECT v.id, c.id, c.book_id, c.start_verse_id, c.end_verse_id, c.text, b.title
+FROM verses v
+LEFT JOIN contents_span s ON s.start_ordinal <= v.ordinal AND s.end_ordinal >= v.ordinal
+LEFT JOIN contents c ON c.id = s.id
+LEFT JOIN books b ON b.id = c.book_id
+WHERE v.ordinal = ?
+ORDER BY s.start_ordinal, s.end_ordinal
+"""
+
+# Contenus dont la plage recoupe [début, fin] (clés canoniques), via le R*Tree,
+# une page à la fois : pagination par clé (start_ordinal, end_ordinal, id) du
+# dernier contenu lu, sans OFFSET. {text} vaut c.text ou substr(c.text, 1, ?) :
+# l'aperçu est tronqué dans SQLite, seul le début du texte en sort (un texte
+# compressé sort entier, seul son début est décompressé).
+RANGE_PAGE_SQL = """
+SELECT s.start_ordinal, s.end_ordinal, c.id, c.book_id, b.title,
+       c.start_verse_id, c.end_verse_id, {text}
+FROM contents_span s
+JOIN contents c ON c.id = s.id
+JOIN books b ON b.id = c.book_id
+WHERE s.start_ordinal <= ? AND s.end_ordinal >= ?
+  AND s.start_ordinal >= ?
+  AND (s.start_ordinal, s.end_ordinal, c.id) > (?, ?, ?)
+ORDER BY s.start_ordinal, s.end_ordinal, c.id
+LIMIT ?
+"""
+RANGE_PAGE_SIZE = 200
+
+# Cache des dictionnaires d'alias, par chemin de base de données
+_alias_cache = {}
+
+
+def load_book_aliases(cursor):
+    """
+    Construit le dictionnaire nom_normalisé -> position canonique à partir de
+    bible_books (titre, abréviation) et des noms connus du canon pour ces livres.
+    """
+    aliases = {}
+    cursor.execute("SELECT title, abbreviation FROM bible_books")
+    for title, abbreviation in cursor.fetchall():
+        position = book_position(title)
+        if position is None:
+            position = book_position(abbreviation)
+        if position is None:
+            continue
+        for name in (title, abbreviation) + canon_names(position):
+            if name:
+                aliases.setdefault(normalize_book_name(name), position)
+    return aliases
+
+
+def get_book_aliases(db_path, cursor):
+    """Dictionnaire d'alias de la base 'db_path', chargé au premier appel seulement."""
+    aliases = _alias_cache.get(db_path)
+    if aliases is None:
+        aliases = load_book_aliases(cursor)
+        _alias_cache[db_path] = aliases
+    return aliases
+
+
+def clear_alias_cache():
+    """À appeler si bible_books change (ex. après une ingestion)."""
+    _alias_cache.clear()
+
+
+def resolve_book(aliases, book_name):
+    """Position canonique du livre 'book_name', ou None s'il est inconnu."""
+    if not book_name:
+        return None
+    return aliases.get(normalize_book_name(book_name))
+
+
+def resolve_verse(cursor, aliases, book_name, chapter, verse):
+    """
+    Retourne (résultats, avertissement) :
+    résultats = [(content_id, book_id, start_verse_id, end_verse_id, text, book_title)].
+    Une seule requête SQL (aucune si le livre est inconnu).
+    """
+    position = resolve_book(aliases, book_name)
+    if position is None:
+        return [], f"[WARN] Aucune correspondance pour le livre '{book_name}' dans bible_books."
+
+    cursor.execute(RESOLVE_VERSE_SQL, (verse_ordinal(position, chapter, verse),))
+    rows = cursor.fetchall()
+    if not rows:
+        return [], f"[WARN] Aucune correspondance pour le verset {chapter}.{verse} du livre {book_name}."
+
+    # Une ligne (verset, NULL...) si aucun contenu ne couvre le verset
+    results = [
+        (content_id, book_id, start_verse_id, end_verse_id, inflate_text(cursor, book_id, text_content), book_title)
+        for _, content_id, book_id, start_verse_id, end_verse_id, text_content, book_title in rows
+        if content_id is not None
+    ]
+    return results, None
+
+
+def iter_range(cursor, start_ordinal, end_ordinal, preview=None, after=None, page_size=RANGE_PAGE_SIZE):
+    """
+    Génère les contenus (bible, commentaire, intro) qui recoupent la plage de
+    versets [start_ordinal, end_ordinal], dans l'ordre du texte, sans tout
+    charger : une requête par page de 'page_size' contenus, dont les lignes
+    sont lues au fil de l'itération (curseur propre au générateur).
+      preview : texte tronqué par SQL à 'preview' caractères ("truncated" : vrai si coupé)
+      after   : clé (range_key) du dernier contenu déjà lu, pour reprendre à la suite
+    Chaque contenu est un dict (content_id, book_id, book_title, start_ordinal,
+    end_ordinal, start_verse_id, end_verse_id, text, truncated).
+    """
+    if preview is None:
+        sql = RANGE_PAGE_SQL.format(text="c.text")
+        text_limit = None
+        text_params = ()
+    else:
+        # Un caractère de plus que l'aperçu : indique si le texte a été coupé
+        sql = RANGE_PAGE_SQL.format(
+            text="CASE WHEN typeof(c.text) = 'blob' THEN c.text ELSE substr(c.text, 1, ?) END")
+        text_limit = preview + 1
+        text_params = (text_limit,)
+    key = tuple(after) if after else (0, 0, 0)
+    page_cursor = cursor.connection.cursor()
+    while True:
+        page_cursor.execute(sql, text_params + (end_ordinal, start_ordinal, key[0]) + key + (page_size,))
+        count = 0
+        for start, end, content_id, book_id, book_title, start_verse_id, end_verse_id, text_content in page_cursor:
+            count += 1
+            text_content = inflate_text(page_cursor, book_id, text_content, text_limit)
+            truncated = preview is not None and text_content is not None and len(text_content) > preview
+            yield {
+                "content_id": content_id,
+                "book_id": book_id,
+                "book_title": book_title,
+                "start_ordinal": start,
+                "end_ordinal": end,
+                "start_verse_id": start_verse_id,
+                "end_verse_id": end_verse_id,
+                "text": text_content[:preview] if truncated else text_content,
+                "truncated": truncated,
+            }
+            key = (start, end, content_id)
+        if count < page_size:
+            return
+
+
+def range_key(record):
+    """Clé de pagination d'un contenu d'iter_range, sous forme de texte ("début-fin-id")."""
+    return f"{record['start_ordinal']}-{record['end_ordinal']}-{record['content_id']}"
+
+
+def parse_range_key(token):
+    """Inverse de range_key ; None si 'token' est mal formé."""
+    parts = token.split("-")
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        return None
+    return tuple(int(part) for part in parts)
+
+
+# Mode batch : les plages de chaque référence analysée (un verset, une plage, un
+# chapitre ou une liste) sont chargées dans une table temporaire, puis résolues
+# toutes ensemble par jointures ensemblistes (une seule requête) : un contenu
+# est retenu si sa plage recoupe celle de la référence, comme pour iter_range.
+BATCH_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS batch_refs (
+    line_no       INTEGER,
+    range_no      INTEGER,
+    reference     TEXT,
+    label         TEXT,
+    start_ordinal INTEGER,
+    end_ordinal   INTEGER,
+    warning       TEXT,
+    PRIMARY KEY (line_no, range_no)
+);
+DELETE FROM temp.batch_refs;
+"""
+
+RESOLVE_BATCH_SQL = """
+SELECT r.line_no, r.reference, r.label, r.start_ordinal, r.end_ordinal, r.warning,
+       EXISTS (SELECT 1 FROM verses v WHERE v.ordinal BETWEEN r.start_ordinal AND r.end_ordinal),
+       c.id, c.book_id, b.title, c.start_verse_id, c.end_verse_id, c.text
+FROM temp.batch_refs r
+LEFT JOIN contents_span s ON s.start_ordinal <= r.end_ordinal AND s.end_ordinal >= r.start_ordinal
+LEFT JOIN contents c ON c.id = s.id
+LEFT JOIN books b ON b.id = c.book_id
+ORDER BY r.line_no, r.range_no, s.start_ordinal, s.end_ordinal, c.id
+"""
+
+
+def resolve_batch(cursor, parsed_refs):
+    """
+    Résout un lot de références en une requête.
+    parsed_refs : itérable de (référence_brute, [Reference]) ; liste vide si la
+    référence n'a pas pu être analysée (voir reference_parser.parse_query).
+    Génère, dans l'ordre d'entrée, un dict par référence :
+      {"reference", "ranges": [[start_ordinal, end_ordinal], ...], "warning",
+       "results": [{content_id, book_id, book_title, start_verse_id, end_verse_id, text}]}
+    Un contenu qui recoupe plusieurs plages d'une liste n'apparaît qu'une fois.
+    """
+    cursor.executescript(BATCH_SCHEMA)
+    rows = []
+    for line_no, (reference, references) in enumerate(parsed_refs):
+        if not references:
+            rows.append((line_no, 0, reference, None, None, None,
+                         f"[ERROR] Impossible de parser la référence '{reference}'."))
+        for range_no, parsed in enumerate(references):
+            rows.append((line_no, range_no, reference, format_reference(parsed))
+                        + reference_ordinals(parsed) + (None,))
+    cursor.executemany("INSERT INTO temp.batch_refs VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    cursor.execute(RESOLVE_BATCH_SQL)
+    for _, group in groupby(cursor, key=lambda row: row[0]):
+        group = list(group)
+        reference, warning = group[0][1], group[0][5]
+        ranges = []
+        missing = []
+        results = {}
+        for _, _, label, start_ordinal, end_ordinal, _, found, *content in group:
+            if label is not None and [start_ordinal, end_ordinal] not in ranges:
+                ranges.append([start_ordinal, end_ordinal])
+                if not found:
+                    missing.append(label)
+            content_id, book_id, book_title, start_verse_id, end_verse_id, text_content = content
+            if content_id is not None and content_id not in results:
+                results[content_id] = {
+                    "content_id": content_id,
+                    "book_id": book_id,
+                    "book_title": book_title,
+                    "start_verse_id": start_verse_id,
+                    "end_verse_id": end_verse_id,
+                    "text": inflate_text(cursor, book_id, text_content),
+                }
+        if warning is None and missing:
+            warning = f"[WARN] Aucune correspondance pour {', '.join(missing)} dans la base."
+        yield {
+            "reference": reference,
+            "ranges": ranges,
+            "warning": warning,
+            "results": list(results.values()),
+        }
@@ -0,0 +1,137 @@
+import hashlib
+import os
+
+# Manifeste d'ingestion : une ligne par fichier de RESOURCES_PATH déjà traité.
+# Le couple (size, mtime_ns) sert de test rapide ; le sha256 ne sert qu'à
+# départager un fichier simplement "touché" d'un fichier réellement modifié.
+MANIFEST_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingestion_manifest (
+    path        TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    sha256      TEXT    NOT NULL,
+    book_id     INTEGER,
+    ingested_at TEXT    DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (book_id) REFERENCES books(id)
+);
+"""
+
+
+def ensure_manifest_table(cursor):
+    """Crée la table ingestion_manifest si elle n'existe pas encore."""
+    cursor.executescript(MANIFEST_SCHEMA)
+
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    """Calcule le sha256 d'un fichier par blocs (sans le charger entièrement)."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_resources(cursor, directory_path):
+    """
+    Compare les EPUB de 'directory_path' au manifeste et renvoie le delta :
+      {"new": [...], "changed": [...], "unchanged": [...], "deleted": [...]}
+    Chaque entrée est un dict (path, abs_path, size, mtime_ns, sha256, book_id).
+    - Un fichier dont la taille et le mtime n'ont pas bougé est "unchanged"
+      sans être ouvert.
+    - Si la taille ou le mtime diffère, on recalcule le hash : s'il est identique,
+      le fichier a seulement été touché (on met à jour size/mtime dans le manifeste).
+    """
+    cursor.execute("SELECT path, size, mtime_ns, sha256, book_id FROM ingestion_manifest")
+    known = {
+        row[0]: {"size": row[1], "mtime_ns": row[2], "sha256": row[3], "book_id": row[4]}
+        for row in cursor.fetchall()
+    }
+
+    delta = {"new": [], "changed": [], "unchanged": [], "deleted": []}
+    seen = set()
+
+    for filename in sorted(os.listdir(directory_path)):
+        if not filename.lower().endswith(".epub"):
+            continue
+        abs_path = os.path.join(directory_path, filename)
+        stat = os.stat(abs_path)
+        seen.add(filename)
+
+        entry = {
+            "path": filename,
+            "abs_path": abs_path,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": None,
+            "book_id": None,
+        }
+        previous = known.get(filename)
+
+        if previous is None:
+            entry["sha256"] = file_sha256(abs_path)
+            delta["new"].append(entry)
+            continue
+
+        entry["book_id"] = previous["book_id"]
+        if previous["size"] == entry["size"] and previous["mtime_ns"] == entry["mtime_ns"]:
+            entry["sha256"] = previous["sha256"]
+            delta["unchanged"].append(entry)
+            continue
+
+        entry["sha256"] = file_sha256(abs_path)
+        if entry["sha256"] == previous["sha256"]:
+            # Fichier seulement "touché" : on rafraîchit le manifeste
+            cursor.execute(
+                "UPDATE ingestion_manifest SET size = ?, mtime_ns = ? WHERE path = ?",
+                (entry["size"], entry["mtime_ns"], filename),
+            )
+            delta["unchanged"].append(entry)
+        else:
+            delta["changed"].append(entry)
+
+    for path, previous in known.items():
+        if path not in seen:
+            delta["deleted"].append({
+                "path": path,
+                "abs_path": os.path.join(directory_path, path),
+                "size": previous["size"],
+                "mtime_ns": previous["mtime_ns"],
+                "sha256": previous["sha256"],
+                "book_id": previous["book_id"],
+            })
+
+    return delta
+
+
+def record_ingestion(cursor, entry, book_id):
+    """Enregistre (ou remplace) l'entrée du manifeste pour un fichier ingéré."""
+    cursor.execute(
+        """INSERT INTO ingestion_manifest (path, size, mtime_ns, sha256, book_id, ingested_at)
+           VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+           ON CONFLICT(path) DO UPDATE SET
+               size = excluded.size,
+               mtime_ns = excluded.mtime_ns,
+               sha256 = excluded.sha256,
+               book_id = excluded.book_id,
+               ingested_at = excluded.ingested_at""",
+        (entry["path"], entry["size"], entry["mtime_ns"], entry["sha256"], book_id),
+    )
+
+
+def forget_entry(cursor, path):
+    """Retire un fichier disparu du manifeste."""
+    cursor.execute("DELETE FROM ingestion_manifest WHERE path = ?", (path,))
+
+
+def print_delta(delta):
+    """Affiche un résumé du delta calculé par scan_resources."""
+    print(
+        f"[INFO] Resources: {len(delta['new'])} new, {len(delta['changed'])} changed, "
+        f"{len(delta['unchanged'])} unchanged, {len(delta['deleted'])} deleted."
+    )
+    for entry in delta["new"]:
+        print(f"[INFO]   + {entry['path']}")
+    for entry in delta["changed"]:
+        print(f"[INFO]   ~ {entry['path']} (book_id={entry['book_id']})")
+    for entry in delta["deleted"]:
+        print(f"[WARN]   - {entry['path']} disparu (book_id={entry['book_id']} reste en DB)")
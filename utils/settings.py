@@ -0,0 +1,55 @@
+import os
+
+# Configuration commune à la recherche et à l'ingestion : un seul chemin de base
+# (DATABASE_FILE) et un seul répertoire de ressources (RESOURCES_PATH), lus dans
+# l'environnement puis dans le fichier .env, avec des valeurs par défaut relatives
+# à la racine du dépôt (db/database.db, créée par db/init_db.py).
+# python-dotenv n'est importé que si une variable manque et qu'un .env existe :
+# la recherche d'une référence n'en paie pas le coût d'import. Le .env est lu au
+# plus une fois par processus. Les options d'ingestion (INGEST_WORKERS,
+# CATEGORY_MODE, EXTRACTION_CACHE...) passent par setting(), comme les chemins :
+# aucun autre module ne charge le .env.
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATABASE_FILE = os.path.join(ROOT_DIR, "db", "database.db")
+DEFAULT_RESOURCES_PATH = os.path.join(ROOT_DIR, "resources")
+DEFAULT_VERSE_STORE_PATH = os.path.join(ROOT_DIR, "db", "verse_store")
+
+_dotenv_loaded = False
+
+
+def load_settings(names=("DATABASE_FILE", "RESOURCES_PATH", "VERSE_STORE_PATH")):
+    """Charge le .env (répertoire courant, sinon racine du dépôt) si l'une des variables manque."""
+    global _dotenv_loaded
+    if _dotenv_loaded or all(os.environ.get(name) for name in names):
+        return
+    _dotenv_loaded = True
+    for candidate in (os.path.join(os.getcwd(), ".env"), os.path.join(ROOT_DIR, ".env")):
+        if os.path.exists(candidate):
+            from dotenv import load_dotenv
+            load_dotenv(candidate)
+            return
+
+
+def setting(name, default=None):
+    """Valeur de $name (environnement ou .env), sinon 'default'."""
+    load_settings((name,))
+    return os.environ.get(name) or default
+
+
+def database_path():
+    """Chemin de la base SQLite : $DATABASE_FILE (environnement ou .env), sinon db/database.db."""
+    load_settings(("DATABASE_FILE",))
+    return os.environ.get("DATABASE_FILE") or DEFAULT_DATABASE_FILE
+
+
+def resources_path():
+    """Répertoire des EPUB : $RESOURCES_PATH (environnement ou .env), sinon resources/."""
+    load_settings(("RESOURCES_PATH",))
+    return os.environ.get("RESOURCES_PATH") or DEFAULT_RESOURCES_PATH
+
+
+def verse_store_path():
+    """Répertoire des fichiers verse_store : $VERSE_STORE_PATH (environnement ou .env), sinon db/verse_store/."""
+    load_settings(("VERSE_STORE_PATH",))
+    return os.environ.get("VERSE_STORE_PATH") or DEFAULT_VERSE_STORE_PATH
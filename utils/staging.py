@@ -0,0 +1,150 @@
+import os
+import sqlite3
+
+from .db_bulk import STAGING_PRAGMAS, apply_ingest_pragmas
+from .instrumentation import stage
+from .settings import setting
+
+# Pages copiées par étape de la publication : après la première étape, la
+# sauvegarde tient le verrou d'écriture et la garde peut vérifier la base
+PUBLISH_STEP_PAGES = 1
+
+# Connexions "garde" des copies de travail ouvertes : chemin de la copie -> (connexion, data_version)
+_guards = {}
+
+# Ingestion "build and swap" (main.py ingest --staged, ou $INGEST_STAGED=1) :
+#  - la base en service passe en WAL, puis une connexion "garde" y prend le
+#    verrou d'écriture (BEGIN IMMEDIATE) jusqu'à la publication : les lecteurs
+#    continuent, les autres écritures (compress, export, serve, une seconde
+#    ingestion...) attendent puis échouent ("database is locked") au lieu
+#    d'être écrasées par la publication ;
+#  - la base en service est copiée dans <base>.staging par l'API de sauvegarde
+#    de SQLite (instantané cohérent, même pendant des lectures) ;
+#  - l'ingestion écrit dans cette copie de travail avec des réglages d'écriture
+#    sans durabilité (db_bulk.STAGING_PRAGMAS) : un arrêt brutal ne perd que la
+#    copie ; les index secondaires ne sont supprimés que dans la copie ;
+#  - ANALYZE puis PRAGMA integrity_check ; une copie invalide n'est pas publiée
+#    et reste sur le disque pour examen ;
+#  - publication : la copie est recopiée dans la base en service, en une seule
+#    transaction (API de sauvegarde). Grâce au WAL, les lecteurs gardent leur
+#    instantané pendant la copie, puis voient la nouvelle version entière à
+#    leur transaction suivante, jamais un livre à moitié ingéré. PRAGMA
+#    data_version change : le service de requêtes vide son cache.
+#    L'API de sauvegarde refuse une destination en transaction : la garde
+#    relâche son verrou juste avant. Une écriture glissée dans cet intervalle
+#    est détectée (PRAGMA data_version de la garde, relu une fois le verrou
+#    pris par la sauvegarde) : la sauvegarde est annulée, rien n'est écrasé.
+# Pas de os.replace du fichier : -wal et -shm sont liés au nom de la base, et
+# un fichier remplacé sous des connexions WAL ouvertes exposerait les nouveaux
+# lecteurs à l'index WAL de l'ancien.
+
+
+def staging_path(db_path):
+    """Chemin de la copie de travail de 'db_path'."""
+    return db_path + ".staging"
+
+
+def staged_ingest_enabled():
+    """$INGEST_STAGED=1 : ingestion par copie de travail."""
+    return setting("INGEST_STAGED", "").strip().lower() in ("1", "true", "yes")
+
+
+def remove_staging(db_path):
+    """Supprime la copie de travail (et son journal) si elle existe."""
+    path = staging_path(db_path)
+    for candidate in (path, path + "-journal", path + "-wal", path + "-shm"):
+        if os.path.exists(candidate):
+            os.remove(candidate)
+
+
+def open_staging(db_path):
+    """
+    Prend le verrou d'écriture de 'db_path' (connexion garde), la copie dans sa
+    copie de travail (remplace celle d'une ingestion interrompue) et retourne
+    une connexion à la copie, réglée pour l'écriture.
+    """
+    remove_staging(db_path)
+    release_guard(db_path)
+    guard = sqlite3.connect(db_path, isolation_level=None)
+    guard.execute("PRAGMA journal_mode = WAL")
+    guard.execute("BEGIN IMMEDIATE")
+    _guards[staging_path(db_path)] = (guard, guard.execute("PRAGMA data_version").fetchone()[0])
+    with stage("staging_copy", db=db_path):
+        live = sqlite3.connect(db_path)
+        conn = sqlite3.connect(staging_path(db_path))
+        live.backup(conn)
+        live.close()
+    # Après la copie : l'en-tête copié porte le mode WAL de la base en service
+    apply_ingest_pragmas(conn, STAGING_PRAGMAS)
+    return conn
+
+
+def release_guard(db_path):
+    """Relâche le verrou d'écriture pris par open_staging sur 'db_path' ; retourne son data_version."""
+    guard, data_version = _guards.pop(staging_path(db_path), (None, None))
+    if guard is not None:
+        if guard.in_transaction:
+            guard.execute("ROLLBACK")  # la garde n'a rien écrit
+        guard.close()
+    return data_version
+
+
+def check_staging(conn):
+    """ANALYZE, puis liste des problèmes relevés par PRAGMA integrity_check ([] : copie valide)."""
+    conn.execute("ANALYZE")
+    conn.commit()
+    problems = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    return [] if problems == ["ok"] else problems
+
+
+def publish_staging(conn, db_path):
+    """
+    Vérifie la copie de travail ouverte par open_staging, la publie dans
+    'db_path' en une transaction puis la supprime ; ferme 'conn'. Une copie
+    invalide arrête l'ingestion, base en service inchangée ; une base en
+    service modifiée depuis la copie aussi (écriture entre la libération de
+    la garde et la publication).
+    """
+    with stage("staging_check") as fields:
+        problems = check_staging(conn)
+        fields["problems"] = len(problems)
+    if problems:
+        conn.close()
+        release_guard(db_path)
+        raise SystemExit(f"[ERROR] Copie de travail invalide, base en service inchangée "
+                         f"({staging_path(db_path)}) : {'; '.join(problems[:5])}")
+
+    guard, data_version = _guards[staging_path(db_path)]
+    guard.execute("ROLLBACK")
+    checked = []
+
+    def check_live(status, remaining, total):
+        # Première étape faite (SQLITE_OK, pas BUSY) : la sauvegarde tient le
+        # verrou d'écriture de la base en service, rien n'y est encore validé
+        if status == sqlite3.SQLITE_OK and not checked:
+            checked.append(True)
+            if guard.execute("PRAGMA data_version").fetchone()[0] != data_version:
+                raise sqlite3.OperationalError("base en service modifiée depuis la copie")
+
+    with stage("staging_publish", db=db_path) as fields:
+        live = sqlite3.connect(db_path)
+        try:
+            conn.backup(live, pages=PUBLISH_STEP_PAGES, progress=check_live)
+        except sqlite3.OperationalError as error:
+            live.close()
+            discard_staging(conn, db_path)
+            raise SystemExit(f"[ERROR] Copie de travail non publiée, base en service inchangée : {error}. "
+                             f"Relancer l'ingestion.")
+        # La copie est passée par le WAL : il est remis à zéro si aucun lecteur ne le retient
+        fields["checkpoint"] = live.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0] == 0
+        live.close()
+    conn.close()
+    release_guard(db_path)
+    remove_staging(db_path)
+
+
+def discard_staging(conn, db_path):
+    """Ferme et supprime une copie de travail sans la publier (rien n'a changé) ; relâche la garde."""
+    conn.close()
+    release_guard(db_path)
+    remove_staging(db_path)
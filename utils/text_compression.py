@@ -0,0 +1,217 @@
+import random
+import re
+import struct
+import zlib
+from collections import Counter
+
+from .settings import setting
+
+# Compression optionnelle de contents.text (zlib, bibliothèque standard).
+#
+#  - Un texte d'au moins 'threshold' caractères est remplacé par un BLOB zlib ;
+#    les textes courts (versets) restent en clair. Le type de la valeur suffit à
+#    distinguer les deux formes : typeof(text) = 'blob' <=> compressé.
+#  - Chaque livre a son dictionnaire prédéfini (text_dictionaries), construit à
+#    partir de ses propres textes : les tournures récurrentes d'un commentaire ou
+#    d'une traduction ("Ainsi parle l'Eternel", "the LORD") sont déjà dans le
+#    dictionnaire, ce qui compte surtout pour les textes de quelques centaines
+#    de caractères. Le flux zlib porte l'adler32 du dictionnaire : un texte ne
+#    peut pas être décompressé avec le dictionnaire d'un autre livre.
+#  - La décompression se fait dans la couche de requêtes (inflate_text), à la
+#    lecture ; un aperçu ne décompresse que le début du texte.
+#  - contents_fts ne relit pas contents (voir fulltext.py) : compresser un
+#    texte ne touche pas l'index, le remettre en clair le réindexe (triggers).
+#  - book_versions (verse_store.py) ne change pas : la compression ne change
+#    que la forme du texte, pas le texte.
+#
+# Activation à l'ingestion : TEXT_COMPRESSION_THRESHOLD=1024 (caractères) ;
+# base existante : python main.py compress [--threshold N] [--vacuum].
+
+DEFAULT_THRESHOLD = 1024
+DICTIONARY_SIZE = 32 * 1024
+# Texte échantillonné pour construire un dictionnaire (caractères)
+TRAINING_SAMPLE = 256 * 1024
+# Niveau 9 : 0,4 % de moins que le niveau 6 pour 50 % de temps en plus
+COMPRESSION_LEVEL = 6
+
+COMPRESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS text_dictionaries (
+    book_id    INTEGER PRIMARY KEY,
+    dictionary BLOB NOT NULL
+)
+"""
+
+_WORD_PATTERN = re.compile(r"\S+\s*")
+
+# Dictionnaires déjà lus, par adler32 (identifiant présent dans chaque flux zlib)
+_dictionaries = {}
+
+
+def compression_threshold():
+    """Seuil de compression à l'ingestion ($TEXT_COMPRESSION_THRESHOLD), 0 : désactivée."""
+    value = setting("TEXT_COMPRESSION_THRESHOLD", "").strip()
+    return int(value) if value.isdigit() else 0
+
+
+def ensure_compression_schema(cursor):
+    cursor.execute(COMPRESSION_SCHEMA)
+
+
+def train_dictionary(texts, size=DICTIONARY_SIZE, seed=0):
+    """
+    Dictionnaire prédéfini zlib tiré de 'texts' : suites de 1 à 3 mots les plus
+    rentables (occurrences x longueur) d'un échantillon, les meilleures en fin
+    de dictionnaire (zlib code moins cher les références proches).
+    """
+    texts = list(texts)
+    random.Random(seed).shuffle(texts)
+    counts = Counter()
+    budget = TRAINING_SAMPLE
+    for text_content in texts:
+        if budget <= 0:
+            break
+        words = _WORD_PATTERN.findall(text_content[:budget])
+        budget -= len(text_content)
+        for length in (1, 2, 3):
+            for index in range(len(words) - length + 1):
+                counts["".join(words[index:index + length])] += 1
+
+    scored = sorted(((count * len(chunk.encode("utf-8")), chunk) for chunk, count in counts.items()
+                     if count > 1), reverse=True)
+    chosen = []
+    total = 0
+    for _, chunk in scored:
+        data = chunk.encode("utf-8")
+        if total + len(data) > size:
+            continue
+        chosen.append(data)
+        total += len(data)
+    return b"".join(reversed(chosen))
+
+
+def dictionary_compressor(dictionary):
+    """Compresseur zlib amorcé avec 'dictionary', à copier pour chaque texte (compress_text)."""
+    return zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS, 9, zdict=dictionary)
+
+
+def compress_text(text_content, compressor):
+    # copy() évite de réindexer les 32 Kio du dictionnaire pour chaque texte (3x plus rapide)
+    compressor = compressor.copy()
+    return compressor.compress(text_content.encode("utf-8")) + compressor.flush()
+
+
+def book_dictionary(cursor, book_id):
+    """Dictionnaire enregistré du livre, ou None."""
+    row = cursor.connection.execute(
+        "SELECT dictionary FROM text_dictionaries WHERE book_id = ?", (book_id,)).fetchone()
+    return row[0] if row else None
+
+
+def inflate_text(cursor, book_id, value, limit=None):
+    """
+    Texte en clair d'une valeur de contents.text (inchangée si elle n'est pas
+    compressée) ; avec 'limit', au plus 'limit' caractères, en ne décompressant
+    que le début du flux.
+    """
+    if not isinstance(value, bytes):
+        return value
+    flags = value[1]
+    dictionary = None
+    if flags & 0x20:
+        dictionary_id = struct.unpack_from(">I", value, 2)[0]
+        dictionary = _dictionaries.get(dictionary_id)
+        if dictionary is None:
+            # Requête sur un curseur neuf : 'cursor' peut être en cours d'itération
+            dictionary = book_dictionary(cursor, book_id)
+            if dictionary is None or zlib.adler32(dictionary) != dictionary_id:
+                raise ValueError(f"Dictionnaire de compression introuvable (book_id={book_id}).")
+            _dictionaries[dictionary_id] = dictionary
+    decompressor = zlib.decompressobj(zdict=dictionary) if dictionary is not None else zlib.decompressobj()
+    if limit is None:
+        return (decompressor.decompress(value) + decompressor.flush()).decode("utf-8")
+    # Un caractère UTF-8 occupe au plus 4 octets
+    return decompressor.decompress(value, limit * 4).decode("utf-8", "ignore")[:limit]
+
+
+def _ensure_triggers(cursor):
+    """
+    Avant d'écrire des BLOB : l'index plein texte et les triggers de
+    book_versions existants sont mis au format qui tolère la compression.
+    """
+    from .fulltext import ensure_fulltext_schema
+    from .verse_store import ensure_version_schema
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE name IN ('contents_fts', 'book_versions')")
+    tables = {row[0] for row in cursor.fetchall()}
+    if "contents_fts" in tables:
+        ensure_fulltext_schema(cursor)
+    if "book_versions" in tables:
+        ensure_version_schema(cursor)
+
+
+def compress_book(cursor, book_id, threshold=DEFAULT_THRESHOLD):
+    """
+    Compresse les textes en clair de 'book_id' d'au moins 'threshold' caractères
+    (sauf si le BLOB n'est pas plus petit). Le dictionnaire du livre est créé au
+    premier appel puis réutilisé. Ne fait pas de commit.
+    Retourne (lignes compressées, octets en clair, octets compressés).
+    """
+    ensure_compression_schema(cursor)
+    cursor.execute("SELECT id, text FROM contents WHERE book_id = ? AND typeof(text) = 'text' AND length(text) >= ?",
+                   (book_id, max(threshold, 1)))
+    rows = cursor.fetchall()
+    if not rows:
+        return 0, 0, 0
+
+    dictionary = book_dictionary(cursor, book_id)
+    if dictionary is None:
+        dictionary = train_dictionary(text_content for _, text_content in rows)
+        cursor.execute("INSERT INTO text_dictionaries (book_id, dictionary) VALUES (?, ?)", (book_id, dictionary))
+
+    compressor = dictionary_compressor(dictionary)
+    updates = []
+    plain_size = compressed_size = 0
+    for content_id, text_content in rows:
+        data = compress_text(text_content, compressor)
+        size = len(text_content.encode("utf-8"))
+        if len(data) >= size:
+            continue
+        updates.append((data, content_id))
+        plain_size += size
+        compressed_size += len(data)
+
+    _ensure_triggers(cursor)
+    cursor.executemany("UPDATE contents SET text = ? WHERE id = ?", updates)
+    return len(updates), plain_size, compressed_size
+
+
+def decompress_book(cursor, book_id):
+    """Remet en clair les textes compressés de 'book_id'. Ne fait pas de commit. Retourne le nombre de lignes."""
+    cursor.execute("SELECT id, text FROM contents WHERE book_id = ? AND typeof(text) = 'blob'", (book_id,))
+    rows = [(content_id, inflate_text(cursor, book_id, value)) for content_id, value in cursor.fetchall()]
+    _ensure_triggers(cursor)
+    cursor.executemany("UPDATE contents SET text = ? WHERE id = ?",
+                       ((text_content, content_id) for content_id, text_content in rows))
+    return len(rows)
+
+
+def compression_report(cursor):
+    """Par livre : (book_id, titre, lignes, lignes compressées, octets de texte stockés)."""
+    cursor.execute("""
+        SELECT b.id, b.title, COUNT(c.id),
+               SUM(typeof(c.text) = 'blob'),
+               COALESCE(SUM(length(CAST(c.text AS BLOB))), 0)
+        FROM books b
+        LEFT JOIN contents c ON c.book_id = b.id
+        GROUP BY b.id
+        ORDER BY b.id
+    """)
+    return cursor.fetchall()
+
+
+def database_size(cursor):
+    """(taille des pages utilisées, pages libres) en octets."""
+    page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+    page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+    free_pages = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+    return (page_count - free_pages) * page_size, free_pages * page_size
@@ -0,0 +1,115 @@
+import re
+from lxml import etree
+
+# Extraction du texte d'un document XHTML d'EPUB avec le parseur C de lxml.
+# Le résultat est identique à BeautifulSoup(html, "html.parser").get_text(separator="\n") :
+#  - un morceau par nœud texte, joints par "\n" ;
+#  - un nœud composé uniquement d'espaces ASCII devient "\n" (s'il contient
+#    un saut de ligne) ou " " ;
+#  - commentaires, instructions de traitement, <script>, <style>... sont ignorés.
+# Les numéros de versets (<sup>16</sup>), titres et appels de notes restent donc
+# sur des lignes séparées, comme avec l'ancien chemin BeautifulSoup.
+
+# À incrémenter dès que le texte produit change (sert de clé de cache)
+EXTRACTOR_VERSION = 1
+
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+# Chaînes que BeautifulSoup exclut de get_text (Script, Stylesheet, TemplateString, Ruby*)
+_SKIPPED_TAGS = {"script", "style", "template", "rt", "rp"}
+_HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+_ROOT_START_PATTERN = re.compile(rb"<html[\s>]", re.IGNORECASE)
+_ROOT_END_PATTERN = re.compile(rb"</html\s*>", re.IGNORECASE)
+_MARKUP_PATTERN = re.compile(rb"<[^>]*>")
+_FOOTNOTE_MARK_PATTERN = re.compile(r"^\[\d+\]$")
+
+_PARSER = etree.HTMLParser(encoding="utf-8", remove_comments=False, remove_pis=False)
+
+
+def _normalize(piece):
+    """Même règle que BeautifulSoup pour les nœuds texte "blancs"."""
+    if piece.strip(_ASCII_SPACES):
+        return piece
+    return "\n" if "\n" in piece else " "
+
+
+def _outside_root_pieces(raw):
+    """
+    Nœuds texte situés hors de l'élément racine (entre la déclaration XML
+    et <html>, ou après </html>) : libxml2 les ignore, BeautifulSoup les garde.
+    """
+    pieces = []
+    for chunk in _MARKUP_PATTERN.split(raw):
+        if chunk:
+            pieces.append(_normalize(chunk.decode("utf-8", errors="ignore")))
+    return pieces
+
+
+def extract_text(html, markers=False):
+    """
+    Retourne le texte d'un document (bytes ou str), comme get_text(separator="\\n").
+    Si markers=True, retourne (texte, marqueurs) où chaque marqueur est un tuple
+    (type, position_dans_le_texte, texte) avec type parmi :
+      - "verse"    : <sup> contenant uniquement un nombre ;
+      - "footnote" : appel de note (<sup>[n]</sup>) ;
+      - "heading"  : titre <h1>..<h6>.
+    """
+    if isinstance(html, str):
+        raw = html.encode("utf-8")
+    else:
+        # Même tolérance que l'ancien .decode("utf-8", errors="ignore")
+        raw = html.decode("utf-8", errors="ignore").encode("utf-8")
+
+    pieces = []
+    found = [] if markers else None
+
+    start = _ROOT_START_PATTERN.search(raw)
+    ends = list(_ROOT_END_PATTERN.finditer(raw))
+    if start is not None:
+        pieces.extend(_outside_root_pieces(raw[:start.start()]))
+
+    root = etree.fromstring(raw, _PARSER) if raw.strip() else None
+    if root is not None:
+        offset = sum(len(piece) for piece in pieces) + len(pieces)
+
+        def add(piece):
+            nonlocal offset
+            pieces.append(piece)
+            offset += len(piece) + 1
+
+        # Parcours en profondeur explicite : iterwalk() saute les commentaires,
+        # dont le "tail" est pourtant un nœud texte pour BeautifulSoup
+        stack = [(root, False)]
+        while stack:
+            element, closing = stack.pop()
+            if closing:
+                if element is not root and element.tail:
+                    add(_normalize(element.tail))
+                continue
+            tag = element.tag
+            if isinstance(tag, str) and tag not in _SKIPPED_TAGS and element.text:
+                if markers:
+                    _collect_marker(found, tag, element, offset)
+                add(_normalize(element.text))
+            stack.append((element, True))
+            stack.extend((child, False) for child in reversed(element))
+
+    if ends:
+        pieces.extend(_outside_root_pieces(raw[ends[-1].end():]))
+
+    text_content = "\n".join(pieces)
+    if markers:
+        return text_content, found
+    return text_content
+
+
+def _collect_marker(found, tag, element, offset):
+    """Ajoute le marqueur structurel porté par 'element', s'il y en a un."""
+    text_content = element.text.strip()
+    if tag == "sup":
+        if text_content.isdigit():
+            found.append(("verse", offset, text_content))
+        elif _FOOTNOTE_MARK_PATTERN.match(text_content):
+            found.append(("footnote", offset, text_content))
+    elif tag in _HEADING_TAGS and text_content:
+        found.append(("heading", offset, text_content))
@@ -0,0 +1,132 @@
+from .canon import bible_book_ids
+
+# Clé canonique d'un verset : un entier qui suit l'ordre de lecture du canon,
+#   livre * 1 000 000 + chapitre * 1 000 + verset   (livre : 1 = Genèse ... 66 = Apocalypse)
+# ex. Col 3:16 -> 51 003 016. La clé ne dépend pas des id auto-incrémentés :
+# comparer deux clés revient à comparer deux positions dans le texte biblique.
+#
+# Les plages de contents (start_ordinal, end_ordinal) sont indexées dans une table
+# R*Tree à une dimension (contents_span). rtree_i32 stocke des entiers 32 bits
+# exacts (la variante "rtree" standard arrondit en float32, ce qui confondrait
+# des versets voisins au-delà de 2^24). Des triggers tiennent contents_span à jour.
+
+BOOK_FACTOR = 1_000_000
+CHAPTER_FACTOR = 1_000
+
+ORDINAL_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS contents_span USING rtree_i32(
+    id,
+    start_ordinal, end_ordinal
+);
+
+-- Un writer qui ne connaît que les verse_id : on complète les clés depuis verses
+CREATE TRIGGER IF NOT EXISTS contents_ordinals_ai AFTER INSERT ON contents
+WHEN NEW.start_ordinal IS NULL AND NEW.start_verse_id IS NOT NULL
+BEGIN
+    UPDATE contents
+       SET start_ordinal = (SELECT ordinal FROM verses WHERE id = NEW.start_verse_id),
+           end_ordinal   = (SELECT ordinal FROM verses
+                             WHERE id = COALESCE(NEW.end_verse_id, NEW.start_verse_id))
+     WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS contents_span_ai AFTER INSERT ON contents
+WHEN NEW.start_ordinal IS NOT NULL
+BEGIN
+    INSERT INTO contents_span (id, start_ordinal, end_ordinal)
+    VALUES (NEW.id,
+            MIN(NEW.start_ordinal, COALESCE(NEW.end_ordinal, NEW.start_ordinal)),
+            MAX(NEW.start_ordinal, COALESCE(NEW.end_ordinal, NEW.start_ordinal)));
+END;
+
+CREATE TRIGGER IF NOT EXISTS contents_span_au AFTER UPDATE OF start_ordinal, end_ordinal ON contents
+BEGIN
+    DELETE FROM contents_span WHERE id = OLD.id;
+    INSERT INTO contents_span (id, start_ordinal, end_ordinal)
+    SELECT NEW.id,
+           MIN(NEW.start_ordinal, COALESCE(NEW.end_ordinal, NEW.start_ordinal)),
+           MAX(NEW.start_ordinal, COALESCE(NEW.end_ordinal, NEW.start_ordinal))
+     WHERE NEW.start_ordinal IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS contents_span_ad AFTER DELETE ON contents
+BEGIN
+    DELETE FROM contents_span WHERE id = OLD.id;
+END;
+"""
+
+# Colonnes ajoutées aux tables existantes : table -> [(colonne, type)]
+ORDINAL_COLUMNS = {
+    "verses": [("ordinal", "INTEGER")],
+    "contents": [("start_ordinal", "INTEGER"), ("end_ordinal", "INTEGER")],
+}
+
+
+def verse_ordinal(position, chapter, verse):
+    """Clé d'un verset ; 'position' est la position canonique 0-based (canon.book_position)."""
+    return (position + 1) * BOOK_FACTOR + chapter * CHAPTER_FACTOR + verse
+
+
+def split_ordinal(ordinal):
+    """Inverse de verse_ordinal : (position, chapitre, verset)."""
+    book, rest = divmod(ordinal, BOOK_FACTOR)
+    chapter, verse = divmod(rest, CHAPTER_FACTOR)
+    return book - 1, chapter, verse
+
+
+def _columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def ensure_ordinal_schema(cursor):
+    """
+    Migration idempotente : ajoute les colonnes de clés canoniques, la table
+    R*Tree et ses triggers, puis calcule les clés manquantes (versets et
+    contenus existants). Ne fait pas de commit.
+    """
+    for table, columns in ORDINAL_COLUMNS.items():
+        existing = _columns(cursor, table)
+        for column, column_type in columns:
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+    cursor.executescript(ORDINAL_SCHEMA)
+    backfill_ordinals(cursor)
+
+
+def has_ordinal_schema(cursor):
+    """Vrai si la migration a déjà été faite (une requête, aucune écriture)."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'contents_span'")
+    return cursor.fetchone() is not None
+
+
+def backfill_ordinals(cursor):
+    """
+    Calcule verses.ordinal puis contents.start/end_ordinal là où ils manquent.
+    Les positions viennent des lignes bible_books existantes : aucune n'est
+    créée ici (write_bible_rows s'en charge à l'ingestion).
+    """
+    positions = {bible_book_id: position
+                 for position, bible_book_id in bible_book_ids(cursor).items()}
+
+    cursor.execute("""
+        SELECT v.id, c.bible_book_id, c.number, v.number
+        FROM verses v
+        JOIN chapters c ON c.id = v.chapter_id
+        WHERE v.ordinal IS NULL
+    """)
+    updates = [
+        (verse_ordinal(positions[bible_book_id], chapter, verse), verse_id)
+        for verse_id, bible_book_id, chapter, verse in cursor.fetchall()
+        if bible_book_id in positions
+    ]
+    cursor.executemany("UPDATE verses SET ordinal = ? WHERE id = ?", updates)
+
+    # Le trigger contents_span_au alimente la R*Tree pour les lignes mises à jour
+    cursor.execute("""
+        UPDATE contents
+           SET start_ordinal = (SELECT ordinal FROM verses WHERE id = contents.start_verse_id),
+               end_ordinal   = (SELECT ordinal FROM verses
+                                 WHERE id = COALESCE(contents.end_verse_id, contents.start_verse_id))
+         WHERE start_ordinal IS NULL AND start_verse_id IS NOT NULL
+    """)
@@ -0,0 +1,296 @@
+import array
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+
+from .text_compression import inflate_text
+from .verse_keys import split_ordinal, verse_ordinal
+from .versification import ensure_alignment_schema
+
+# Magasin de versets compact, en lecture seule, hors SQLite.
+#
+# Un fichier par traduction (book-<id>.verses), exporté depuis la base
+# (main.py export) et ouvert avec mmap : la recherche d'un verset est un calcul
+# d'indice et deux lectures d'entiers, le texte est une tranche (memoryview) du
+# fichier, sans copie ni requête. Plusieurs processus qui ouvrent le même fichier
+# partagent les pages du cache du système. Le service de requêtes (GET /text,
+# utils/query_service.py) lit les textes des versets dans les magasins à jour,
+# et dans la base pour les autres traductions.
+#
+# Format (entiers non signés 32 bits dans l'ordre d'octets de la machine, noté
+# dans l'en-tête) :
+#   en-tête (64 octets)  MAGIC, FORMAT_VERSION, ordre d'octets, book_id, tampon,
+#                        nombre de cases, taille du texte
+#   chapter_first        [livre * CHAPTER_SLOTS + chapitre] -> première case (verset 0)
+#   chapter_len          [livre * CHAPTER_SLOTS + chapitre] -> nombre de cases (dernier verset + 1)
+#   offsets              [case] -> début du texte de la case ; offsets[case + 1] = fin
+#   texte                UTF-8, versets bout à bout dans l'ordre canonique
+# Les cases suivent la clé canonique (verse_alignment) : un chapitre occupe des
+# cases contiguës, un verset absent est une case vide, la suscription d'un
+# psaume est le verset 0.
+#
+# Cohérence : des triggers incrémentent book_versions.version à chaque
+# modification de contents (sauf la compression ou décompression d'un texte,
+# qui n'en change que la forme) ; le fichier garde la version lue à l'export
+# (tampon) et store_is_current la compare à celle de la base.
+
+MAGIC = b"EXVS"
+FORMAT_VERSION = 1
+BYTE_ORDER = b"LE" if sys.byteorder == "little" else b"BE"
+HEADER = struct.Struct("<4sH2sqqII32x")
+BOOK_COUNT = 66
+# Chapitres 0 à 150 (Psaume 150) ; le chapitre 0 reste vide
+CHAPTER_SLOTS = 151
+STORE_EXTENSION = ".verses"
+
+VERSION_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS book_versions (
+        book_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS book_versions_ai AFTER INSERT ON contents
+    BEGIN
+        INSERT INTO book_versions (book_id, version) VALUES (NEW.book_id, 1)
+        ON CONFLICT (book_id) DO UPDATE SET version = version + 1;
+    END""",
+    # Texte en clair <-> BLOB (text_compression.py), rien d'autre : même contenu
+    """CREATE TRIGGER IF NOT EXISTS book_versions_au AFTER UPDATE ON contents
+    WHEN NOT (typeof(OLD.text) != typeof(NEW.text) AND 'blob' IN (typeof(OLD.text), typeof(NEW.text))
+              AND OLD.book_id IS NEW.book_id AND OLD.start_verse_id IS NEW.start_verse_id
+              AND OLD.end_verse_id IS NEW.end_verse_id)
+    BEGIN
+        INSERT INTO book_versions (book_id, version) VALUES (NEW.book_id, 1)
+        ON CONFLICT (book_id) DO UPDATE SET version = version + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS book_versions_ad AFTER DELETE ON contents
+    BEGIN
+        INSERT INTO book_versions (book_id, version) VALUES (OLD.book_id, 1)
+        ON CONFLICT (book_id) DO UPDATE SET version = version + 1;
+    END""",
+]
+
+EXPORT_SQL = """
+SELECT a.canonical_ordinal, c.text
+FROM verse_alignment a
+JOIN contents c ON c.id = a.content_id
+WHERE a.book_id = ?
+ORDER BY a.canonical_ordinal, c.start_ordinal
+"""
+
+
+def ensure_version_schema(cursor):
+    """Crée book_versions et ses triggers si besoin (sans valider la transaction en cours)."""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'book_versions_au'")
+    row = cursor.fetchone()
+    if row is not None and "WHEN" not in row[0]:
+        # Trigger d'avant la compression des textes : toute mise à jour comptait
+        cursor.execute("DROP TRIGGER book_versions_au")
+    for statement in VERSION_SCHEMA:
+        cursor.execute(statement)
+
+
+def book_version(cursor, book_id):
+    """Version courante des contenus de 'book_id' (0 si jamais modifiés), None sans table book_versions."""
+    try:
+        cursor.execute("SELECT version FROM book_versions WHERE book_id = ?", (book_id,))
+    except sqlite3.OperationalError:
+        return None
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def store_path(directory, book_id):
+    return os.path.join(directory, f"book-{book_id}{STORE_EXTENSION}")
+
+
+def export_verse_store(cursor, book_id, path):
+    """
+    Écrit le magasin de la traduction 'book_id' dans 'path' (remplacement
+    atomique : un lecteur de l'ancien fichier garde sa projection).
+    Retourne (nombre de cases, taille du fichier en octets).
+    """
+    ensure_version_schema(cursor)
+    ensure_alignment_schema(cursor)
+    # Tampon lu avant les versets : une écriture concurrente rend au pire
+    # le fichier faussement périmé, jamais faussement à jour
+    stamp = book_version(cursor, book_id)
+    cursor.execute(EXPORT_SQL, (book_id,))
+    texts = {}
+    for ordinal, text_content in cursor:
+        texts.setdefault(ordinal, []).append(inflate_text(cursor, book_id, text_content) or "")
+
+    chapter_len = array.array("I", [0]) * (BOOK_COUNT * CHAPTER_SLOTS)
+    for ordinal in texts:
+        position, chapter, verse = split_ordinal(ordinal)
+        if not (0 <= position < BOOK_COUNT and 0 <= chapter < CHAPTER_SLOTS):
+            print(f"[WARN] Clé {ordinal} hors du format du magasin, ignorée.")
+            continue
+        index = position * CHAPTER_SLOTS + chapter
+        chapter_len[index] = max(chapter_len[index], verse + 1)
+
+    chapter_first = array.array("I", [0]) * len(chapter_len)
+    slot_count = 0
+    for index, length in enumerate(chapter_len):
+        chapter_first[index] = slot_count
+        slot_count += length
+
+    offsets = array.array("I", [0]) * (slot_count + 1)
+    blob = bytearray()
+    slot = 0
+    for index, length in enumerate(chapter_len):
+        position, chapter = divmod(index, CHAPTER_SLOTS)
+        for verse in range(length):
+            blob += " ".join(texts.get(verse_ordinal(position, chapter, verse), ())).encode("utf-8")
+            slot += 1
+            offsets[slot] = len(blob)
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDER, book_id, stamp, slot_count, len(blob)))
+        f.write(chapter_first.tobytes())
+        f.write(chapter_len.tobytes())
+        f.write(offsets.tobytes())
+        f.write(blob)
+    os.replace(temporary_path, path)
+    return slot_count, os.path.getsize(path)
+
+
+def export_verse_stores(cursor, directory, books=None):
+    """
+    Exporte chaque Bible de la base (ou seulement 'books' : id de la table books).
+    Retourne une liste de (book_id, titre, chemin, nombre de cases, taille).
+    """
+    os.makedirs(directory, exist_ok=True)
+    cursor.execute("""
+        SELECT b.id, b.title FROM books b JOIN category cat ON cat.id = b.category_id
+        WHERE cat.title = 'Bible' ORDER BY b.id
+    """)
+    exported = []
+    for book_id, title in cursor.fetchall():
+        if books and book_id not in books:
+            continue
+        path = store_path(directory, book_id)
+        slot_count, size = export_verse_store(cursor, book_id, path)
+        exported.append((book_id, title, path, slot_count, size))
+    return exported
+
+
+def open_verse_store(path):
+    """Projette 'path' en mémoire ; retourne l'état du magasin (dict) utilisé par les fonctions de lecture."""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, format_version, byte_order, book_id, stamp, slot_count, blob_size = HEADER.unpack_from(mapped)
+    if magic != MAGIC or format_version != FORMAT_VERSION or byte_order != BYTE_ORDER:
+        mapped.close()
+        raise ValueError(f"{path} : format de magasin inconnu ({magic!r}, v{format_version}, {byte_order!r}).")
+
+    view = memoryview(mapped)
+    table_size = BOOK_COUNT * CHAPTER_SLOTS * 4
+    start = HEADER.size
+    sections = []
+    for size in (table_size, table_size, (slot_count + 1) * 4):
+        sections.append(view[start:start + size].cast("I"))
+        start += size
+    return {
+        "path": path,
+        "book_id": book_id,
+        "stamp": stamp,
+        "slot_count": slot_count,
+        "mmap": mapped,
+        "view": view,
+        "chapter_first": sections[0],
+        "chapter_len": sections[1],
+        "offsets": sections[2],
+        "blob": view[start:start + blob_size],
+    }
+
+
+def close_verse_store(store):
+    """Libère les vues puis la projection (les tranches rendues ne doivent plus être utilisées)."""
+    for name in ("chapter_first", "chapter_len", "offsets", "blob", "view"):
+        store[name].release()
+    store["mmap"].close()
+
+
+def store_is_current(store, cursor):
+    """Vrai si les contenus de la traduction n'ont pas changé depuis l'export."""
+    return book_version(cursor, store["book_id"]) == store["stamp"]
+
+
+def load_verse_stores(directory, cursor):
+    """
+    Ouvre les magasins de 'directory' qui sont à jour par rapport à la base ;
+    les autres sont signalés (à réexporter) et ignorés. Retourne {book_id: magasin}.
+    """
+    stores = {}
+    if not os.path.isdir(directory):
+        return stores
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(STORE_EXTENSION):
+            continue
+        store = open_verse_store(os.path.join(directory, name))
+        if store_is_current(store, cursor):
+            stores[store["book_id"]] = store
+        else:
+            print(f"[WARN] Magasin périmé (book_id={store['book_id']}) : python main.py export")
+            close_verse_store(store)
+    return stores
+
+
+def _slot(store, ordinal):
+    position, chapter, verse = split_ordinal(ordinal)
+    if not (0 <= position < BOOK_COUNT and 0 <= chapter < CHAPTER_SLOTS and verse >= 0):
+        return None
+    index = position * CHAPTER_SLOTS + chapter
+    if verse >= store["chapter_len"][index]:
+        return None
+    return store["chapter_first"][index] + verse
+
+
+def verse_bytes(store, ordinal):
+    """Texte UTF-8 du verset de clé canonique 'ordinal' (memoryview, sans copie), ou None."""
+    slot = _slot(store, ordinal)
+    if slot is None:
+        return None
+    start, end = store["offsets"][slot], store["offsets"][slot + 1]
+    return store["blob"][start:end] if end > start else None
+
+
+def verse_text(store, ordinal, limit=None):
+    """Texte du verset (str), tronqué à 'limit' caractères si demandé (seul le début est décodé)."""
+    data = verse_bytes(store, ordinal)
+    if data is None:
+        return None
+    if limit is not None and len(data) > limit:
+        # Un caractère UTF-8 occupe au plus 4 octets
+        return str(data[:limit * 4], "utf-8", "ignore")[:limit]
+    return str(data, "utf-8")
+
+
+def range_texts(store, start_ordinal, end_ordinal):
+    """[(clé canonique, texte)] des versets présents dans [start_ordinal, end_ordinal], dans l'ordre."""
+    return [(ordinal, str(data, "utf-8")) for ordinal, data in iter_range_bytes(store, start_ordinal, end_ordinal)]
+
+
+def iter_range_bytes(store, start_ordinal, end_ordinal):
+    """(clé canonique, memoryview) des versets présents dans [start_ordinal, end_ordinal], dans l'ordre."""
+    first_position, first_chapter, first_verse = split_ordinal(start_ordinal)
+    last_position, last_chapter, last_verse = split_ordinal(end_ordinal)
+    first_index = max(first_position * CHAPTER_SLOTS + first_chapter, 0)
+    last_index = min(last_position * CHAPTER_SLOTS + last_chapter, BOOK_COUNT * CHAPTER_SLOTS - 1)
+    offsets = store["offsets"]
+    blob = store["blob"]
+    for index in range(first_index, last_index + 1):
+        length = store["chapter_len"][index]
+        if not length:
+            continue
+        position, chapter = divmod(index, CHAPTER_SLOTS)
+        low = max(first_verse, 0) if index == first_index else 0
+        high = min(last_verse, length - 1) if index == last_index else length - 1
+        base = store["chapter_first"][index]
+        for verse in range(low, high + 1):
+            start, end = offsets[base + verse], offsets[base + verse + 1]
+            if end > start:
+                yield verse_ordinal(position, chapter, verse), blob[start:end]
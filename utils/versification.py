@@ -0,0 +1,248 @@
+from collections import defaultdict
+
+from .canon import CANON_BOOKS, book_position
+from .instrumentation import count
+from .text_compression import inflate_text
+from .verse_keys import CHAPTER_FACTOR, split_ordinal, verse_ordinal
+
+# Alignement des versifications entre traductions.
+#
+# Chaque traduction est ingérée avec sa propre numérotation (verses.ordinal =
+# clé "livre/chapitre/verset" telle qu'imprimée). La numérotation de référence
+# est celle des Bibles anglaises (KJV, NIV), que suivent aussi LSG et la plupart
+# des Bibles protestantes françaises. Les traductions qui suivent le texte
+# hébreu (TOB, Bible de Jérusalem...) décalent certains passages :
+#   - Psaumes : la suscription est numérotée (Ps 3:1 hébreu = titre, Ps 3:2 = Ps 3:1) ;
+#   - Malachie 3:19-24 = Malachie 4:1-6, Joël 3 = Joël 2:28-32, Joël 4 = Joël 3, etc.
+#
+# À l'ingestion, la table verse_alignment associe chaque verset d'une traduction
+# (contents.id) à sa ou ses clés canoniques : identité pour une Bible à
+# numérotation anglaise, règles HEBREW_VERSIFICATION pour les livres numérotés
+# à l'hébraïque. Un livre est reconnu comme tel à un verset "témoin" qui
+# n'existe que dans la numérotation hébraïque (ex. Ml 3:24, Jl 4:1, Ps 3:9).
+# Une suscription de psaume a le verset canonique 0 (affiché "Ps 3:titre").
+#
+# Vue parallèle : une seule lecture de l'index (clé canonique, traduction) rend le
+# texte de toutes les traductions pour un verset ou une plage.
+
+# Règle : (chapitre, premier, dernier, chapitre canonique, premier, dernier)
+# dernier = None : jusqu'à la fin du chapitre (même décalage).
+# Plages de même longueur : correspondance verset à verset ; un verset source
+# vers plusieurs versets canoniques (ou l'inverse) : tous sont associés.
+HEBREW_VERSIFICATION = {
+    # livre : (verset témoin, règles)
+    "Gen": ((32, 33), [(32, 1, 1, 31, 55, 55), (32, 2, 33, 32, 1, 32)]),
+    "Ex": ((7, 29), [(7, 26, 29, 8, 1, 4), (8, 1, 28, 8, 5, 32),
+                     (21, 37, 37, 22, 1, 1), (22, 1, 30, 22, 2, 31)]),
+    "Lv": ((5, 26), [(5, 20, 26, 6, 1, 7), (6, 1, 23, 6, 8, 30)]),
+    "Nb": ((17, 28), [(17, 1, 15, 16, 36, 50), (17, 16, 28, 17, 1, 13),
+                      (25, 19, 19, 26, 1, 1), (30, 1, 1, 29, 40, 40), (30, 2, 17, 30, 1, 16)]),
+    "Dt": ((28, 69), [(13, 1, 1, 12, 32, 32), (13, 2, 19, 13, 1, 18),
+                      (23, 1, 1, 22, 30, 30), (23, 2, 26, 23, 1, 25),
+                      (28, 69, 69, 29, 1, 1), (29, 1, 28, 29, 2, 29)]),
+    "1S": ((24, 23), [(21, 1, 1, 20, 42, 42), (21, 2, 16, 21, 1, 15),
+                      (24, 1, 1, 23, 29, 29), (24, 2, 23, 24, 1, 22)]),
+    "2S": ((19, 44), [(19, 1, 1, 18, 33, 33), (19, 2, 44, 19, 1, 43)]),
+    "1R": ((5, 32), [(5, 1, 14, 4, 21, 34), (5, 15, 32, 5, 1, 18),
+                     (22, 44, 44, 22, 43, 43), (22, 45, 54, 22, 44, 53)]),
+    "2R": ((12, 22), [(12, 1, 1, 11, 21, 21), (12, 2, 22, 12, 1, 21)]),
+    "1Ch": ((5, 41), [(5, 27, 41, 6, 1, 15), (6, 1, 66, 6, 16, 81)]),
+    "2Ch": ((1, 18), [(1, 18, 18, 2, 1, 1), (2, 1, 17, 2, 2, 18),
+                      (13, 23, 23, 14, 1, 1), (14, 1, 14, 14, 2, 15)]),
+    "Ne": ((3, 38), [(3, 33, 38, 4, 1, 6), (4, 1, 17, 4, 7, 23),
+                     (10, 1, 1, 9, 38, 38), (10, 2, 40, 10, 1, 39)]),
+    "Jb": ((40, 32), [(40, 25, 32, 41, 1, 8), (41, 1, 26, 41, 9, 34)]),
+    "Ec": ((4, 17), [(4, 17, 17, 5, 1, 1), (5, 1, 19, 5, 2, 20)]),
+    "Ct": ((7, 14), [(7, 1, 1, 6, 13, 13), (7, 2, 14, 7, 1, 13)]),
+    "Es": ((8, 23), [(8, 23, 23, 9, 1, 1), (9, 1, 20, 9, 2, 21),
+                     (63, 19, 19, 63, 19, 19), (63, 19, 19, 64, 1, 1), (64, 1, 11, 64, 2, 12)]),
+    "Jr": ((8, 23), [(8, 23, 23, 9, 1, 1), (9, 1, 25, 9, 2, 26)]),
+    "Ez": ((21, 37), [(21, 1, 5, 20, 45, 49), (21, 6, 37, 21, 1, 32)]),
+    "Dn": ((3, 33), [(3, 31, 33, 4, 1, 3), (4, 1, 34, 4, 4, 37),
+                     (6, 1, 1, 5, 31, 31), (6, 2, 29, 6, 1, 28)]),
+    "Os": ((14, 10), [(2, 1, 2, 1, 10, 11), (2, 3, 25, 2, 1, 23),
+                      (12, 1, 1, 11, 12, 12), (12, 2, 15, 12, 1, 14),
+                      (14, 1, 1, 13, 16, 16), (14, 2, 10, 14, 1, 9)]),
+    "Jl": ((4, 1), [(3, 1, 5, 2, 28, 32), (4, 1, 21, 3, 1, 21)]),
+    "Jon": ((2, 11), [(2, 1, 1, 1, 17, 17), (2, 2, 11, 2, 1, 10)]),
+    "Mi": ((4, 14), [(4, 14, 14, 5, 1, 1), (5, 1, 14, 5, 2, 15)]),
+    "Na": ((2, 14), [(2, 1, 1, 1, 15, 15), (2, 2, 14, 2, 1, 13)]),
+    "Za": ((2, 17), [(2, 1, 4, 1, 18, 21), (2, 5, 17, 2, 1, 13)]),
+    "Ml": ((3, 24), [(3, 19, 24, 4, 1, 6)]),
+}
+
+# Psaumes dont la suscription occupe 1 ou 2 versets dans la numérotation hébraïque
+PSALM_TITLE_VERSES = {
+    **{psalm: 1 for psalm in (
+        3, 4, 5, 6, 7, 8, 9, 12, 18, 19, 20, 21, 22, 30, 31, 34, 36, 38, 39, 40, 41, 42,
+        44, 45, 46, 47, 48, 49, 53, 55, 56, 57, 58, 59, 61, 62, 63, 64, 65, 67, 68, 69, 70,
+        75, 76, 77, 80, 81, 83, 84, 85, 88, 89, 92, 102, 108, 140, 142)},
+    **{psalm: 2 for psalm in (51, 52, 54, 60)},
+}
+HEBREW_VERSIFICATION["Ps"] = ((3, 9), [
+    rule
+    for psalm, offset in sorted(PSALM_TITLE_VERSES.items())
+    for rule in ((psalm, 1, offset, psalm, 0, 0), (psalm, offset + 1, None, psalm, 1, None))
+] + [
+    # Ps 13 : titre en 13:1, et 13:6 hébreu = 13:5-6
+    (13, 1, 1, 13, 0, 0), (13, 2, 5, 13, 1, 4), (13, 6, 6, 13, 5, 6),
+])
+
+ALIGNMENT_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS verse_alignment (
+        canonical_ordinal INTEGER NOT NULL,
+        book_id           INTEGER NOT NULL,
+        content_id        INTEGER NOT NULL,
+        PRIMARY KEY (canonical_ordinal, book_id, content_id)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_verse_alignment_content ON verse_alignment (content_id)",
+    """CREATE TRIGGER IF NOT EXISTS verse_alignment_ad AFTER DELETE ON contents
+    BEGIN
+        DELETE FROM verse_alignment WHERE content_id = OLD.id;
+    END""",
+]
+
+PARALLEL_VIEW_SQL = """
+SELECT a.canonical_ordinal, a.book_id, b.title, c.start_ordinal, c.text
+FROM verse_alignment a
+JOIN books b ON b.id = a.book_id
+JOIN contents c ON c.id = a.content_id
+WHERE a.canonical_ordinal BETWEEN ? AND ?{filters}
+ORDER BY a.canonical_ordinal, a.book_id
+"""
+
+
+def _rules_by_position():
+    """position -> (ordinal du verset témoin, {chapitre source: [règles]})."""
+    rules = {}
+    for abbreviation, ((marker_chapter, marker_verse), book_rules) in HEBREW_VERSIFICATION.items():
+        position = book_position(abbreviation)
+        by_chapter = defaultdict(list)
+        for rule in book_rules:
+            by_chapter[rule[0]].append(rule)
+        rules[position] = (verse_ordinal(position, marker_chapter, marker_verse), dict(by_chapter))
+    return rules
+
+
+_RULES = _rules_by_position()
+
+
+def hebrew_numbered_books(ordinals):
+    """Positions des livres dont le verset témoin figure dans 'ordinals' (ensemble de clés)."""
+    return {position for position, (marker, _) in _RULES.items() if marker in ordinals}
+
+
+def canonical_ordinals(ordinal, hebrew_books=()):
+    """
+    Clé(s) canonique(s) du verset 'ordinal' d'une traduction ; 'hebrew_books' :
+    positions numérotées à l'hébraïque (voir hebrew_numbered_books).
+    """
+    position, chapter, verse = split_ordinal(ordinal)
+    if position not in hebrew_books:
+        return [ordinal]
+    keys = []
+    for _, first, last, canon_chapter, canon_first, canon_last in _RULES[position][1].get(chapter, ()):
+        if verse < first or (last is not None and verse > last):
+            continue
+        if last is None or last - first == canon_last - canon_first:
+            keys.append(verse_ordinal(position, canon_chapter, canon_first + verse - first))
+        elif first == last:
+            keys.extend(verse_ordinal(position, canon_chapter, canon_verse)
+                        for canon_verse in range(canon_first, canon_last + 1))
+        else:
+            keys.append(verse_ordinal(position, canon_chapter, canon_first))
+    return keys or [ordinal]
+
+
+def align_translation(cursor, book_id, min_content_id=0):
+    """
+    Remplit verse_alignment pour les versets de la traduction 'book_id'
+    (contents d'id > min_content_id). Retourne les abréviations des livres
+    reconnus comme numérotés à l'hébraïque.
+    """
+    cursor.execute(
+        "SELECT id, start_ordinal FROM contents "
+        "WHERE id > ? AND book_id = ? AND start_ordinal IS NOT NULL",
+        (min_content_id, book_id),
+    )
+    verses = cursor.fetchall()
+    hebrew_books = hebrew_numbered_books({ordinal for _, ordinal in verses})
+    rows = [
+        (canonical, book_id, content_id)
+        for content_id, ordinal in verses
+        for canonical in canonical_ordinals(ordinal, hebrew_books)
+    ]
+    cursor.executemany(
+        "INSERT OR IGNORE INTO verse_alignment (canonical_ordinal, book_id, content_id) VALUES (?, ?, ?)",
+        rows,
+    )
+    count("aligned_verses", len(rows))
+    abbreviations = [CANON_BOOKS[position][0] for position in sorted(hebrew_books)]
+    if abbreviations:
+        print(f"[INFO] Versification hébraïque (book_id={book_id}) : {', '.join(abbreviations)}")
+    return abbreviations
+
+
+def ensure_alignment_schema(cursor):
+    """
+    Crée verse_alignment si besoin ; à la création, les Bibles déjà présentes
+    sont alignées. Pas d'executescript (qui validerait la transaction en cours).
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'verse_alignment'")
+    if cursor.fetchone() is not None:
+        return
+    for statement in ALIGNMENT_SCHEMA:
+        cursor.execute(statement)
+    cursor.execute("""
+        SELECT b.id FROM books b JOIN category cat ON cat.id = b.category_id
+        WHERE cat.title = 'Bible'
+    """)
+    for (book_id,) in cursor.fetchall():
+        align_translation(cursor, book_id)
+
+
+def format_canonical(ordinal):
+    """"Col 3:16", ou "Ps 3:titre" pour une suscription (verset 0)."""
+    position, chapter, verse = split_ordinal(ordinal)
+    return f"{CANON_BOOKS[position][0]} {chapter}:{verse or 'titre'}"
+
+
+def parallel_ordinals(reference):
+    """(début, fin) canoniques d'une Reference ; un chapitre entier inclut la suscription."""
+    start_verse = reference.start_verse if reference.start_verse is not None else 0
+    end_verse = reference.end_verse if reference.end_verse is not None else CHAPTER_FACTOR - 1
+    return (verse_ordinal(reference.position, reference.start_chapter, start_verse),
+            verse_ordinal(reference.position, reference.end_chapter, end_verse))
+
+
+def parallel_verses(cursor, start_ordinal, end_ordinal, books=None):
+    """
+    Vue parallèle des traductions sur [start_ordinal, end_ordinal] (clés canoniques),
+    en une requête. books : traductions retenues, titres exacts ou id de la
+    table books (toutes par défaut).
+    Retourne une liste, dans l'ordre canonique, de dict :
+      {"ordinal", "reference", "translations": [{book_id, book_title, reference, text}]}
+    où translations[i]["reference"] est la numérotation propre à la traduction.
+    """
+    params = [start_ordinal, end_ordinal]
+    filters = ""
+    if books:
+        ids = [int(book) for book in books if str(book).isdigit()]
+        titles = [book for book in books if not str(book).isdigit()]
+        filters = (f"\n  AND (a.book_id IN ({', '.join('?' * len(ids))})"
+                   f" OR b.title IN ({', '.join('?' * len(titles))}))")
+        params.extend(ids + titles)
+    cursor.execute(PARALLEL_VIEW_SQL.format(filters=filters), params)
+
+    view = []
+    for canonical, book_id, book_title, ordinal, text_content in cursor:
+        if not view or view[-1]["ordinal"] != canonical:
+            view.append({"ordinal": canonical, "reference": format_canonical(canonical),
+                         "translations": []})
+        view[-1]["translations"].append({
+            "book_id": book_id,
+            "book_title": book_title,
+            "reference": format_canonical(ordinal),
+            "text": inflate_text(cursor, book_id, text_content),
+        })
+    return view